@@ -0,0 +1,294 @@
+"""Command line runner that analyzes posts without the GUI.
+
+Examples::
+
+    python aggression_analyzer/cli.py --user someone --limit 500 -o out.csv
+    python aggression_analyzer/cli.py --input posts.parquet -o out.parquet
+    python aggression_analyzer/cli.py batch submit --input posts.csv
+    python aggression_analyzer/cli.py batch status
+    python aggression_analyzer/cli.py batch collect <name> -o out.csv
+"""
+
+import argparse
+import sys
+from typing import Iterator, Sequence
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from config.settings import BATCH_STATE_DIR, CLI_CHUNK_SIZE
+from modules.analyzer import Analyzer
+from modules.batch import BatchRunner
+from modules.budget import default_budget
+from modules.exporter import ResultWriter
+from modules.journal import ResultJournal
+from modules.metrics import default_metrics
+from modules.pipeline import iter_analyzed_pages
+from modules.scraper import SCRAPE_AVAILABLE, Scraper, newest_post
+from modules.sources import iter_post_chunks
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="投稿の攻撃性をGUIなしで分析します。"
+    )
+    source = parser.add_argument_group("入力")
+    source.add_argument(
+        "--user", action="append", default=[], help="分析するユーザー名"
+    )
+    source.add_argument(
+        "--keyword", action="append", default=[], help="検索キーワード"
+    )
+    source.add_argument(
+        "--input", help="投稿ファイル（.csv / .jsonl / .parquet）"
+    )
+    source.add_argument(
+        "--content-column",
+        default="content",
+        help="--input で本文が入っている列名",
+    )
+    parser.add_argument(
+        "-o", "--output", required=True,
+        help="結果の出力先（.csv / .jsonl / .parquet）",
+    )
+    parser.add_argument(
+        "--limit", type=int, default=20,
+        help="ユーザー・キーワードごとの取得件数",
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="前回の取得以降の新しい投稿だけを取得する",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=CLI_CHUNK_SIZE,
+        help="一度に読み込み・分析する行数",
+    )
+    parser.add_argument(
+        "--pack-size", type=int, help="1リクエストで採点する投稿数"
+    )
+    parser.add_argument(
+        "--no-dedup", action="store_true", help="重複投稿をまとめない"
+    )
+    parser.add_argument(
+        "--prefilter", action="store_true",
+        help="低リスク投稿をAPIに送らない",
+    )
+    parser.add_argument(
+        "--cascade", action="store_true",
+        help="モデレーションで高リスクの投稿だけを採点する",
+    )
+    parser.add_argument(
+        "--journal",
+        help="結果を逐次記録するジャーナル。既存なら記録済みの行を再利用して再開する",
+    )
+    parser.add_argument(
+        "--restart", action="store_true",
+        help="--journal の記録を消去して最初から分析する",
+    )
+    parser.add_argument(
+        "--metrics",
+        help="APIの呼び出し・トークン・推定コスト・処理時間の記録先"
+        "（.prom/.txt は Prometheus 形式、それ以外は JSON）",
+    )
+    return parser
+
+
+def build_batch_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="cli.py batch",
+        description="OpenAI Batch APIで投稿をまとめて分析します。",
+    )
+    parser.add_argument(
+        "--state-dir", default=BATCH_STATE_DIR,
+        help="バッチジョブの状態の保存先",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser(
+        "submit", help="投稿ファイルのバッチジョブを開始する"
+    )
+    submit.add_argument(
+        "--input", required=True,
+        help="投稿ファイル（.csv / .jsonl / .parquet）",
+    )
+    submit.add_argument(
+        "--content-column", default="content",
+        help="本文が入っている列名",
+    )
+    submit.add_argument("--name", help="ジョブ名（既定: 日時と乱数）")
+
+    status = commands.add_parser("status", help="ジョブの状態を表示する")
+    status.add_argument(
+        "name", nargs="?", help="ジョブ名（省略時は未回収のすべてのジョブ）"
+    )
+
+    collect = commands.add_parser(
+        "collect", help="終了したジョブの結果を書き出す"
+    )
+    collect.add_argument("name", help="ジョブ名")
+    collect.add_argument(
+        "-o", "--output", required=True,
+        help="結果の出力先（.csv / .jsonl / .parquet）",
+    )
+    collect.add_argument(
+        "--wait", action="store_true", help="ジョブが終わるまで待つ"
+    )
+    return parser
+
+
+def batch_main(argv: Sequence[str]) -> int:
+    """Run the ``batch`` subcommands on :class:`BatchRunner` jobs."""
+    args = build_batch_parser().parse_args(argv)
+    load_dotenv()
+    runner = BatchRunner(Analyzer(), args.state_dir)
+
+    if args.command == "submit":
+        chunks = list(
+            iter_post_chunks(args.input, CLI_CHUNK_SIZE, args.content_column)
+        )
+        if not chunks:
+            print(f"{args.input} に投稿がありません", file=sys.stderr)
+            return 1
+        print(runner.submit(pd.concat(chunks), args.name))
+    elif args.command == "status":
+        names = [args.name] if args.name else runner.pending_jobs()
+        if not names:
+            print("未回収のジョブはありません", file=sys.stderr)
+        for name in names:
+            state = runner.status(name)
+            for kind, batches in state["batches"].items():
+                for info in batches:
+                    print(f"{name}\t{kind}\t{info['id']}\t{info['status']}")
+    elif args.command == "collect":
+        if args.wait:
+            runner.wait(args.name)
+        elif not runner.is_finished(args.name):
+            print(f"ジョブ {args.name} はまだ終わっていません", file=sys.stderr)
+            return 1
+        with ResultWriter(args.output) as writer:
+            writer.write(runner.collect(args.name))
+        print(
+            f"{writer.rows} 件の結果を {args.output} に保存しました",
+            file=sys.stderr,
+        )
+    return 0
+
+
+def iter_target_pages(
+    scraper: Scraper,
+    users: Sequence[str],
+    keywords: Sequence[str],
+    limit: int,
+    chunk_size: int,
+    incremental: bool = False,
+) -> Iterator[pd.DataFrame]:
+    """Scrape each user and keyword, yielding pages of ``chunk_size``.
+
+    Targets are scraped concurrently with :meth:`Scraper.scrape_many`, so
+    pages of different targets may interleave.  A ``target`` column
+    (``user:<name>`` or ``term:<keyword>``) records where each post came
+    from.  With ``incremental`` the watermarks are not moved here; record
+    the written results with :class:`PendingWatermarks` instead.
+    """
+
+    targets = [(u, "user") for u in users] + [(k, "term") for k in keywords]
+    for (term, mode), page in scraper.scrape_many(
+        targets, limit, chunk_size, incremental=incremental, commit=False
+    ):
+        yield page.assign(target=f"{mode}:{term}")
+
+
+class PendingWatermarks:
+    """Newest post of each scraped target, committed after the output.
+
+    Incremental scrapes must not move a watermark before the posts behind
+    it are saved, or an interrupted run would skip them next time.  Feed
+    every written result to :meth:`add` and call :meth:`commit` once the
+    output file is complete.
+    """
+
+    def __init__(self, scraper: Scraper) -> None:
+        self.scraper = scraper
+        self._newest: dict[str, pd.DataFrame] = {}
+
+    def add(self, result: pd.DataFrame) -> None:
+        for target, rows in result.groupby("target", sort=False):
+            seen = self._newest.get(target)
+            frames = [rows] if seen is None else [seen, rows]
+            self._newest[target] = newest_post(pd.concat(frames))
+
+    def commit(self) -> None:
+        for target, post in self._newest.items():
+            mode, term = target.split(":", 1)
+            self.scraper.commit_watermark(mode, term, post)
+        self._newest.clear()
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["batch"]:
+        return batch_main(argv[1:])
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.input and (args.user or args.keyword):
+        parser.error("--input と --user/--keyword は同時に指定できません")
+    if not (args.input or args.user or args.keyword):
+        parser.error("--input、--user、--keyword のいずれかを指定してください")
+
+    load_dotenv()
+    watermarks = None
+    if args.input:
+        pages = iter_post_chunks(
+            args.input, args.chunk_size, args.content_column
+        )
+    else:
+        if not SCRAPE_AVAILABLE:
+            print("ntscraper が利用できません。", file=sys.stderr)
+            return 1
+        scraper = Scraper()
+        if args.incremental:
+            watermarks = PendingWatermarks(scraper)
+        pages = iter_target_pages(
+            scraper,
+            args.user,
+            args.keyword,
+            args.limit,
+            args.chunk_size,
+            args.incremental,
+        )
+
+    analyzer = Analyzer()
+    options = {
+        "pack_size": args.pack_size,
+        "dedup": False if args.no_dedup else None,
+        "prefilter": args.prefilter or None,
+        "cascade": args.cascade or None,
+        # One budget for the whole run rather than one per chunk.
+        "budget": default_budget(),
+    }
+    journal = None
+    if args.journal:
+        journal = ResultJournal(args.journal, resume=not args.restart)
+    try:
+        with ResultWriter(args.output) as writer:
+            for result in iter_analyzed_pages(
+                pages, analyzer, journal=journal, **options
+            ):
+                writer.write(result)
+                if watermarks is not None:
+                    watermarks.add(result)
+                print(f"分析済み: {writer.rows} 件", file=sys.stderr)
+        if watermarks is not None:
+            watermarks.commit()
+    finally:
+        if journal is not None:
+            journal.close()
+    print(f"{writer.rows} 件の結果を {args.output} に保存しました", file=sys.stderr)
+    print(default_metrics().summary(), file=sys.stderr)
+    if args.metrics:
+        default_metrics().write(args.metrics)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
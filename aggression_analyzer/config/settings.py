@@ -1,3 +1,5 @@
+import os
+
 # OpenAI Models
 MODERATION_MODEL = "text-moderation-latest"
 AGGRESSION_ANALYSIS_MODEL = "gpt-4o-mini"
@@ -5,10 +7,185 @@ AGGRESSION_ANALYSIS_MODEL = "gpt-4o-mini"
 # Concurrency Settings
 # 同時に実行する分析タスク数の上限
 MAX_CONCURRENT_WORKERS = 8
+# asyncio版の分析で同時に送信するリクエスト数の上限
+MAX_CONCURRENT_REQUESTS = 200
+# 1回のモデレーションAPI呼び出しにまとめる投稿数
+MODERATION_BATCH_SIZE = 100
+
+# Rate Limit Settings
+# モデルごとの初期レート制限（1分あたりのリクエスト数・トークン数）。
+# 実際の上限はAPIレスポンスの x-ratelimit-* ヘッダーから自動で学習する。
+RATE_LIMITS = {
+    MODERATION_MODEL: {"requests": 1000, "tokens": 150_000},
+    AGGRESSION_ANALYSIS_MODEL: {"requests": 500, "tokens": 200_000},
+}
+# 429/5xxエラー時のリトライ回数と指数バックオフの基準・上限秒数
+API_MAX_RETRIES = 5
+RATE_LIMIT_BACKOFF_BASE = 1.0
+RATE_LIMIT_BACKOFF_MAX = 60.0
+
+# 推定コストの計算に使うモデルごとの料金（USD / 100万トークン）
+MODEL_PRICING = {
+    MODERATION_MODEL: {"input": 0.0, "cached_input": 0.0, "output": 0.0},
+    AGGRESSION_ANALYSIS_MODEL: {
+        "input": 0.15,
+        "cached_input": 0.075,
+        "output": 0.60,
+    },
+}
 
 # Scraper Settings
+# 利用するNitterインスタンス。複数指定すると並列に振り分け、障害時は自動で切り替える
+NITTER_INSTANCES = ["https://nitter.net"]
+# 連続で失敗したインスタンスを一時的に除外する回数と除外秒数
+INSTANCE_FAILURE_THRESHOLD = 3
+INSTANCE_COOLDOWN_SECONDS = 300
+# ntscraper 内部での1インスタンスあたりの再試行回数（失敗時はプールが別インスタンスへ切り替える）
+NITTER_MAX_RETRIES = 2
 # 1リクエストごとの待機秒数
 SCRAPE_DELAY_SECONDS = 1
+# 逐次取得（ストリーミング）時に1回のリクエストで取得する投稿数
+SCRAPE_PAGE_SIZE = 100
+# 収集と分析を並行させる際に、分析待ちとして保持するページ数の上限
+PIPELINE_QUEUE_SIZE = 4
+
+# 差分収集で、対象ごとに取得済みの最新投稿を記録するファイル
+WATERMARK_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "output",
+    "watermarks.sqlite3",
+)
+# 取得済みより古い投稿がこの件数続いたら差分収集を打ち切る
+# （リツイートは元投稿の日時で表示されるため、1件目では止めない）
+WATERMARK_STOP_AFTER_OLD_POSTS = 3
+
+# Archive Settings
+# 魚拓の作成先（Wayback Machine の Save Page Now）
+ARCHIVE_ENDPOINT = "https://web.archive.org"
+# 作成済みの魚拓を記録し、次回以降は再送信しないためのファイル
+ARCHIVE_REGISTRY_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "output",
+    "archive_registry.sqlite3",
+)
+# 同時に送信する保存リクエスト数と1分あたりの上限
+# （匿名の Save Page Now は1分あたり15件程度で429を返す）
+ARCHIVE_MAX_WORKERS = 4
+ARCHIVE_REQUESTS_PER_MINUTE = 12
+# 1リクエストのタイムアウト秒数（保存には数十秒かかることがある）
+ARCHIVE_TIMEOUT = 60
+# 429/5xx・通信エラー時のリトライ回数と指数バックオフの基準・上限秒数
+ARCHIVE_MAX_RETRIES = 3
+ARCHIVE_BACKOFF_BASE = 5.0
+ARCHIVE_BACKOFF_MAX = 120.0
+
+# Duplicate Detection Settings
+# コピペ投稿やリツイートは代表の1件だけを分析し、結果を共有する
+# （URL・メンション・記号などを除いた本文が完全一致するものだけをまとめる）
+DEDUP_ENABLED = True
+# 完全一致しない類似投稿もMinHashでまとめる（既定は無効）
+# 否定（「正しくない」）や対象の入れ替え（"kill it" / "kill you"）でも
+# 類似度は0.7前後になるため、有効にする場合も閾値は0.9以上にすること
+DEDUP_NEAR_ENABLED = False
+# 文字3-gramのJaccard類似度（MinHashで推定）がこの値以上なら同一内容とみなす
+DEDUP_THRESHOLD = 0.9
+# MinHashのハッシュ数と、LSHのバンド数（ハッシュ数を割り切れる値）
+DEDUP_NUM_PERM = 128
+DEDUP_BANDS = 32
+# これより短い投稿は完全一致のみで重複判定する
+DEDUP_MIN_LENGTH = 10
+
+# Prefilter Settings
+# 攻撃的な語を含まない低リスク投稿をAPIに送らずに処理する（既定は無効）
+PREFILTER_ENABLED = False
+# 照合する語（正規化後に照合。カタカナはひらがなとして扱う）
+PREFILTER_TERMS_JA = [
+    "死ね", "しね", "氏ね", "殺す", "ころす", "殺してやる", "消えろ",
+    "きえろ", "くたばれ", "きもい", "きしょい", "うざい", "くず", "屑",
+    "ごみ", "かす", "ばか", "馬鹿", "あほ", "阿呆", "ぶす", "でぶ",
+    "障害者", "池沼", "まぬけ", "無能", "黙れ", "だまれ", "晒す", "さらす",
+    "炎上させ", "通報しろ",
+]
+# 英数字だけの語は単語単位で照合する（"die" は "diet" に一致しない）
+PREFILTER_TERMS_EN = [
+    "kill", "kill yourself", "kys", "die", "idiot", "stupid", "moron",
+    "dumb", "loser", "trash", "scum", "ugly", "hate you", "shut up",
+    "retard", "bitch", "fuck", "fucking", "shit", "bastard", "slut",
+    "whore", "worthless", "pathetic",
+]
+# 低リスクとみなす条件
+PREFILTER_MAX_EXCLAMATIONS = 2
+PREFILTER_MAX_UPPERCASE_RATIO = 0.6
+
+# Cascade Settings
+# 先に全件をモデレーションし、リスクの高い投稿だけを攻撃性スコアリングする
+CASCADE_ENABLED = False
+# モデレーションの最大カテゴリスコアがこの値を超える投稿だけを採点する
+# （いずれかのカテゴリでフラグが立った投稿は常に採点対象）
+CASCADE_THRESHOLD = 0.1
+# 1回の分析で使う攻撃性スコアリングの上限（Noneで無制限）
+LLM_BUDGET_REQUESTS = None
+LLM_BUDGET_TOKENS = None
+
+# CLI Settings
+# コマンドライン実行で一度に読み込み・分析する行数（メモリ使用量の上限になる）
+CLI_CHUNK_SIZE = 1000
+
+# Journal Settings
+# 分析結果を1件ずつ追記するジャーナル（異常終了後の再開用）
+JOURNAL_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "output",
+    "journal.sqlite3",
+)
+# この件数または秒数ごとにまとめてディスクへ書き込む（fsync）
+JOURNAL_FLUSH_ROWS = 100
+JOURNAL_FLUSH_SECONDS = 1.0
+
+# Result Cache Settings
+# 同じ投稿の再分析を避けるための結果キャッシュ（SQLite）
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "output",
+    "result_cache.sqlite3",
+)
+# キャッシュに保持する最大件数と有効期間（秒）
+RESULT_CACHE_MAX_ENTRIES = 200_000
+RESULT_CACHE_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+
+# Batch API Settings
+# バッチモードのジョブ状態を保存するディレクトリ（アプリ再起動後も再開できる）
+BATCH_STATE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "output",
+    "batches",
+)
+# バッチジョブの完了確認の間隔（秒）と完了期限
+BATCH_POLL_SECONDS = 60
+BATCH_COMPLETION_WINDOW = "24h"
+# 1つのバッチ入力ファイルに入れるリクエスト数とファイルサイズの上限（API の制限）
+BATCH_MAX_REQUESTS = 50_000
+BATCH_MAX_FILE_BYTES = 200 * 1024 * 1024
+
+# Job Queue Settings
+# 複数のワーカープロセス（別ホストも可）で取得・分析を分担するジョブキュー
+JOBQUEUE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "output",
+    "jobqueue.sqlite3",
+)
+# 分析ジョブ1件に含める投稿数
+JOBQUEUE_CHUNK_SIZE = 200
+# リースの有効期限（秒）。期限内に完了・延長されないジョブは他のワーカーが再取得する
+JOBQUEUE_VISIBILITY_TIMEOUT = 300.0
+# 処理中のジョブのリースを延長する間隔（秒）
+JOBQUEUE_HEARTBEAT_SECONDS = 60.0
+# ジョブの最大試行回数と、失敗後に再実行するまでの待ち時間（秒、試行ごとに倍増）
+JOBQUEUE_MAX_ATTEMPTS = 3
+JOBQUEUE_RETRY_DELAY = 30.0
+# キューが空のときに新しいジョブを確認する間隔（秒）
+JOBQUEUE_POLL_SECONDS = 2.0
 
 # Analysis Parameters
 DEFAULT_TEMPERATURE = 0.5
@@ -31,9 +208,13 @@ WEIGHTS = {
     "sexual_flag": 1.0,
 }
 
-AGGRESSION_PROMPT_TEMPLATE = """
+# 攻撃性スコアリングのプロンプト。
+# 評価基準と出力形式は全リクエスト共通のシステムメッセージとして先頭に置き、
+# 投稿本文は後ろのユーザーメッセージに入れる。先頭が毎回同じになるため、
+# OpenAIのプロンプトキャッシュ（共通部分が1024トークン以上の場合）が効く。
+AGGRESSION_SYSTEM_PROMPT = """
 あなたはソーシャルメディアの投稿を分析し、その攻撃性を評価する専門家です。
-以下の基準に従って、与えられた文章の攻撃性スコアを決定し、その理由を説明してください。
+以下の基準に従って、ユーザーが送る文章の攻撃性スコアを決定し、その理由を説明してください。
 
 # 評価基準:
 0: 攻撃性なし。
@@ -42,15 +223,55 @@ AGGRESSION_PROMPT_TEMPLATE = """
 7-9: 高度の攻撃性（例: 強い敵意、脅迫）。
 10: 極度の攻撃性（例: 暴力の助長、深刻な人権侵害）。
 
-# 分析対象の文章:
+# 出力形式:
+必ず以下のJSON形式で回答してください。
+{
+  "score": [0-10の整数],
+  "reason": "なぜそのスコアを付けたのかを40文字程度で具体的に説明"
+}
+"""
+
+AGGRESSION_USER_TEMPLATE = """# 分析対象の文章:
 ---
 {text}
 ---
+"""
+
+# まとめて採点モードで1回のリクエストに含める投稿数の既定値。
+# 1の場合は投稿ごとに採点する（短い投稿が多い場合は10程度を推奨）。
+AGGRESSION_PACK_SIZE = 1
+
+AGGRESSION_PACKED_SYSTEM_PROMPT = """
+あなたはソーシャルメディアの投稿を分析し、その攻撃性を評価する専門家です。
+以下の基準に従って、ユーザーが送る各投稿の攻撃性スコアを決定し、その理由を説明してください。
+
+# 評価基準:
+0: 攻撃性なし。
+1-3: 軽度の攻撃性（例: 皮肉、無神経な表現）。
+4-6: 中程度の攻撃性（例: 明確な批判、侮辱）。
+7-9: 高度の攻撃性（例: 強い敵意、脅迫）。
+10: 極度の攻撃性（例: 暴力の助長、深刻な人権侵害）。
 
 # 出力形式:
-必ず以下のJSON形式で回答してください。
-{{
-  "score": [0-10の整数],
-  "reason": "なぜそのスコアを付けたのかを40文字程度で具体的に説明"
-}}
+投稿は1行に1件のJSONで送られる。投稿ごとに独立して評価し、
+必ず以下のJSON形式で、すべての投稿について id を付けて回答してください。
+{
+  "results": [
+    {
+      "id": "投稿のid",
+      "score": [0-10の整数],
+      "reason": "なぜそのスコアを付けたのかを40文字程度で具体的に説明"
+    }
+  ]
+}
 """
+
+AGGRESSION_PACKED_USER_TEMPLATE = """# 分析対象の投稿:
+---
+{posts}
+---
+"""
+
+# 採点の回答（{score, reason} のJSON）に許す最大出力トークン数。
+# まとめて採点モードでは投稿1件あたりの値として、投稿数倍を上限にする。
+AGGRESSION_MAX_TOKENS = 150
@@ -1,10 +1,26 @@
+import logging
 import threading
-import pandas as pd
+from typing import TYPE_CHECKING, Any
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 
-from modules.analyzer import Analyzer
-from modules.scraper import Scraper, archive_url
+from config.settings import DEFAULT_TEMPERATURE, DEFAULT_TOP_P
+from gui.result_list import VirtualResultList
+from gui.results_model import ResultsModel
+from modules.metrics import default_metrics
+
+# pandas, openai and the scraper take over a second to import, so they are
+# imported where they are first needed rather than before the window opens.
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from modules.analyzer import Analyzer
+    from modules.archiver import Archiver
+    from modules.scraper import Scraper
+
+# Rows finished by the analyzer and archive statuses are applied to the
+# list at most this often.
+RESULT_FLUSH_MS = 100
 
 
 class ModerationApp(ctk.CTk):
@@ -18,10 +34,54 @@ class ModerationApp(ctk.CTk):
         self.geometry("800x600")
 
         self.df: pd.DataFrame | None = None
-        self.analyzer = Analyzer()
-        self.scraper = Scraper()
-        self.result_items: list[dict[str, object]] = []
+        self._analyzer: Analyzer | None = None
+        self._scraper: Scraper | None = None
+        self._archiver: Archiver | None = None
+        self.results_model = ResultsModel()
+        self._pending_rows: list[dict[str, Any]] = []
+        self._pending_statuses: dict[int, str] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_users = 0
+        self._flush_scheduled = False
         self.create_ui()
+        # Warm the imports once the window is on screen so the first run
+        # does not wait for them.
+        self.after_idle(self._preload_modules)
+
+    @property
+    def analyzer(self) -> "Analyzer":
+        """OpenAI-backed analyzer, created on first use."""
+        if self._analyzer is None:
+            from modules.analyzer import Analyzer
+
+            self._analyzer = Analyzer()
+        return self._analyzer
+
+    @property
+    def scraper(self) -> "Scraper":
+        """Nitter scraper, created on first use."""
+        if self._scraper is None:
+            from modules.scraper import Scraper
+
+            self._scraper = Scraper()
+        return self._scraper
+
+    @property
+    def archiver(self) -> "Archiver":
+        """Wayback Machine archiver, created on first use."""
+        if self._archiver is None:
+            from modules.archiver import default_archiver
+
+            self._archiver = default_archiver()
+        return self._archiver
+
+    def _preload_modules(self) -> None:
+        def load() -> None:
+            import modules.analyzer  # noqa: F401
+            import modules.pipeline  # noqa: F401
+            import modules.scraper  # noqa: F401
+
+        threading.Thread(target=load, daemon=True).start()
 
     def create_ui(self) -> None:
         self.main_frame = ctk.CTkFrame(self)
@@ -53,11 +113,11 @@ class ModerationApp(ctk.CTk):
 
         self.temp_entry = ctk.CTkEntry(self.settings_frame, width=60)
         self.temp_entry.pack(side="left", padx=5)
-        self.temp_entry.insert(0, str(self.analyzer.temperature))
+        self.temp_entry.insert(0, str(DEFAULT_TEMPERATURE))
 
         self.top_p_entry = ctk.CTkEntry(self.settings_frame, width=60)
         self.top_p_entry.pack(side="left", padx=5)
-        self.top_p_entry.insert(0, str(self.analyzer.top_p))
+        self.top_p_entry.insert(0, str(DEFAULT_TOP_P))
 
         self.status_label = ctk.CTkLabel(
             self.main_frame,
@@ -97,17 +157,25 @@ class ModerationApp(ctk.CTk):
             command=self.on_threshold_change,
         )
         self.threshold_slider.set(5)
+        self.results_model.select_threshold(5)
         self.threshold_slider.pack(side="left", padx=5)
         self.threshold_label = ctk.CTkLabel(
             self.threshold_frame, text="自動選択スコア: 5"
         )
         self.threshold_label.pack(side="left", padx=5)
+        self.sort_checkbox = ctk.CTkCheckBox(
+            self.threshold_frame,
+            text="スコア順に並べる",
+            command=self.on_sort_change,
+        )
+        self.sort_checkbox.pack(side="left", padx=5)
 
-        self.results_frame = ctk.CTkScrollableFrame(
+        self.results_list = VirtualResultList(
             self.main_frame,
+            self.results_model,
             height=200,
         )
-        self.results_frame.pack(fill="both", expand=True, pady=10)
+        self.results_list.pack(fill="both", expand=True, pady=10)
 
         self.archive_button = ctk.CTkButton(
             self.main_frame,
@@ -120,6 +188,12 @@ class ModerationApp(ctk.CTk):
     def run_analysis(self) -> None:
         self.run_button.configure(state="disabled")
         self.save_button.configure(state="disabled")
+        self.archive_button.configure(state="disabled")
+        self.df = None
+        default_metrics().reset()
+        self.results_model.clear()
+        self.results_list.scroll_to(0)
+        self._start_flushing()
         thread = threading.Thread(
             target=self._run_analysis_thread,
             daemon=True,
@@ -127,122 +201,216 @@ class ModerationApp(ctk.CTk):
         thread.start()
 
     def _run_analysis_thread(self) -> None:
-        """Collect posts and run the analysis in a background thread."""
+        """Collect posts and run the analysis in a background thread.
+
+        However the run ends, the flush loop is stopped and the controls
+        are re-enabled on the Tk thread; unexpected errors are reported in
+        a dialog.
+        """
+        message: str | None = None
+        error: Exception | None = None
+        try:
+            message = self._analyze_posts()
+        except Exception as e:
+            logging.exception("Analysis failed")
+            error = e
+        finally:
+            self.after(0, lambda: self._on_run_finished(message, error))
+
+    def _analyze_posts(self) -> str | None:
+        """Scrape and analyze into :attr:`df`; return a failure message."""
         username = self.username_entry.get().strip()
         limit_str = self.limit_entry.get().strip()
         try:
             limit = int(limit_str) if limit_str else 20
         except ValueError:
-            self.after(
-                0,
-                lambda: self.status_label.configure(
-                    text="取得件数が不正です", text_color="red"
-                ),
-            )
-            self.after(0, lambda: self.run_button.configure(state="normal"))
-            return
+            return "取得件数が不正です"
+        try:
+            analyzer = self.analyzer
+        except ValueError as e:
+            # Raised when no OpenAI API key is configured.
+            return str(e)
+
+        import pandas as pd
+
+        from modules.budget import default_budget
+        from modules.pipeline import iter_analyzed_pages
 
         self.after(
             0, lambda: self.status_label.configure(text="投稿を取得中...")
         )
-        df = self.scraper.scrape_user_posts(username, limit)
-        if df.empty:
-            self.after(
-                0,
-                lambda: self.status_label.configure(
-                    text="投稿が取得できませんでした", text_color="red"
-                ),
-            )
-            self.after(0, lambda: self.run_button.configure(state="normal"))
-            return
-
-        self.df = df
-
-        total_rows = len(self.df)
 
-        def progress(done: int, total: int = total_rows) -> None:
+        def progress(done: int, total: int) -> None:
             p = done / total
             self.after(
                 0,
                 lambda: (
                     self.progress_bar.set(p),
                     self.status_label.configure(
-                        text=f"分析中... {done}/{total}"
+                        text=f"収集・分析中... {done}/{total}"
                     ),
                 ),
             )
 
-        self.df = self.analyzer.analyze_dataframe_in_parallel(
-            self.df, progress
+        # Pages are analyzed while the scraper fetches the next ones.
+        pages = self.scraper.iter_tweet_pages(username, "user", limit)
+        frames = list(
+            iter_analyzed_pages(
+                pages,
+                analyzer,
+                progress,
+                expected_total=limit,
+                row_callback=self._queue_row,
+                budget=default_budget(),
+            )
         )
-        self.after(0, self._display_results)
+        if not frames:
+            return "投稿が取得できませんでした"
+        self.df = pd.concat(frames, ignore_index=True)
+        return None
+
+    def _on_run_finished(
+        self, message: str | None, error: Exception | None
+    ) -> None:
+        self._stop_flushing()
+        if error is not None:
+            self._on_run_failed("分析に失敗しました")
+            messagebox.showerror(
+                "分析エラー", f"分析中にエラーが発生しました: {error}"
+            )
+        elif message is not None or self.df is None:
+            self._on_run_failed(message or "分析が中断されました")
+        else:
+            self._display_results()
+
+    def _on_run_failed(self, message: str) -> None:
+        self.status_label.configure(text=message, text_color="red")
+        self.run_button.configure(state="normal")
+
+    def _queue_row(self, row: dict[str, Any]) -> None:
+        """Buffer a finished row; called from the analysis thread."""
+        with self._pending_lock:
+            self._pending_rows.append(row)
+
+    def _start_flushing(self) -> None:
+        """Apply buffered rows and statuses every :data:`RESULT_FLUSH_MS`.
+
+        Background work calls this on the Tk thread when it starts and
+        :meth:`_stop_flushing` when it ends; a single ``after`` loop runs
+        while any of it is active, so the list is redrawn once per batch
+        instead of once per row or status change.
+        """
+        self._flush_users += 1
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.after(RESULT_FLUSH_MS, self._flush_tick)
+
+    def _flush_tick(self) -> None:
+        self._flush_scheduled = False
+        self._flush_pending()
+        if self._flush_users:
+            self._flush_scheduled = True
+            self.after(RESULT_FLUSH_MS, self._flush_tick)
+
+    def _flush_pending(self) -> None:
+        with self._pending_lock:
+            rows, self._pending_rows = self._pending_rows, []
+            statuses, self._pending_statuses = self._pending_statuses, {}
+        if rows:
+            self.results_model.extend(rows)
+            self.results_list.refresh()
+        for position, status in statuses.items():
+            self.results_model.set_status(position, status)
+            self.results_list.refresh_position(position)
+
+    def _stop_flushing(self) -> None:
+        self._flush_users -= 1
+        self._flush_pending()
 
     def save_results(self) -> None:
+        if self.df is None:
+            return
         save_path = filedialog.asksaveasfilename(
             defaultextension=".xlsx",
-            filetypes=[("Excel files", "*.xlsx")],
+            filetypes=[
+                ("Excel files", "*.xlsx"),
+                ("CSV files", "*.csv"),
+                ("Parquet files", "*.parquet"),
+                ("JSON Lines files", "*.jsonl"),
+            ],
         )
         if not save_path:
             return
+        self.save_button.configure(state="disabled")
+        self.status_label.configure(text="結果を保存中...")
+        # Large results take a while to write; keep the UI responsive.
+        thread = threading.Thread(
+            target=self._save_results_thread,
+            args=(self.df, save_path),
+            daemon=True,
+        )
+        thread.start()
+
+    def _save_results_thread(
+        self, df: "pd.DataFrame", save_path: str
+    ) -> None:
+        from modules.exporter import export_dataframe
+
         try:
-            self.df.to_excel(save_path, index=False)
-            self.status_label.configure(text="結果を保存しました", text_color="green")
+            export_dataframe(df, save_path)
         except Exception as e:
-            self.status_label.configure(text="保存に失敗しました", text_color="red")
-            messagebox.showerror(
-                "保存エラー",
-                f"ファイルを保存できませんでした: {e}",
-            )
+            error = e
+            self.after(0, lambda: self._on_save_failed(error))
+            return
+        self.after(
+            0,
+            lambda: (
+                self.status_label.configure(
+                    text="結果を保存しました", text_color="green"
+                ),
+                self.save_button.configure(state="normal"),
+            ),
+        )
+
+    def _on_save_failed(self, error: Exception) -> None:
+        self.status_label.configure(text="保存に失敗しました", text_color="red")
+        self.save_button.configure(state="normal")
+        messagebox.showerror(
+            "保存エラー",
+            f"ファイルを保存できませんでした: {error}",
+        )
 
     def on_threshold_change(self, value: float) -> None:
         score = int(float(value))
         self.threshold_label.configure(text=f"自動選択スコア: {score}")
-        for item in self.result_items:
-            idx = item["index"]
-            post_score = (
-                self.df.loc[idx, "aggressiveness_score"]
-                if self.df is not None
-                else 0
-            )
-            item["var"].set(post_score >= score)
+        self.results_model.select_threshold(score)
+        self.results_list.refresh()
+
+    def on_sort_change(self) -> None:
+        self.results_model.set_sort_by_score(bool(self.sort_checkbox.get()))
+        self.results_list.scroll_to(0)
 
     def _display_results(self) -> None:
         if self.df is None:
             return
-        for widget in self.results_frame.winfo_children():
-            widget.destroy()
-        self.result_items.clear()
-        threshold = int(self.threshold_slider.get())
-        for idx, row in self.df.iterrows():
-            color = "gray20"
-            if row["aggressiveness_score"] >= 7:
-                color = "#8b0000"
-            elif row["aggressiveness_score"] >= 4:
-                color = "#555500"
-            frame = ctk.CTkFrame(self.results_frame, fg_color=color)
-            frame.pack(fill="x", pady=2)
-            var = ctk.BooleanVar(
-                value=row["aggressiveness_score"] >= threshold
-            )
-            chk = ctk.CTkCheckBox(frame, variable=var)
-            chk.pack(side="left")
-            text = f"{row['aggressiveness_score']}: {row['content'][:50]}"
-            label = ctk.CTkLabel(frame, text=text, anchor="w")
-            label.pack(side="left", padx=5)
-            status = ctk.CTkLabel(frame, text="")
-            status.pack(side="right", padx=5)
-            self.result_items.append({
-                "index": idx,
-                "var": var,
-                "status": status,
-            })
+        # Keep what the operator selected while results were streaming in.
+        self.results_model.set_frame(self.df, keep_selection=True)
+        self.results_list.refresh()
         self.save_button.configure(state="normal")
         self.run_button.configure(state="normal")
         self.archive_button.configure(state="normal")
-        self.status_label.configure(text="分析が完了しました", text_color="green")
+        self.status_label.configure(
+            text=f"分析が完了しました（{default_metrics().summary()}）",
+            text_color="green",
+        )
 
     def batch_archive(self) -> None:
+        if self.df is None:
+            return
+        # A new analysis would replace the rows being archived.
         self.archive_button.configure(state="disabled")
+        self.run_button.configure(state="disabled")
+        self._start_flushing()
         thread = threading.Thread(
             target=self._batch_archive_thread,
             daemon=True,
@@ -250,18 +418,37 @@ class ModerationApp(ctk.CTk):
         thread.start()
 
     def _batch_archive_thread(self) -> None:
-        if self.df is None:
-            return
-        selected = [item for item in self.result_items if item["var"].get()]
-        for item in selected:
-            idx = item["index"]
-            url = self.df.loc[idx, "url"]
-            self.after(
-                0,
-                lambda st=item["status"]: st.configure(text="魚拓作成中..."),
-            )
-            archive = archive_url(url)
-            if archive:
-                self.df.loc[idx, "archive_url"] = archive
-            self.after(0, lambda st=item["status"]: st.configure(text="完了"))
-        self.after(0, lambda: self.archive_button.configure(state="normal"))
+        """Archive the selected posts concurrently in a background thread."""
+        from modules.archiver import ARCHIVED, ARCHIVING, FAILED, REGISTERED
+
+        labels = {
+            ARCHIVING: "魚拓作成中...",
+            ARCHIVED: "完了",
+            REGISTERED: "作成済み",
+            FAILED: "失敗",
+        }
+        positions: dict[str, list[int]] = {}
+        for position in self.results_model.selected_positions():
+            url = self.df.loc[self.results_model.label(position), "url"]
+            positions.setdefault(url, []).append(int(position))
+
+        def on_status(url: str, status: str) -> None:
+            with self._pending_lock:
+                for position in positions[url]:
+                    self._pending_statuses[position] = labels[status]
+
+        try:
+            archives = self.archiver.archive_many(positions, on_status)
+            for url, archive in archives.items():
+                if not archive:
+                    continue
+                for position in positions[url]:
+                    label = self.results_model.label(position)
+                    self.df.loc[label, "archive_url"] = archive
+        finally:
+            self.after(0, self._stop_flushing)
+            self.after(0, self._on_archive_finished)
+
+    def _on_archive_finished(self) -> None:
+        self.archive_button.configure(state="normal")
+        self.run_button.configure(state="normal")
@@ -0,0 +1,133 @@
+"""Virtualized list widget for analysis results."""
+
+from typing import Any
+
+import customtkinter as ctk
+
+from gui.results_model import ResultsModel, score_color
+
+ROW_HEIGHT = 32
+
+
+class VirtualResultList(ctk.CTkFrame):
+    """Scrollable list that only builds widgets for the visible rows.
+
+    A small pool of row widgets (one per visible line) is re-bound to
+    different rows of :class:`ResultsModel` as the list scrolls, so the
+    number of widgets depends on the window height rather than on the
+    number of results.  Check boxes write straight into the model's
+    selection array.  Rows are shown in the model's display order.
+    """
+
+    def __init__(
+        self,
+        master: Any,
+        model: ResultsModel,
+        row_height: int = ROW_HEIGHT,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(master, **kwargs)
+        self.model = model
+        self.row_height = row_height
+        self.offset = 0
+        self._pool: list[dict[str, Any]] = []
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.pack(side="left", fill="both", expand=True)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.body.bind("<Configure>", lambda event: self.refresh())
+        self._bind_wheel(self.body)
+
+    def _visible_count(self) -> int:
+        return max(1, self.body.winfo_height() // self.row_height)
+
+    def _bind_wheel(self, widget: Any) -> None:
+        widget.bind("<MouseWheel>", self._on_wheel)
+        widget.bind("<Button-4>", self._on_wheel)
+        widget.bind("<Button-5>", self._on_wheel)
+
+    def _ensure_pool(self, count: int) -> None:
+        while len(self._pool) < count:
+            slot = len(self._pool)
+            frame = ctk.CTkFrame(self.body, height=self.row_height - 2)
+            check = ctk.CTkCheckBox(
+                frame,
+                text="",
+                width=24,
+                command=lambda slot=slot: self._on_check(slot),
+            )
+            check.pack(side="left")
+            label = ctk.CTkLabel(frame, text="", anchor="w")
+            label.pack(side="left", padx=5, fill="x", expand=True)
+            status = ctk.CTkLabel(frame, text="")
+            status.pack(side="right", padx=5)
+            for widget in (frame, label, status):
+                self._bind_wheel(widget)
+            self._pool.append(
+                {"frame": frame, "check": check, "label": label,
+                 "status": status, "position": None}
+            )
+
+    def refresh(self) -> None:
+        """Re-bind every pooled row to the rows at the current offset."""
+        total = len(self.model)
+        visible = self._visible_count()
+        self.offset = max(0, min(self.offset, total - visible))
+        self._ensure_pool(visible)
+        for slot, row in enumerate(self._pool):
+            shown = self.offset + slot
+            if slot < visible and shown < total:
+                self._bind_row(row, self.model.position_at(shown))
+                if not row["frame"].winfo_ismapped():
+                    row["frame"].pack(fill="x", pady=1)
+            else:
+                row["position"] = None
+                row["frame"].pack_forget()
+        if total:
+            self.scrollbar.set(
+                self.offset / total, min(1.0, (self.offset + visible) / total)
+            )
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def refresh_position(self, position: int) -> None:
+        """Redraw the row at ``position`` if it is on screen."""
+        for row in self._pool:
+            if row["position"] == position:
+                self._bind_row(row, position)
+
+    def scroll_to(self, offset: int) -> None:
+        self.offset = offset
+        self.refresh()
+
+    def _bind_row(self, row: dict[str, Any], position: int) -> None:
+        view = self.model.row(position)
+        row["position"] = position
+        row["frame"].configure(fg_color=score_color(view.score))
+        if view.selected:
+            row["check"].select()
+        else:
+            row["check"].deselect()
+        row["label"].configure(text=view.text)
+        row["status"].configure(text=view.status)
+
+    def _on_check(self, slot: int) -> None:
+        row = self._pool[slot]
+        if row["position"] is not None:
+            self.model.set_selected(row["position"], bool(row["check"].get()))
+
+    def _on_scrollbar(self, action: str, value: Any, unit: str = "") -> None:
+        if action == "moveto":
+            self.scroll_to(int(float(value) * len(self.model)))
+        elif action == "scroll":
+            step = self._visible_count() if unit == "pages" else 1
+            self.scroll_to(self.offset + int(value) * step)
+
+    def _on_wheel(self, event: Any) -> None:
+        if getattr(event, "num", None) == 4:
+            delta = -1
+        elif getattr(event, "num", None) == 5:
+            delta = 1
+        else:
+            delta = -1 if event.delta > 0 else 1
+        self.scroll_to(self.offset + delta * 3)
@@ -0,0 +1,159 @@
+"""Tk-free state behind the results list."""
+
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+import numpy as np
+
+# pandas is only needed once results exist; keep it off the GUI start-up.
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class RowView(NamedTuple):
+    score: int
+    text: str
+    selected: bool
+    status: str
+
+
+def score_color(score: int) -> str:
+    """Return the background colour used for a row with ``score``."""
+    if score >= 7:
+        return "#8b0000"
+    if score >= 4:
+        return "#555500"
+    return "gray20"
+
+
+def _scores(values: Any) -> np.ndarray:
+    import pandas as pd
+
+    # Rows whose scoring failed hold <NA>; treat them as score 0.
+    scores = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce")
+    return scores.fillna(0).to_numpy(dtype=np.int16)
+
+
+class ResultsModel:
+    """Selection and display state for the rows of a results DataFrame.
+
+    Scores and selection live in NumPy arrays indexed by row position, so
+    applying a threshold is one vectorized comparison and no Tk variable is
+    kept per row.  Archive statuses are stored sparsely because only
+    selected rows ever get one.  Rows can be appended while an analysis is
+    still running; ``order`` maps display positions to row positions and
+    keeps the rows sorted by descending score when ``sort_by_score`` is on.
+    """
+
+    def __init__(self, df: "pd.DataFrame | None" = None) -> None:
+        self.threshold: float = np.inf
+        self.sort_by_score = False
+        self.clear()
+        if df is not None:
+            self.set_frame(df)
+
+    def clear(self) -> None:
+        """Remove all rows."""
+        self.labels: list[Any] = []
+        self.urls: list[Any] = []
+        self.texts: list[str] = []
+        self.scores = np.zeros(0, dtype=np.int16)
+        self.selected = np.zeros(0, dtype=bool)
+        self.statuses: dict[int, str] = {}
+        self._sort()
+
+    def set_frame(
+        self, df: "pd.DataFrame", keep_selection: bool = False
+    ) -> None:
+        """Replace the rows shown by the model.
+
+        Selection and statuses are cleared, unless ``keep_selection`` is
+        set: then rows whose ``url`` was already shown keep them and other
+        rows are selected by the current threshold.
+        """
+        previous: dict[Any, int] = {}
+        if keep_selection:
+            previous = {url: p for p, url in enumerate(self.urls)}
+        old_selected, old_statuses = self.selected, self.statuses
+        self.labels = list(df.index)
+        self.urls = list(df["url"]) if "url" in df.columns else []
+        if "aggressiveness_score" in df.columns:
+            self.scores = _scores(df["aggressiveness_score"])
+        else:
+            self.scores = np.zeros(len(df), dtype=np.int16)
+        if "content" in df.columns:
+            self.texts = df["content"].fillna("").astype(str).tolist()
+        else:
+            self.texts = [""] * len(df)
+        self.selected = np.greater_equal(self.scores, self.threshold)
+        self.statuses = {}
+        for position, url in enumerate(self.urls):
+            old = previous.get(url)
+            if old is None:
+                continue
+            self.selected[position] = old_selected[old]
+            if old in old_statuses:
+                self.statuses[position] = old_statuses[old]
+        self._sort()
+
+    def extend(self, rows: list[dict[str, Any]]) -> None:
+        """Append finished rows (dicts with ``content``, ``url`` and
+        ``aggressiveness_score``), selecting them by the current threshold.
+        """
+        if not rows:
+            return
+        scores = _scores([row.get("aggressiveness_score") for row in rows])
+        start = len(self.scores)
+        self.labels.extend(range(start, start + len(rows)))
+        self.urls.extend(row.get("url") for row in rows)
+        self.texts.extend(str(row.get("content") or "") for row in rows)
+        self.scores = np.concatenate([self.scores, scores])
+        self.selected = np.concatenate(
+            [self.selected, scores >= self.threshold]
+        )
+        self._sort()
+
+    def set_sort_by_score(self, value: bool) -> None:
+        self.sort_by_score = value
+        self._sort()
+
+    def _sort(self) -> None:
+        if self.sort_by_score:
+            # Stable, so equal scores stay in arrival order.
+            self.order = np.argsort(-self.scores, kind="stable")
+        else:
+            self.order = np.arange(len(self.scores))
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def position_at(self, display_position: int) -> int:
+        """Return the row position shown at ``display_position``."""
+        return int(self.order[display_position])
+
+    def select_threshold(self, threshold: float) -> None:
+        """Select exactly the rows scoring at least ``threshold``."""
+        self.threshold = threshold
+        np.greater_equal(self.scores, threshold, out=self.selected)
+
+    def set_selected(self, position: int, value: bool) -> None:
+        self.selected[position] = value
+
+    def selected_positions(self) -> np.ndarray:
+        return np.flatnonzero(self.selected)
+
+    def label(self, position: int) -> Any:
+        """Return the DataFrame index label of the row at ``position``."""
+        return self.labels[position]
+
+    def set_status(self, position: int, status: str) -> None:
+        self.statuses[position] = status
+
+    def row(self, position: int, width: int = 50) -> RowView:
+        """Return what the list displays for the row at ``position``."""
+        score = int(self.scores[position])
+        return RowView(
+            score=score,
+            text=f"{score}: {self.texts[position][:width]}",
+            selected=bool(self.selected[position]),
+            status=self.statuses.get(position, ""),
+        )
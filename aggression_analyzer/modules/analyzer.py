@@ -1,163 +1,1300 @@
 import os
 import json
 import time
+import asyncio
+import hashlib
 import logging
+from types import SimpleNamespace
 from typing import Any, Callable, Optional
 
+import numpy as np
+import openai
 import pandas as pd
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 from config.settings import (
     MODERATION_MODEL,
     AGGRESSION_ANALYSIS_MODEL,
     DEFAULT_TEMPERATURE,
     DEFAULT_TOP_P,
-    AGGRESSION_PROMPT_TEMPLATE,
+    AGGRESSION_SYSTEM_PROMPT,
+    AGGRESSION_USER_TEMPLATE,
+    AGGRESSION_PACKED_SYSTEM_PROMPT,
+    AGGRESSION_PACKED_USER_TEMPLATE,
+    AGGRESSION_PACK_SIZE,
+    AGGRESSION_MAX_TOKENS,
     WEIGHTS,
     MAX_CONCURRENT_WORKERS,
+    MAX_CONCURRENT_REQUESTS,
+    MODERATION_BATCH_SIZE,
+    RESULT_CACHE_ENABLED,
+    RESULT_CACHE_PATH,
+    API_MAX_RETRIES,
+    DEDUP_ENABLED,
+    PREFILTER_ENABLED,
+    CASCADE_ENABLED,
+    CASCADE_THRESHOLD,
 )
+from modules.budget import LLMBudget, default_budget
+from modules.cache import ResultCache
+from modules.dedup import find_duplicates
+from modules.journal import ResultJournal, row_keys
+from modules.metrics import Metrics, default_metrics
+from modules.prefilter import PREFILTER_REASON, prefilter as run_prefilter
+from modules.ratelimit import RateLimiter, default_rate_limiter
+
+
+CATEGORY_NAMES = [
+    "hate",
+    "hate/threatening",
+    "self-harm",
+    "sexual",
+    "sexual/minors",
+    "violence",
+    "violence/graphic",
+]
+
+RESULT_COLUMNS = [
+    "aggressiveness_score",
+    "aggressiveness_reason",
+    "prompt_version",
+] + [
+    f"{name}_{kind}" for name in CATEGORY_NAMES for kind in ("flag", "score")
+]
+
+# Weights applied when a key is missing from ``WEIGHTS``.
+DEFAULT_WEIGHTS = {
+    "hate_score": 0.5,
+    "hate/threatening_score": 0.3,
+    "violence_score": 0.3,
+    "sexual_score": 0.1,
+    "sexual/minors_score": 0.1,
+    "aggressiveness_score": 0.5,
+    "hate_flag": 2.0,
+    "hate/threatening_flag": 1.0,
+    "violence_flag": 1.5,
+    "sexual_flag": 1.0,
+}
+
+# Called with the index label and result dict of each finished row.
+ResultCallback = Callable[[Any, dict[str, Any]], None]
+
+# Identifies the prompts and output limit used for scoring.  It is part of
+# the result cache key and stored in the ``prompt_version`` column, so every
+# score can be traced to the prompt that produced it.
+PROMPT_VERSION = hashlib.sha256(
+    "\0".join([
+        AGGRESSION_SYSTEM_PROMPT,
+        AGGRESSION_USER_TEMPLATE,
+        AGGRESSION_PACKED_SYSTEM_PROMPT,
+        AGGRESSION_PACKED_USER_TEMPLATE,
+        str(AGGRESSION_MAX_TOKENS),
+    ]).encode("utf-8")
+).hexdigest()[:16]
+
+
+def _empty_result() -> dict[str, Any]:
+    """Return the result used for rows that could not be analyzed."""
+    result: dict[str, Any] = {
+        "aggressiveness_score": None,
+        "aggressiveness_reason": None,
+        "prompt_version": None,
+    }
+    for name in CATEGORY_NAMES:
+        result[f"{name}_flag"] = False
+        result[f"{name}_score"] = 0.0
+    return result
+
+
+def _unscored_result(
+    categories: Any, scores: Any, status: str
+) -> dict[str, Any]:
+    """Return the result of a moderated row left without a score.
+
+    The moderation results are kept; ``status`` becomes the row's
+    ``scoring_status``.
+    """
+    result = _build_result(categories, scores, None, None)
+    result["scoring_status"] = status
+    return result
+
+
+def _prefiltered_result() -> dict[str, Any]:
+    """Return the result used for rows fast-pathed by the prefilter."""
+    result = _empty_result()
+    result["aggressiveness_score"] = 0
+    result["aggressiveness_reason"] = PREFILTER_REASON
+    result["scoring_status"] = "prefiltered"
+    return result
+
+
+def _moderation_risk(categories: Any, scores: Any) -> float:
+    """Return how risky a post looks from its moderation result alone.
+
+    This is the highest category score, plus one when any category is
+    flagged so that flagged posts always rank first.
+    """
+    attributes = [name.replace("/", "_") for name in CATEGORY_NAMES]
+    risk = max(float(getattr(scores, a, 0.0) or 0.0) for a in attributes)
+    if any(getattr(categories, a, False) for a in attributes):
+        risk += 1.0
+    return risk
+
+
+def _build_result(
+    categories: Any,
+    scores: Any,
+    score: int | None,
+    reason: str | None,
+    prompt_version: str | None = PROMPT_VERSION,
+) -> dict[str, Any]:
+    """Flatten moderation and aggressiveness results into row columns."""
+    result: dict[str, Any] = {
+        "aggressiveness_score": score,
+        "aggressiveness_reason": reason,
+        "prompt_version": prompt_version if score is not None else None,
+    }
+    for name in CATEGORY_NAMES:
+        flag = getattr(categories, name.replace("/", "_"), False)
+        sc = getattr(scores, name.replace("/", "_"), 0.0)
+        result[f"{name}_flag"] = flag
+        result[f"{name}_score"] = sc
+    return result
+
+
+def _moderation_to_cache(categories: Any, scores: Any) -> dict[str, Any]:
+    """Serialize the moderation fields used by :func:`_build_result`."""
+    attrs = [name.replace("/", "_") for name in CATEGORY_NAMES]
+    return {
+        "categories": {a: bool(getattr(categories, a, False)) for a in attrs},
+        "scores": {a: float(getattr(scores, a, 0.0)) for a in attrs},
+    }
+
+
+def _moderation_from_cache(value: dict[str, Any]) -> tuple[Any, Any]:
+    return (
+        SimpleNamespace(**value["categories"]),
+        SimpleNamespace(**value["scores"]),
+    )
+
+
+# Errors worth retrying after a backoff: throttling, 5xx and network issues.
+_RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APIConnectionError,
+)
+
+
+def _estimate_tokens(*texts: str) -> int:
+    """Return a conservative token estimate (about one per character)."""
+    return sum(len(t or "") for t in texts)
+
+
+def _request_tokens(request: dict[str, Any]) -> int:
+    """Estimate the tokens a chat request uses, output limit included."""
+    prompt_tokens = _estimate_tokens(
+        *[m["content"] for m in request["messages"]]
+    )
+    return prompt_tokens + request["max_tokens"]
+
+
+def _error_headers(error: Exception) -> Any:
+    response = getattr(error, "response", None)
+    return getattr(response, "headers", None)
+
+
+def _parse_score_response(content: str) -> tuple[int, str] | None:
+    """Parse the ``{score, reason}`` JSON returned by the chat model.
+
+    Returns ``None`` when the score is outside the 0-10 range.
+    """
+    data = json.loads(content)
+    score = int(data.get("score"))
+    reason = str(data.get("reason"))
+    if 0 <= score <= 10:
+        return score, reason
+    return None
+
+
+# Errors raised by the parsers for a malformed or off-format reply.
+_PARSE_ERRORS = (ValueError, TypeError, AttributeError, KeyError, IndexError)
+
+
+def _parse_packed_response(content: str) -> dict[str, tuple[int, str]]:
+    """Parse a packed reply into ``{id: (score, reason)}``.
+
+    Entries with a missing id or an invalid score are skipped.
+    """
+    data = json.loads(content)
+    items = data.get("results", []) if isinstance(data, dict) else data
+    parsed: dict[str, tuple[int, str]] = {}
+    for item in items if isinstance(items, list) else []:
+        try:
+            score = int(item.get("score"))
+        except (AttributeError, TypeError, ValueError):
+            continue
+        if 0 <= score <= 10 and item.get("id") is not None:
+            parsed[str(item["id"])] = (score, str(item.get("reason")))
+    return parsed
+
+
+class _RunState:
+    """Book-keeping shared by the analysis engines for one DataFrame run.
+
+    Collects per-row results, reports progress (a representative counts for
+    its whole duplicate cluster), journals finished rows together with
+    their duplicates and hands each of them to ``result_callback``.
+    """
+
+    def __init__(
+        self,
+        total: int,
+        progress_callback: Optional[Callable[[int, int], None]],
+        journal: ResultJournal | None,
+        keys: pd.Series | None,
+        result_callback: Optional[ResultCallback] = None,
+    ) -> None:
+        self.total = total
+        self.completed = 0
+        self.results: dict[Any, dict[str, Any]] = {}
+        self.progress_callback = progress_callback
+        self.journal = journal
+        self.keys = keys
+        self.result_callback = result_callback
+        self.members: dict[Any, list[Any]] = {}
+        self.texts: pd.Series = pd.Series(dtype=object)
+        self.duplicate_of: pd.Series | None = None
+        self.prefiltered: pd.Series | None = None
+
+    def record(self, index: Any, data: dict[str, Any]) -> None:
+        self.results[index] = data
+        members = self.members.get(index, [])
+        self.completed += 1 + len(members)
+        if self.journal is not None and self.keys is not None:
+            if (
+                data["aggressiveness_score"] is not None
+                or data.get("scoring_status") == "below_threshold"
+            ):
+                for label in [index, *members]:
+                    self.journal.append(self.keys[label], data)
+        if self.result_callback:
+            for label in [index, *members]:
+                self.result_callback(label, data)
+        if self.progress_callback:
+            self.progress_callback(self.completed, self.total)
 
 
 class Analyzer:
-    def __init__(self, api_key: str | None = None) -> None:
-        self.client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+    def __init__(
+        self,
+        api_key: str | None = None,
+        cache: ResultCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+        base_url: str | None = None,
+        metrics: Metrics | None = None,
+    ) -> None:
+        # Retries are handled by ``rate_limiter`` rather than the client.
+        # ``base_url`` (default: the OPENAI_BASE_URL environment variable)
+        # points the clients at a compatible server, e.g. for benchmarks.
+        self.client = OpenAI(
+            api_key=api_key or os.getenv("OPENAI_API_KEY"),
+            base_url=base_url,
+            max_retries=0,
+        )
         if self.client.api_key is None:
             raise ValueError("OpenAI APIキーが設定されていません。")
+        self._async_client: AsyncOpenAI | None = None
+        self.rate_limiter = rate_limiter or default_rate_limiter()
+        self.metrics = metrics or default_metrics()
         self.temperature = DEFAULT_TEMPERATURE
         self.top_p = DEFAULT_TOP_P
+        if cache is None and RESULT_CACHE_ENABLED:
+            cache = ResultCache(RESULT_CACHE_PATH)
+        self.cache = cache
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """Return the :class:`AsyncOpenAI` client, creating it on demand."""
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(
+                api_key=self.client.api_key,
+                base_url=self.client.base_url,
+                max_retries=0,
+            )
+        return self._async_client
+
+    def _call_api(
+        self, resource: Any, model: str, tokens: int, **kwargs: Any
+    ) -> Any:
+        """Send one request through :attr:`rate_limiter`.
+
+        Rate limits are learned from the response headers.  Throttling,
+        server and connection errors are retried up to
+        :data:`config.settings.API_MAX_RETRIES` times with exponential
+        backoff, honouring ``Retry-After``.  Latency, token usage, retries
+        and failures are recorded in :attr:`metrics`.
+        """
+        for attempt in range(API_MAX_RETRIES + 1):
+            self.rate_limiter.acquire(model, tokens)
+            started = time.perf_counter()
+            try:
+                raw = resource.with_raw_response.create(model=model, **kwargs)
+            except _RETRYABLE_ERRORS as e:
+                if attempt == API_MAX_RETRIES:
+                    self.metrics.record_failure(model, e)
+                    raise
+                time.sleep(self._retry_delay(model, attempt, e))
+                continue
+            except Exception as e:
+                self.metrics.record_failure(model, e)
+                raise
+            return self._finish_call(model, started, raw)
+
+    async def _call_api_async(
+        self, resource: Any, model: str, tokens: int, **kwargs: Any
+    ) -> Any:
+        """Asynchronous counterpart of :meth:`_call_api`."""
+        for attempt in range(API_MAX_RETRIES + 1):
+            await self.rate_limiter.acquire_async(model, tokens)
+            started = time.perf_counter()
+            try:
+                raw = await resource.with_raw_response.create(
+                    model=model, **kwargs
+                )
+            except _RETRYABLE_ERRORS as e:
+                if attempt == API_MAX_RETRIES:
+                    self.metrics.record_failure(model, e)
+                    raise
+                await asyncio.sleep(self._retry_delay(model, attempt, e))
+                continue
+            except Exception as e:
+                self.metrics.record_failure(model, e)
+                raise
+            return self._finish_call(model, started, raw)
+
+    def _finish_call(self, model: str, started: float, raw: Any) -> Any:
+        """Learn rate limits from ``raw`` and record the call's metrics."""
+        self.rate_limiter.update_from_headers(model, raw.headers)
+        response = raw.parse()
+        self.metrics.observe_call(
+            model,
+            time.perf_counter() - started,
+            getattr(response, "usage", None),
+        )
+        return response
+
+    def _retry_delay(
+        self, model: str, attempt: int, error: Exception
+    ) -> float:
+        self.metrics.record_retry(model, error)
+        retry_after = self.rate_limiter.update_from_headers(
+            model, _error_headers(error)
+        )
+        # With Retry-After the limiter pauses the model, so the next
+        # acquire() already waits; only back off when the server gave no hint.
+        delay = 0.0 if retry_after else self.rate_limiter.backoff(attempt)
+        logging.warning(
+            "%s request failed (%s); retrying in %.1fs",
+            model,
+            type(error).__name__,
+            retry_after or delay,
+        )
+        return delay
+
+    def _moderation_key(self, text: str) -> str:
+        return ResultCache.make_key("moderation", text, MODERATION_MODEL)
+
+    def _score_key(self, text: str) -> str:
+        return ResultCache.make_key(
+            "aggressiveness",
+            text,
+            AGGRESSION_ANALYSIS_MODEL,
+            self.temperature,
+            self.top_p,
+            PROMPT_VERSION,
+        )
+
+    def cached_moderation(self, text: str) -> tuple[Any, Any] | None:
+        """Return the cached ``(categories, scores)`` of ``text``, if any."""
+        if self.cache is None:
+            return None
+        value = self.cache.get(self._moderation_key(text))
+        return _moderation_from_cache(value) if value is not None else None
+
+    def store_moderation(
+        self, text: str, categories: Any, scores: Any
+    ) -> None:
+        """Cache a moderation result obtained outside this analyzer."""
+        if self.cache is not None:
+            self.cache.set(
+                self._moderation_key(text),
+                _moderation_to_cache(categories, scores),
+            )
+
+    def cached_score(self, text: str) -> tuple[int, str] | None:
+        """Return the cached ``(score, reason)`` of ``text``, if any."""
+        if self.cache is None:
+            return None
+        value = self.cache.get(self._score_key(text))
+        return (value[0], value[1]) if value is not None else None
+
+    def store_score(self, text: str, score: int, reason: str) -> None:
+        """Cache a score made with the current prompt version."""
+        if self.cache is not None:
+            self.cache.set(self._score_key(text), [score, reason])
 
     def moderate_text(self, text: str) -> tuple[Any, Any]:
-        response = self.client.moderations.create(
+        cached = self.cached_moderation(text)
+        if cached is not None:
+            return cached
+        response = self._call_api(
+            self.client.moderations,
+            MODERATION_MODEL,
+            _estimate_tokens(text),
             input=text,
-            model=MODERATION_MODEL,
         )
         categories = response.results[0].categories
         scores = response.results[0].category_scores
+        self.store_moderation(text, categories, scores)
         return categories, scores
 
+    def moderate_texts(
+        self, texts: list[str], batch_size: int | None = None
+    ) -> list[tuple[Any, Any]]:
+        """Moderate many texts with as few API requests as possible.
+
+        ``texts`` are sent to the moderation endpoint in chunks of
+        ``batch_size`` (default :data:`config.settings.MODERATION_BATCH_SIZE`)
+        and the ``(categories, category_scores)`` pairs are returned in input
+        order.
+        """
+        size = batch_size or MODERATION_BATCH_SIZE
+        results: list[tuple[Any, Any] | None] = [
+            self.cached_moderation(text) for text in texts
+        ]
+        missing = [i for i, r in enumerate(results) if r is None]
+        for start in range(0, len(missing), size):
+            positions = missing[start:start + size]
+            batch = [texts[i] for i in positions]
+            response = self._call_api(
+                self.client.moderations,
+                MODERATION_MODEL,
+                _estimate_tokens(*batch),
+                input=batch,
+            )
+            for i, item in zip(positions, response.results):
+                results[i] = (item.categories, item.category_scores)
+                self.store_moderation(
+                    texts[i], item.categories, item.category_scores
+                )
+        return results
+
+    def _chat_request(
+        self, system: str, user: str, max_tokens: int
+    ) -> dict[str, Any]:
+        return {
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": user},
+            ],
+            "temperature": self.temperature,
+            "top_p": self.top_p,
+            "max_tokens": max_tokens,
+            "response_format": {"type": "json_object"},
+        }
+
+    def score_request(self, text: str) -> dict[str, Any]:
+        """Return the chat completion parameters used to score ``text``.
+
+        The instructions are sent as a static system message and only the
+        user message carries the post, so every request shares the same
+        prefix for the API's prompt caching.  The reply is limited to
+        :data:`config.settings.AGGRESSION_MAX_TOKENS`.  The model name is
+        not included.
+        """
+        return self._chat_request(
+            AGGRESSION_SYSTEM_PROMPT,
+            AGGRESSION_USER_TEMPLATE.format(text=text),
+            AGGRESSION_MAX_TOKENS,
+        )
+
+    def packed_score_request(self, posts: dict[str, str]) -> dict[str, Any]:
+        """Return the chat completion parameters to score ``{id: text}``.
+
+        The output limit grows with the number of posts.
+        """
+        lines = "\n".join(
+            json.dumps({"id": key, "text": text}, ensure_ascii=False)
+            for key, text in posts.items()
+        )
+        return self._chat_request(
+            AGGRESSION_PACKED_SYSTEM_PROMPT,
+            AGGRESSION_PACKED_USER_TEMPLATE.format(posts=lines),
+            AGGRESSION_MAX_TOKENS * len(posts),
+        )
+
+    def _parse_score(
+        self, text: str, response: Any, attempt: int, max_retries: int
+    ) -> tuple[int, str] | None:
+        """Parse and cache a scoring reply; ``None`` if it is unusable."""
+        try:
+            parsed = _parse_score_response(
+                response.choices[0].message.content
+            )
+        except _PARSE_ERRORS as e:
+            parsed = None
+            problem = f"{type(e).__name__}: {e}"
+        else:
+            problem = "score out of range"
+        if parsed is None:
+            logging.warning(
+                "Unusable score reply (attempt %s/%s): %s",
+                attempt + 1,
+                max_retries,
+                problem,
+            )
+            return None
+        self.store_score(text, *parsed)
+        return parsed
+
     def get_aggressiveness_score(
-        self, text: str, max_retries: int = 3
+        self, text: str, max_retries: int = 3, use_cache: bool = True
     ) -> tuple[int | None, str | None]:
-        prompt = AGGRESSION_PROMPT_TEMPLATE.format(text=text)
+        """Score ``text``; return ``(None, None)`` if no reply is usable.
+
+        Only malformed or out-of-range replies are requested again, up to
+        ``max_retries`` times.  Throttling and server errors are already
+        retried by :meth:`_call_api`, and the error is raised once it gives
+        up.  With ``use_cache=False`` the cache is not read, for callers
+        that already looked the text up; the score is still stored.
+        """
+        cached = self.cached_score(text) if use_cache else None
+        if cached is not None:
+            return cached
+        request = self.score_request(text)
         for attempt in range(max_retries):
+            response = self._call_api(
+                self.client.chat.completions,
+                AGGRESSION_ANALYSIS_MODEL,
+                _request_tokens(request),
+                **request,
+            )
+            parsed = self._parse_score(text, response, attempt, max_retries)
+            if parsed is not None:
+                return parsed
+        return None, None
+
+    def get_aggressiveness_scores_packed(
+        self, texts: list[str], use_cache: bool = True, fallback: bool = True
+    ) -> list[tuple[int | None, str | None] | None]:
+        """Score several posts with a single chat completion.
+
+        The posts are numbered and sent together as built by
+        :meth:`packed_score_request`, which asks for a JSON array of
+        ``{id, score, reason}``.  Posts missing from the reply or given an
+        invalid score, or all of them if the reply cannot be parsed, are
+        retried individually with :meth:`get_aggressiveness_score`, or
+        returned as ``None`` without ``fallback``.  API errors are raised
+        without falling back.  Results are returned in input order.
+        ``use_cache`` works as for :meth:`get_aggressiveness_score`.
+        """
+        results: list[tuple[int | None, str | None] | None] = [
+            self.cached_score(text) if use_cache else None for text in texts
+        ]
+        missing = [i for i, r in enumerate(results) if r is None]
+        pending = {str(n): i for n, i in enumerate(missing)}
+        if len(pending) > 1:
+            request = self.packed_score_request(
+                {key: texts[i] for key, i in pending.items()}
+            )
+            response = self._call_api(
+                self.client.chat.completions,
+                AGGRESSION_ANALYSIS_MODEL,
+                _request_tokens(request),
+                **request,
+            )
             try:
-                response = self.client.chat.completions.create(
-                    model=AGGRESSION_ANALYSIS_MODEL,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=self.temperature,
-                    top_p=self.top_p,
-                    response_format={"type": "json_object"},
+                packed = _parse_packed_response(
+                    response.choices[0].message.content
                 )
-                data = json.loads(response.choices[0].message.content)
-                score = int(data.get("score"))
-                reason = str(data.get("reason"))
-                if 0 <= score <= 10:
-                    return score, reason
-            except Exception as e:
-                print(
-                    f"エラーが発生しました（試行 {attempt + 1}/{max_retries}）: {e}"
-                )
-            time.sleep(1)
+            except _PARSE_ERRORS as e:
+                logging.warning("Unusable packed score reply: %s", e)
+                packed = {}
+            for key, parsed in packed.items():
+                i = pending.get(key)
+                if i is not None and results[i] is None:
+                    results[i] = parsed
+                    self.store_score(texts[i], *parsed)
+        if not fallback and len(pending) > 1:
+            return results
+        return [
+            r if r is not None
+            else self.get_aggressiveness_score(text, use_cache=False)
+            for r, text in zip(results, texts)
+        ]
+
+    async def moderate_text_async(self, text: str) -> tuple[Any, Any]:
+        """Asynchronous counterpart of :meth:`moderate_text`."""
+        cached = self.cached_moderation(text)
+        if cached is not None:
+            return cached
+        response = await self._call_api_async(
+            self.async_client.moderations,
+            MODERATION_MODEL,
+            _estimate_tokens(text),
+            input=text,
+        )
+        categories = response.results[0].categories
+        scores = response.results[0].category_scores
+        self.store_moderation(text, categories, scores)
+        return categories, scores
+
+    async def get_aggressiveness_score_async(
+        self, text: str, max_retries: int = 3, use_cache: bool = True
+    ) -> tuple[int | None, str | None]:
+        """Asynchronous counterpart of :meth:`get_aggressiveness_score`."""
+        cached = self.cached_score(text) if use_cache else None
+        if cached is not None:
+            return cached
+        request = self.score_request(text)
+        for attempt in range(max_retries):
+            response = await self._call_api_async(
+                self.async_client.chat.completions,
+                AGGRESSION_ANALYSIS_MODEL,
+                _request_tokens(request),
+                **request,
+            )
+            parsed = self._parse_score(text, response, attempt, max_retries)
+            if parsed is not None:
+                return parsed
         return None, None
 
     def total_aggression(self, row: pd.Series) -> float:
         """Calculate a composite aggression score for a dataframe row.
 
+        Compatibility wrapper around :meth:`compute_total_aggression`; use
+        that method to score a whole DataFrame at once.
+        """
+
+        return float(self.compute_total_aggression(row.to_frame().T).iloc[0])
+
+    @staticmethod
+    def compute_total_aggression(df: pd.DataFrame) -> pd.Series:
+        """Calculate the composite aggression score for every row of ``df``.
+
         Each category score and flag is multiplied by a weight defined in
         :data:`config.settings.WEIGHTS`.  When a weight is not present, the
         original constant used by this project is applied as a default.
+        Missing columns, ``None`` and ``NaN`` values count as zero, and
+        flags count as one when truthy.
         """
 
-        return (
-            WEIGHTS.get("hate_score", 0.5) * row.get("hate_score", 0)
-            + WEIGHTS.get("hate/threatening_score", 0.3)
-            * row.get("hate/threatening_score", 0)
-            + WEIGHTS.get("violence_score", 0.3) * row.get("violence_score", 0)
-            + WEIGHTS.get("sexual_score", 0.1) * row.get("sexual_score", 0)
-            + WEIGHTS.get("sexual/minors_score", 0.1)
-            * row.get("sexual/minors_score", 0)
-            + WEIGHTS.get("aggressiveness_score", 0.5)
-            * (row.get("aggressiveness_score") or 0)
-            + WEIGHTS.get("hate_flag", 2.0)
-            * (1 if row.get("hate_flag") else 0)
-            + WEIGHTS.get("hate/threatening_flag", 1.0)
-            * (1 if row.get("hate/threatening_flag") else 0)
-            + WEIGHTS.get("violence_flag", 1.5)
-            * (1 if row.get("violence_flag") else 0)
-            + WEIGHTS.get("sexual_flag", 1.0)
-            * (1 if row.get("sexual_flag") else 0)
-        )
+        weights = {**DEFAULT_WEIGHTS, **WEIGHTS}
+        names = list(weights)
+        matrix = np.zeros((len(df), len(names)), dtype=np.float64)
+        for j, name in enumerate(names):
+            if name not in df.columns:
+                continue
+            column = df[name]
+            if name.endswith("_flag"):
+                matrix[:, j] = column.fillna(False).astype(bool).to_numpy()
+            else:
+                matrix[:, j] = (
+                    pd.to_numeric(column, errors="coerce")
+                    .fillna(0)
+                    .to_numpy(dtype=np.float64)
+                )
+        vector = np.array([weights[n] for n in names], dtype=np.float64)
+        return pd.Series(matrix @ vector, index=df.index, dtype=np.float64)
 
     def analyze_dataframe_in_parallel(
         self,
         df: pd.DataFrame,
         progress_callback: Optional[Callable[[int, int], None]] = None,
+        pack_size: int | None = None,
+        dedup: bool | None = None,
+        prefilter: bool | None = None,
+        cascade: bool | None = None,
+        budget: LLMBudget | None = None,
+        journal: ResultJournal | None = None,
+        result_callback: Optional[ResultCallback] = None,
     ) -> pd.DataFrame:
         """Analyze a DataFrame using parallel threads.
 
-        Each row is processed with :meth:`moderate_text` and
-        :meth:`get_aggressiveness_score`.  Results are merged back into the
-        original DataFrame. ``progress_callback`` is called after each row is
-        processed with the current completed count and total count.
+        The whole ``content`` column is first moderated with
+        :meth:`moderate_texts` in batches of
+        :data:`config.settings.MODERATION_BATCH_SIZE`, then each row is
+        scored with :meth:`get_aggressiveness_score`.  With ``pack_size``
+        (default :data:`config.settings.AGGRESSION_PACK_SIZE`) greater than
+        one, rows are scored ``pack_size`` at a time with
+        :meth:`get_aggressiveness_scores_packed` instead.  Results are joined
+        onto the input columns and returned as a new DataFrame.
+        ``progress_callback`` is called after each row is processed with the
+        current completed count and total count.
+
+        With ``dedup`` (default :data:`config.settings.DEDUP_ENABLED`) only
+        one post of each group of exact or near-duplicates found by
+        :func:`modules.dedup.find_duplicates` is sent to the API.  The other
+        members receive the same results, and the ``duplicate_of`` column
+        holds the URL of the analyzed post, or ``row:<index label>`` when it
+        has none (see :func:`modules.journal.row_keys`; ``None`` for the
+        analyzed posts themselves).  URLs stay valid when pages or chunks
+        analyzed separately are concatenated.
+
+        With ``prefilter`` (default :data:`config.settings.PREFILTER_ENABLED`)
+        posts that :func:`modules.prefilter.prefilter` finds low risk are not
+        sent to the API at all; they get zero scores and are marked in the
+        ``prefiltered`` column.
+
+        With ``cascade`` (default :data:`config.settings.CASCADE_ENABLED`)
+        only posts whose moderation result is riskier than
+        :data:`config.settings.CASCADE_THRESHOLD` are scored, highest risk
+        first.  ``budget`` (default from
+        :data:`config.settings.LLM_BUDGET_REQUESTS` and
+        :data:`config.settings.LLM_BUDGET_TOKENS`) caps the scoring requests
+        of the run; once it is spent the remaining posts are not scored.
+        Posts that are not scored keep their moderation results and a
+        missing ``aggressiveness_score``, which ``total_aggression`` counts
+        as zero.  When either option is active a ``scoring_status`` column
+        tells ``scored``, ``failed``, ``below_threshold``, ``over_budget``
+        and ``prefiltered`` rows apart.
+
+        With a ``journal`` every finished row is written to it as soon as it
+        completes, keyed by post URL (see :func:`modules.journal.row_keys`),
+        and rows already in the journal are taken from it instead of being
+        analyzed again, so an interrupted run can be resumed.
+
+        ``result_callback`` is called with the index label and the result
+        dict of every row as soon as that row is finished (rows taken from
+        the journal or the prefilter first, duplicates together with their
+        representative), so callers can show results before the whole
+        DataFrame is done.  Like ``progress_callback`` it runs on the
+        calling thread.
         """
 
         from concurrent.futures import ThreadPoolExecutor, as_completed
 
-        category_names = [
-            "hate",
-            "hate/threatening",
-            "self-harm",
-            "sexual",
-            "sexual/minors",
-            "violence",
-            "violence/graphic",
+        def process_chunk(
+            chunk: list[tuple[Any, str, tuple[Any, Any] | None]]
+        ) -> list[tuple[Any, dict[str, Any]]]:
+            out = [(i, _empty_result()) for i, _, m in chunk if m is None]
+            live = [(i, t, m) for i, t, m in chunk if m is not None]
+            if not live:
+                return out
+            # _plan_scoring already took the cached scores and charged the
+            # budget for this chunk's first request.
+            try:
+                if len(live) == 1:
+                    scored = [
+                        self.get_aggressiveness_score(
+                            live[0][1], use_cache=False
+                        )
+                    ]
+                else:
+                    scored = self.get_aggressiveness_scores_packed(
+                        [t for _, t, _ in live],
+                        use_cache=False,
+                        fallback=budget is None,
+                    )
+            except Exception:
+                logging.exception(
+                    "Failed to process rows %s", [i for i, _, _ in live]
+                )
+                return out + [
+                    (i, _unscored_result(*moderation, "failed"))
+                    for i, _, moderation in live
+                ]
+            for (index, text, (categories, scores)), parsed in zip(
+                live, scored
+            ):
+                if parsed is None:
+                    # Posts the packed reply missed cost one more request.
+                    request = self.score_request(text)
+                    if not budget.try_spend(_request_tokens(request)):
+                        out.append((index, _unscored_result(
+                            categories, scores, "over_budget"
+                        )))
+                        continue
+                    try:
+                        parsed = self.get_aggressiveness_score(
+                            text, use_cache=False
+                        )
+                    except Exception:
+                        logging.exception("Failed to process row %s", index)
+                        out.append((index, _unscored_result(
+                            categories, scores, "failed"
+                        )))
+                        continue
+                out.append(
+                    (index, _build_result(categories, scores, *parsed))
+                )
+            return out
+
+        started = time.perf_counter()
+        run = self._start_run(
+            df, progress_callback, dedup, prefilter, journal, result_callback
+        )
+        texts = run.texts
+        cascade = CASCADE_ENABLED if cascade is None else cascade
+        budget = budget if budget is not None else default_budget()
+        size = max(1, pack_size or AGGRESSION_PACK_SIZE)
+        try:
+            with ThreadPoolExecutor(
+                max_workers=MAX_CONCURRENT_WORKERS
+            ) as executor:
+                moderations = self._moderate_series(texts, executor)
+                rows = [(i, t, moderations.get(i)) for i, t in texts.items()]
+                chunks, skipped = self._plan_scoring(
+                    rows, cascade, budget, size
+                )
+                for index, data in skipped.items():
+                    run.record(index, data)
+                futures = [
+                    executor.submit(process_chunk, chunk) for chunk in chunks
+                ]
+                for future in as_completed(futures):
+                    for index, data in future.result():
+                        run.record(index, data)
+        finally:
+            if journal is not None:
+                journal.flush()
+            self.metrics.add_stage("analyze", time.perf_counter() - started)
+
+        with self.metrics.stage("merge"):
+            return self.merge_results(
+                df,
+                run.results,
+                run.duplicate_of,
+                run.prefiltered,
+                with_status=cascade or budget is not None,
+            )
+
+    def _start_run(
+        self,
+        df: pd.DataFrame,
+        progress_callback: Optional[Callable[[int, int], None]],
+        dedup: bool | None,
+        prefilter: bool | None,
+        journal: ResultJournal | None,
+        result_callback: Optional[ResultCallback] = None,
+    ) -> _RunState:
+        """Take finished rows from ``journal``, then prefilter and dedup.
+
+        The returned state holds the results known so far and, in
+        ``texts``, the rows that still have to be sent to the API.
+        """
+
+        keys = row_keys(df) if journal is not None else None
+        run = _RunState(
+            len(df), progress_callback, journal, keys, result_callback
+        )
+        remaining = df
+        if journal is not None and keys is not None:
+            done = journal.lookup(keys)
+            journaled = keys.isin(list(done)).to_numpy()
+            for index in keys.index[journaled]:
+                run.results[index] = done[keys[index]]
+            remaining = df[~journaled]
+        run.prefiltered = self._prefilter(remaining, prefilter)
+        run.results.update(self._prefiltered_results(run.prefiltered))
+        if run.prefiltered is not None:
+            remaining = remaining[~run.prefiltered.to_numpy()]
+        run.texts, run.duplicate_of = self._deduplicate(remaining, dedup)
+        if run.duplicate_of is not None:
+            for index, representative in run.duplicate_of.dropna().items():
+                run.members.setdefault(representative, []).append(index)
+        run.completed = len(run.results)
+        if result_callback:
+            for index, data in run.results.items():
+                result_callback(index, data)
+        if run.completed and progress_callback:
+            progress_callback(run.completed, run.total)
+        return run
+
+    def _plan_scoring(
+        self,
+        rows: list[tuple[Any, str, tuple[Any, Any] | None]],
+        cascade: bool,
+        budget: LLMBudget | None,
+        size: int,
+    ) -> tuple[
+        list[list[tuple[Any, str, tuple[Any, Any]]]], dict[Any, dict[str, Any]]
+    ]:
+        """Split moderated ``rows`` into chunks to score and settled rows.
+
+        Rows whose moderation failed get the result of a failed row.  With
+        ``cascade``, rows not riskier than
+        :data:`config.settings.CASCADE_THRESHOLD` are skipped and the rest
+        are ordered by descending risk.  Rows with a cached score are
+        settled from the cache here, the only lookup of the run, and cost
+        nothing.  The others are split into chunks of ``size`` rows.  With
+        a ``budget``, chunks are admitted in order, each charged with the
+        request that scores it (a packed request for several rows), until
+        the budget refuses one; that chunk and all later rows are skipped.
+        Skipped rows keep their moderation results.
+        """
+
+        settled: dict[Any, dict[str, Any]] = {}
+        live: list[tuple[Any, str, tuple[Any, Any]]] = []
+        for index, text, moderation in rows:
+            if moderation is None:
+                settled[index] = _empty_result()
+            else:
+                live.append((index, text, moderation))
+
+        def skip(row: tuple[Any, str, tuple[Any, Any]], status: str) -> None:
+            settled[row[0]] = _unscored_result(*row[2], status)
+
+        if cascade:
+            risks = {row[0]: _moderation_risk(*row[2]) for row in live}
+            live.sort(key=lambda row: risks[row[0]], reverse=True)
+            for row in live:
+                if risks[row[0]] <= CASCADE_THRESHOLD:
+                    skip(row, "below_threshold")
+            live = [row for row in live if risks[row[0]] > CASCADE_THRESHOLD]
+
+        uncached = []
+        for row in live:
+            cached = self.cached_score(row[1])
+            if cached is None:
+                uncached.append(row)
+            else:
+                settled[row[0]] = _build_result(*row[2], *cached)
+        chunks = [
+            uncached[start:start + size]
+            for start in range(0, len(uncached), size)
         ]
+        if budget is None:
+            return chunks, settled
+        for position, chunk in enumerate(chunks):
+            if len(chunk) == 1:
+                request = self.score_request(chunk[0][1])
+            else:
+                request = self.packed_score_request(
+                    {str(n): text for n, (_, text, _) in enumerate(chunk)}
+                )
+            if not budget.try_spend(_request_tokens(request)):
+                for rest in chunks[position:]:
+                    for row in rest:
+                        skip(row, "over_budget")
+                return chunks[:position], settled
+        return chunks, settled
+
+    @staticmethod
+    def _prefilter(
+        df: pd.DataFrame, prefilter: bool | None
+    ) -> pd.Series | None:
+        """Return the prefilter mask, or ``None`` when prefiltering is off."""
+
+        if not (PREFILTER_ENABLED if prefilter is None else prefilter):
+            return None
+        return run_prefilter(df["content"])
+
+    @staticmethod
+    def _prefiltered_results(
+        prefiltered: pd.Series | None,
+    ) -> dict[Any, dict[str, Any]]:
+        if prefiltered is None:
+            return {}
+        return {
+            index: _prefiltered_result()
+            for index in prefiltered.index[prefiltered.to_numpy()]
+        }
 
-        def process_row(index: int, text: str) -> tuple[int, dict[str, Any]]:
+    @staticmethod
+    def _deduplicate(
+        df: pd.DataFrame, dedup: bool | None
+    ) -> tuple[pd.Series, pd.Series | None]:
+        """Return the texts to analyze and the duplicate map.
+
+        Without deduplication every text is analyzed and the map is ``None``.
+        Otherwise only cluster representatives are returned, together with
+        the ``duplicate_of`` series.  Missing or non-string contents (NaN
+        from empty CSV cells) are analyzed as ``""``.
+        """
+
+        texts = df["content"].map(lambda v: v if isinstance(v, str) else "")
+        if not (DEDUP_ENABLED if dedup is None else dedup):
+            return texts, None
+        duplicate_of = find_duplicates(texts)
+        return texts[duplicate_of.isna()], duplicate_of
+
+    def _moderate_series(
+        self, texts: pd.Series, executor: Any
+    ) -> dict[Any, tuple[Any, Any] | None]:
+        """Moderate ``texts`` in batches, keyed by their index labels.
+
+        Batches are submitted to ``executor`` concurrently.  When a batch
+        request fails, its texts are retried one by one with
+        :meth:`moderate_text` so a single bad input does not blank the whole
+        batch; rows that still fail map to ``None``.
+        """
+
+        def moderate_batch(
+            labels: list[Any], batch: list[str]
+        ) -> dict[Any, tuple[Any, Any] | None]:
             try:
-                categories, scores = self.moderate_text(text)
-                score, reason = self.get_aggressiveness_score(text)
+                return dict(zip(labels, self.moderate_texts(batch)))
             except Exception:
-                logging.exception("Failed to process row %s", index)
-                result: dict[str, Any] = {
-                    "aggressiveness_score": None,
-                    "aggressiveness_reason": None,
-                }
-                for name in category_names:
-                    result[f"{name}_flag"] = False
-                    result[f"{name}_score"] = 0.0
-                return index, result
-
-            result: dict[str, Any] = {
-                "aggressiveness_score": score,
-                "aggressiveness_reason": reason,
-            }
-            for name in category_names:
-                flag = getattr(categories, name.replace("/", "_"), False)
-                sc = getattr(scores, name.replace("/", "_"), 0.0)
-                result[f"{name}_flag"] = flag
-                result[f"{name}_score"] = sc
-            return index, result
-
-        results: dict[int, dict[str, Any]] = {}
-        total = len(df)
-        completed = 0
-        with ThreadPoolExecutor(
-            max_workers=MAX_CONCURRENT_WORKERS
-        ) as executor:
-            futures = {
-                executor.submit(process_row, i, row["content"]): i
-                for i, row in df.iterrows()
-            }
-            for future in as_completed(futures):
-                index, data = future.result()
-                results[index] = data
-                completed += 1
-                if progress_callback:
-                    progress_callback(completed, total)
-
-        for index, data in results.items():
-            for key, value in data.items():
-                df.loc[index, key] = value
-        df["total_aggression"] = df.apply(self.total_aggression, axis=1)
-        return df
+                logging.exception(
+                    "Batch moderation failed; retrying %s texts singly",
+                    len(batch),
+                )
+            out: dict[Any, tuple[Any, Any] | None] = {}
+            for label, text in zip(labels, batch):
+                try:
+                    out[label] = self.moderate_text(text)
+                except Exception:
+                    logging.exception("Failed to process row %s", label)
+                    out[label] = None
+            return out
+
+        labels = list(texts.index)
+        values = list(texts)
+        size = MODERATION_BATCH_SIZE
+        futures = [
+            executor.submit(
+                moderate_batch,
+                labels[start:start + size],
+                values[start:start + size],
+            )
+            for start in range(0, len(values), size)
+        ]
+        moderations: dict[Any, tuple[Any, Any] | None] = {}
+        for future in futures:
+            moderations.update(future.result())
+        return moderations
+
+    async def analyze_dataframe_async(
+        self,
+        df: pd.DataFrame,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        max_concurrency: int | None = None,
+        dedup: bool | None = None,
+        prefilter: bool | None = None,
+        cascade: bool | None = None,
+        budget: LLMBudget | None = None,
+        journal: ResultJournal | None = None,
+        result_callback: Optional[ResultCallback] = None,
+    ) -> pd.DataFrame:
+        """Analyze a DataFrame on a single asyncio event loop.
+
+        Produces the same columns as :meth:`analyze_dataframe_in_parallel`,
+        handles ``dedup``, ``prefilter``, ``cascade``, ``budget`` and
+        ``journal`` and calls ``progress_callback`` and ``result_callback``
+        the same way, but keeps up to ``max_concurrency`` rows (default
+        :data:`config.settings.MAX_CONCURRENT_REQUESTS`) in flight without
+        spawning a thread per request.
+        """
+
+        semaphore = asyncio.Semaphore(
+            max_concurrency or MAX_CONCURRENT_REQUESTS
+        )
+
+        async def process_row(
+            index: int, text: str
+        ) -> tuple[int, dict[str, Any]]:
+            async with semaphore:
+                try:
+                    categories, scores = await self.moderate_text_async(text)
+                except Exception:
+                    logging.exception("Failed to process row %s", index)
+                    return index, _empty_result()
+                try:
+                    score, reason = await self.get_aggressiveness_score_async(
+                        text
+                    )
+                except Exception:
+                    logging.exception("Failed to process row %s", index)
+                    return index, _unscored_result(
+                        categories, scores, "failed"
+                    )
+            return index, _build_result(categories, scores, score, reason)
+
+        async def moderate_row(
+            index: int, text: str
+        ) -> tuple[int, tuple[Any, Any] | None]:
+            async with semaphore:
+                try:
+                    return index, await self.moderate_text_async(text)
+                except Exception:
+                    logging.exception("Failed to process row %s", index)
+                    return index, None
+
+        async def score_row(
+            index: int, text: str, moderation: tuple[Any, Any]
+        ) -> tuple[int, dict[str, Any]]:
+            async with semaphore:
+                try:
+                    # _plan_scoring already took the cached scores.
+                    score, reason = await self.get_aggressiveness_score_async(
+                        text, use_cache=False
+                    )
+                except Exception:
+                    logging.exception("Failed to process row %s", index)
+                    return index, _unscored_result(*moderation, "failed")
+            return index, _build_result(*moderation, score, reason)
+
+        started = time.perf_counter()
+        run = self._start_run(
+            df, progress_callback, dedup, prefilter, journal, result_callback
+        )
+        texts = run.texts
+        record = run.record
+        cascade = CASCADE_ENABLED if cascade is None else cascade
+        budget = budget if budget is not None else default_budget()
+        staged = cascade or budget is not None
+        try:
+            if staged:
+                moderations = dict(
+                    await asyncio.gather(
+                        *(moderate_row(i, text) for i, text in texts.items())
+                    )
+                )
+                chunks, skipped = self._plan_scoring(
+                    [(i, t, moderations[i]) for i, t in texts.items()],
+                    cascade,
+                    budget,
+                    1,
+                )
+                for index, data in skipped.items():
+                    record(index, data)
+                tasks = [
+                    asyncio.ensure_future(score_row(*row))
+                    for chunk in chunks
+                    for row in chunk
+                ]
+            else:
+                tasks = [
+                    asyncio.ensure_future(process_row(i, text))
+                    for i, text in texts.items()
+                ]
+            for next_done in asyncio.as_completed(tasks):
+                record(*await next_done)
+        finally:
+            if journal is not None:
+                journal.flush()
+            if self._async_client is not None:
+                await self._async_client.close()
+                self._async_client = None
+            self.metrics.add_stage("analyze", time.perf_counter() - started)
+
+        with self.metrics.stage("merge"):
+            return self.merge_results(
+                df,
+                run.results,
+                run.duplicate_of,
+                run.prefiltered,
+                with_status=staged,
+            )
+
+    def analyze_dataframe_with_asyncio(
+        self,
+        df: pd.DataFrame,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        max_concurrency: int | None = None,
+        dedup: bool | None = None,
+        prefilter: bool | None = None,
+        cascade: bool | None = None,
+        budget: LLMBudget | None = None,
+        journal: ResultJournal | None = None,
+        result_callback: Optional[ResultCallback] = None,
+    ) -> pd.DataFrame:
+        """Blocking wrapper around :meth:`analyze_dataframe_async`.
+
+        Drop-in replacement for :meth:`analyze_dataframe_in_parallel` for
+        callers without a running event loop, such as the GUI worker thread.
+        """
+
+        return asyncio.run(
+            self.analyze_dataframe_async(
+                df,
+                progress_callback,
+                max_concurrency,
+                dedup,
+                prefilter,
+                cascade,
+                budget,
+                journal,
+                result_callback,
+            )
+        )
+
+    def merge_results(
+        self,
+        df: pd.DataFrame,
+        results: dict[int, dict[str, Any]],
+        duplicate_of: pd.Series | None = None,
+        prefiltered: pd.Series | None = None,
+        with_status: bool = False,
+    ) -> pd.DataFrame:
+        """Join per-row ``results`` onto ``df`` in one operation and score it.
+
+        Results are gathered column by column with explicit dtypes (bool
+        flags, float32 scores, nullable Int8 ``aggressiveness_score``) and
+        concatenated to ``df`` at once instead of being written cell by
+        cell.  Rows without a result get the values of a failed row.  When
+        ``duplicate_of`` is given, duplicates take the results of their
+        representative and the representative's :func:`row_keys` key is added
+        as the ``duplicate_of`` column (``None`` for rows that were not
+        deduplicated); ``prefiltered`` is
+        added as the ``prefiltered`` column.  With ``with_status`` the
+        ``scoring_status`` column is added from the results' own status or,
+        when they have none, from whether a score was obtained.
+        """
+
+        empty = _empty_result()
+        if duplicate_of is not None:
+            results = dict(results)
+            for index, representative in duplicate_of.dropna().items():
+                results[index] = results.get(representative, empty)
+        rows = [results.get(label, empty) for label in df.index]
+        columns: dict[str, Any] = {}
+        for name in RESULT_COLUMNS:
+            values = [row.get(name) for row in rows]
+            if name.endswith("_flag"):
+                columns[name] = np.array(
+                    [bool(v) for v in values], dtype=bool
+                )
+            elif name == "aggressiveness_score":
+                columns[name] = pd.array(values, dtype="Int8")
+            elif name.endswith("_score"):
+                columns[name] = np.array(
+                    [np.nan if v is None else v for v in values],
+                    dtype=np.float32,
+                )
+            else:
+                columns[name] = values
+        merged = pd.concat(
+            [
+                df.drop(columns=RESULT_COLUMNS, errors="ignore"),
+                pd.DataFrame(columns, index=df.index),
+            ],
+            axis=1,
+        )
+        if duplicate_of is not None:
+            keys = row_keys(df)
+            merged["duplicate_of"] = pd.Series(
+                [
+                    None if pd.isna(representative) else keys[representative]
+                    for representative in duplicate_of.reindex(df.index)
+                ],
+                index=df.index,
+                dtype=object,
+            )
+        if prefiltered is not None:
+            merged["prefiltered"] = prefiltered.reindex(
+                df.index, fill_value=False
+            )
+        if with_status:
+            merged["scoring_status"] = [
+                row.get(
+                    "scoring_status",
+                    "failed" if row["aggressiveness_score"] is None
+                    else "scored",
+                )
+                for row in rows
+            ]
+        merged["total_aggression"] = self.compute_total_aggression(merged)
+        return merged
@@ -0,0 +1,214 @@
+"""Concurrent Wayback Machine archiving with a persistent registry."""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.settings import (
+    ARCHIVE_BACKOFF_BASE,
+    ARCHIVE_BACKOFF_MAX,
+    ARCHIVE_ENDPOINT,
+    ARCHIVE_MAX_RETRIES,
+    ARCHIVE_MAX_WORKERS,
+    ARCHIVE_REGISTRY_PATH,
+    ARCHIVE_REQUESTS_PER_MINUTE,
+    ARCHIVE_TIMEOUT,
+)
+from modules.ratelimit import RateLimiter
+
+# Statuses passed to the ``status_callback`` of :meth:`Archiver.archive_many`.
+ARCHIVING = "archiving"
+ARCHIVED = "archived"
+REGISTERED = "registered"
+FAILED = "failed"
+
+_RETRY_STATUS = {429, 500, 502, 503, 504, 520, 523}
+
+
+class ArchiveRegistry:
+    """Remember which URLs already have a snapshot.
+
+    Entries are kept in a small SQLite database so URLs archived in earlier
+    sessions are never submitted again.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS archives ("
+            " url TEXT PRIMARY KEY,"
+            " archive_url TEXT NOT NULL,"
+            " archived_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, url: str) -> str | None:
+        """Return the snapshot URL recorded for ``url``, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT archive_url FROM archives WHERE url = ?", (url,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, url: str, archive_url: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO archives"
+                " (url, archive_url, archived_at) VALUES (?, ?, ?)",
+                (url, archive_url, time.time()),
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM archives"
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class Archiver:
+    """Submit URLs to the Wayback Machine's Save Page Now endpoint.
+
+    Requests share one pooled :class:`requests.Session` and are sent by at
+    most ``max_workers`` threads, paced to ``requests_per_minute`` by a
+    :class:`modules.ratelimit.RateLimiter` that also honours
+    ``Retry-After``.  Throttled, failed (5xx) and timed-out requests are
+    retried up to ``max_retries`` times with exponential backoff.  URLs
+    found in ``registry`` are returned without contacting the server, and
+    new snapshots are added to it.
+    """
+
+    def __init__(
+        self,
+        registry: ArchiveRegistry | None = None,
+        endpoint: str = ARCHIVE_ENDPOINT,
+        max_workers: int = ARCHIVE_MAX_WORKERS,
+        requests_per_minute: float = ARCHIVE_REQUESTS_PER_MINUTE,
+        max_retries: int = ARCHIVE_MAX_RETRIES,
+        timeout: float = ARCHIVE_TIMEOUT,
+        backoff_base: float = ARCHIVE_BACKOFF_BASE,
+        backoff_max: float = ARCHIVE_BACKOFF_MAX,
+    ) -> None:
+        self.registry = registry
+        self.endpoint = endpoint.rstrip("/")
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(
+            {self.endpoint: {"requests": requests_per_minute, "tokens": 1}},
+            backoff_base=backoff_base,
+            backoff_max=backoff_max,
+        )
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.max_workers
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _submit(self, url: str) -> str:
+        """Send one save request, retrying transient failures."""
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire(self.endpoint)
+            retry_after = None
+            try:
+                response = self.session.get(
+                    f"{self.endpoint}/save/{url}",
+                    timeout=self.timeout,
+                    allow_redirects=False,
+                )
+            except requests.RequestException as e:
+                logging.warning("archive error for %s: %s", url, e)
+            else:
+                location = response.headers.get(
+                    "Content-Location"
+                ) or response.headers.get("Location", "")
+                if response.status_code in (200, 302) and location:
+                    if location.startswith("/"):
+                        location = self.endpoint + location
+                    return location
+                if response.status_code not in _RETRY_STATUS:
+                    logging.warning(
+                        "archive of %s failed with HTTP %s",
+                        url,
+                        response.status_code,
+                    )
+                    return ""
+                retry_after = self.rate_limiter.update_from_headers(
+                    self.endpoint, response.headers
+                )
+            if attempt < self.max_retries:
+                time.sleep(self.rate_limiter.backoff(attempt, retry_after))
+        return ""
+
+    def archive(self, url: str) -> str:
+        """Return a snapshot URL for ``url``, or ``""`` if none was made."""
+        if self.registry is not None:
+            known = self.registry.get(url)
+            if known:
+                return known
+        archive = self._submit(url)
+        if archive and self.registry is not None:
+            self.registry.set(url, archive)
+        return archive
+
+    def archive_many(
+        self,
+        urls: Iterable[str],
+        status_callback: Optional[Callable[[str, str], None]] = None,
+    ) -> dict[str, str]:
+        """Archive ``urls`` concurrently; return ``{url: snapshot URL}``.
+
+        Each URL is submitted once even if it is listed several times.
+        ``status_callback`` is called from the worker threads with the URL
+        and one of :data:`ARCHIVING`, :data:`ARCHIVED`, :data:`REGISTERED`
+        (already in the registry) or :data:`FAILED`.
+        """
+
+        def notify(url: str, status: str) -> None:
+            if status_callback:
+                status_callback(url, status)
+
+        def run(url: str) -> tuple[str, str]:
+            if self.registry is not None:
+                known = self.registry.get(url)
+                if known:
+                    notify(url, REGISTERED)
+                    return url, known
+            notify(url, ARCHIVING)
+            try:
+                archive = self.archive(url)
+            except Exception:
+                logging.exception("archive of %s failed", url)
+                archive = ""
+            notify(url, ARCHIVED if archive else FAILED)
+            return url, archive
+
+        unique = list(dict.fromkeys(urls))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(executor.map(run, unique))
+
+    def close(self) -> None:
+        self.session.close()
+        if self.registry is not None:
+            self.registry.close()
+
+
+def default_archiver() -> Archiver:
+    """Return an :class:`Archiver` using the configured registry file."""
+    return Archiver(ArchiveRegistry(ARCHIVE_REGISTRY_PATH))
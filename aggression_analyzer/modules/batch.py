@@ -0,0 +1,350 @@
+"""Offline bulk analysis through the OpenAI Batch API."""
+
+import json
+import os
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Any, Iterator
+
+import pandas as pd
+
+from config.settings import (
+    AGGRESSION_ANALYSIS_MODEL,
+    BATCH_COMPLETION_WINDOW,
+    BATCH_MAX_FILE_BYTES,
+    BATCH_MAX_REQUESTS,
+    BATCH_POLL_SECONDS,
+    BATCH_STATE_DIR,
+    MODERATION_BATCH_SIZE,
+    MODERATION_MODEL,
+)
+from modules.analyzer import (
+    PROMPT_VERSION,
+    Analyzer,
+    _build_result,
+    _empty_result,
+    _parse_score_response,
+)
+
+# Batch job states reported by the API once no more work will happen.
+FINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+
+_ENDPOINTS = {
+    "moderation": "/v1/moderations",
+    "aggressiveness": "/v1/chat/completions",
+}
+
+
+def _split_lines(
+    lines: list[str], max_requests: int, max_bytes: int
+) -> list[list[str]]:
+    """Split encoded JSONL ``lines`` into files within the batch limits."""
+    files: list[list[str]] = []
+    current: list[str] = []
+    size = 0
+    for line in lines:
+        length = len(line.encode("utf-8"))
+        if current and (
+            len(current) >= max_requests or size + length > max_bytes
+        ):
+            files.append(current)
+            current, size = [], 0
+        current.append(line)
+        size += length
+    if current:
+        files.append(current)
+    return files
+
+
+class BatchRunner:
+    """Analyze a DataFrame with OpenAI batch jobs instead of live calls.
+
+    :meth:`submit` writes the moderation and chat completion requests to
+    JSONL files, uploads them and starts one batch job per file.  Files
+    are split to stay within :data:`config.settings.BATCH_MAX_REQUESTS`
+    requests and :data:`config.settings.BATCH_MAX_FILE_BYTES` bytes, and
+    moderation requests carry up to
+    :data:`config.settings.MODERATION_BATCH_SIZE` inputs each, like the
+    live analysis.  The input frame and job ids are saved under
+    ``state_dir/<name>`` so that :meth:`collect` can be called later, even
+    from a new process; use :meth:`pending_jobs` to find unfinished runs.
+    Rows already present in the analyzer's result cache are not
+    resubmitted.  The prompt version is saved with the job, so scores
+    collected after the prompts changed keep the version they were made
+    with and are not cached under the new one.
+    """
+
+    def __init__(
+        self, analyzer: Analyzer, state_dir: str = BATCH_STATE_DIR
+    ) -> None:
+        self.analyzer = analyzer
+        self.client = analyzer.client
+        self.state_dir = state_dir
+
+    def _job_dir(self, name: str) -> str:
+        return os.path.join(self.state_dir, name)
+
+    def _load_state(self, name: str) -> dict[str, Any]:
+        with open(
+            os.path.join(self._job_dir(name), "state.json"), encoding="utf-8"
+        ) as f:
+            return json.load(f)
+
+    def _save_state(self, state: dict[str, Any]) -> None:
+        path = os.path.join(self._job_dir(state["name"]), "state.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+    def _requests(
+        self, df: pd.DataFrame
+    ) -> tuple[dict[str, list[dict[str, Any]]], list[list[int]]]:
+        """Return the requests per kind and the rows of each moderation.
+
+        Moderation request ``n`` (custom id ``moderation-<n>``) covers the
+        row positions in the ``n``-th list.
+        """
+        requests: dict[str, list[dict[str, Any]]] = {
+            "moderation": [],
+            "aggressiveness": [],
+        }
+        unmoderated: list[int] = []
+        texts = list(df["content"])
+        for pos, text in enumerate(texts):
+            if self.analyzer.cached_moderation(text) is None:
+                unmoderated.append(pos)
+            if self.analyzer.cached_score(text) is None:
+                body = self.analyzer.score_request(text)
+                body["model"] = AGGRESSION_ANALYSIS_MODEL
+                requests["aggressiveness"].append({
+                    "custom_id": f"aggressiveness-{pos}",
+                    "method": "POST",
+                    "url": _ENDPOINTS["aggressiveness"],
+                    "body": body,
+                })
+        groups = [
+            unmoderated[start:start + MODERATION_BATCH_SIZE]
+            for start in range(0, len(unmoderated), MODERATION_BATCH_SIZE)
+        ]
+        for n, group in enumerate(groups):
+            requests["moderation"].append({
+                "custom_id": f"moderation-{n}",
+                "method": "POST",
+                "url": _ENDPOINTS["moderation"],
+                "body": {
+                    "model": MODERATION_MODEL,
+                    "input": [texts[pos] for pos in group],
+                },
+            })
+        return requests, groups
+
+    def submit(self, df: pd.DataFrame, name: str | None = None) -> str:
+        """Upload batch jobs for ``df`` and return the job name."""
+        name = name or time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        job_dir = self._job_dir(name)
+        os.makedirs(job_dir, exist_ok=True)
+        df.to_pickle(os.path.join(job_dir, "input.pkl"))
+        requests, groups = self._requests(df)
+        with open(
+            os.path.join(job_dir, "moderation_groups.json"),
+            "w",
+            encoding="utf-8",
+        ) as f:
+            json.dump(groups, f)
+        state: dict[str, Any] = {
+            "name": name,
+            "created_at": time.time(),
+            "collected": False,
+            "prompt_version": PROMPT_VERSION,
+            "batches": {kind: [] for kind in requests},
+        }
+        for kind, lines in requests.items():
+            encoded = [
+                json.dumps(line, ensure_ascii=False) + "\n" for line in lines
+            ]
+            files = _split_lines(
+                encoded, BATCH_MAX_REQUESTS, BATCH_MAX_FILE_BYTES
+            )
+            for n, part in enumerate(files):
+                path = os.path.join(job_dir, f"{kind}-{n}.jsonl")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.writelines(part)
+                with open(path, "rb") as f:
+                    uploaded = self.client.files.create(
+                        file=f, purpose="batch"
+                    )
+                batch = self.client.batches.create(
+                    input_file_id=uploaded.id,
+                    endpoint=_ENDPOINTS[kind],
+                    completion_window=BATCH_COMPLETION_WINDOW,
+                )
+                state["batches"][kind].append(
+                    {"id": batch.id, "status": batch.status}
+                )
+                # Saved after every batch so none is orphaned by a failure.
+                self._save_state(state)
+        self._save_state(state)
+        return name
+
+    def pending_jobs(self) -> list[str]:
+        """Return the names of submitted jobs not yet collected."""
+        if not os.path.isdir(self.state_dir):
+            return []
+        names = []
+        for name in sorted(os.listdir(self.state_dir)):
+            try:
+                if not self._load_state(name)["collected"]:
+                    names.append(name)
+            except (OSError, ValueError, KeyError):
+                continue
+        return names
+
+    def status(self, name: str) -> dict[str, Any]:
+        """Refresh and return the persisted state of job ``name``."""
+        state = self._load_state(name)
+        for info in _all_batches(state):
+            if info["status"] in FINAL_STATES:
+                continue
+            batch = self.client.batches.retrieve(info["id"])
+            info["status"] = batch.status
+            info["output_file_id"] = getattr(batch, "output_file_id", None)
+            info["error_file_id"] = getattr(batch, "error_file_id", None)
+        self._save_state(state)
+        return state
+
+    def is_finished(self, name: str) -> bool:
+        state = self.status(name)
+        return all(
+            info["status"] in FINAL_STATES for info in _all_batches(state)
+        )
+
+    def wait(
+        self,
+        name: str,
+        poll_interval: float = BATCH_POLL_SECONDS,
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
+        """Poll job ``name`` until every batch reaches a final state."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.is_finished(name):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"batch job {name} is still running")
+            time.sleep(poll_interval)
+        return self._load_state(name)
+
+    def _iter_output(self, file_id: str | None) -> Iterator[dict[str, Any]]:
+        if not file_id:
+            return
+        with self.client.files.with_streaming_response.content(
+            file_id
+        ) as response:
+            for line in response.iter_lines():
+                if line.strip():
+                    yield json.loads(line)
+
+    def _iter_outputs(
+        self, batches: list[dict[str, Any]]
+    ) -> Iterator[dict[str, Any]]:
+        for info in batches:
+            yield from self._iter_output(info.get("output_file_id"))
+
+    def _moderation_groups(self, name: str) -> list[list[int]]:
+        """Return the rows of each moderation request of job ``name``."""
+        path = os.path.join(self._job_dir(name), "moderation_groups.json")
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def collect(self, name: str) -> pd.DataFrame:
+        """Merge the output of finished job ``name`` into its DataFrame.
+
+        Produces the same columns as
+        :meth:`Analyzer.analyze_dataframe_in_parallel`.  Results are also
+        written to the analyzer's cache.  Rows whose requests failed get the
+        values of a failed row.
+        """
+        state = self.status(name)
+        if not all(
+            info["status"] in FINAL_STATES for info in _all_batches(state)
+        ):
+            raise RuntimeError(f"batch job {name} has not finished")
+        df = pd.read_pickle(os.path.join(self._job_dir(name), "input.pkl"))
+        texts = list(df["content"])
+        groups = self._moderation_groups(name)
+        version = state.get("prompt_version", PROMPT_VERSION)
+        moderations: dict[int, tuple[Any, Any]] = {}
+        scores: dict[int, tuple[int, str]] = {}
+        for kind, batches in state["batches"].items():
+            for item in self._iter_outputs(batches):
+                n = int(item["custom_id"].rsplit("-", 1)[1])
+                response = item.get("response") or {}
+                if response.get("status_code") != 200:
+                    continue
+                body = response["body"]
+                if kind == "moderation":
+                    for pos, result in zip(groups[n], body["results"]):
+                        moderations[pos] = (
+                            _namespace(result["categories"]),
+                            _namespace(result["category_scores"]),
+                        )
+                        self.analyzer.store_moderation(
+                            texts[pos], *moderations[pos]
+                        )
+                else:
+                    pos = n
+                    try:
+                        parsed = _parse_score_response(
+                            body["choices"][0]["message"]["content"]
+                        )
+                    except (KeyError, IndexError, TypeError, ValueError):
+                        parsed = None
+                    if parsed is not None:
+                        scores[pos] = parsed
+                        if version == PROMPT_VERSION:
+                            self.analyzer.store_score(texts[pos], *parsed)
+
+        results: dict[Any, dict[str, Any]] = {}
+        for pos, (label, text) in enumerate(zip(df.index, texts)):
+            moderation = (
+                moderations.get(pos)
+                or self.analyzer.cached_moderation(text)
+            )
+            if moderation is None:
+                results[label] = _empty_result()
+                continue
+            if pos in scores:
+                score, reason = scores[pos]
+                results[label] = _build_result(
+                    *moderation, score, reason, version
+                )
+                continue
+            score, reason = self.analyzer.cached_score(text) or (None, None)
+            results[label] = _build_result(*moderation, score, reason)
+        merged = self.analyzer.merge_results(df, results)
+        state["collected"] = True
+        self._save_state(state)
+        return merged
+
+    def run(
+        self,
+        df: pd.DataFrame,
+        poll_interval: float = BATCH_POLL_SECONDS,
+        timeout: float | None = None,
+    ) -> pd.DataFrame:
+        """Submit ``df``, wait for the jobs and return the merged results."""
+        name = self.submit(df)
+        self.wait(name, poll_interval, timeout)
+        return self.collect(name)
+
+
+def _all_batches(state: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    for batches in state["batches"].values():
+        yield from batches
+
+
+def _namespace(values: dict[str, Any]) -> SimpleNamespace:
+    """Expose raw moderation JSON with the SDK's attribute names."""
+    return SimpleNamespace(
+        **{key.replace("/", "_"): value for key, value in values.items()}
+    )
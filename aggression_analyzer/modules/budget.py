@@ -0,0 +1,57 @@
+"""Per-run budget for chat scoring requests."""
+
+import threading
+
+from config.settings import LLM_BUDGET_REQUESTS, LLM_BUDGET_TOKENS
+
+
+class LLMBudget:
+    """Track chat requests and estimated tokens spent during one run.
+
+    ``None`` for either limit means unlimited.  Unlike
+    :class:`modules.ratelimit.RateLimiter`, which paces requests over time,
+    a budget caps the total spend of a run: once a request would exceed
+    it, :meth:`try_spend` refuses and nothing is recorded.
+    """
+
+    def __init__(
+        self, max_requests: int | None = None, max_tokens: int | None = None
+    ) -> None:
+        self.max_requests = max_requests
+        self.max_tokens = max_tokens
+        self.requests = 0
+        self.tokens = 0
+        self._lock = threading.Lock()
+
+    def try_spend(self, tokens: int, requests: int = 1) -> bool:
+        """Record the spend and return ``True`` if it fits the budget."""
+        with self._lock:
+            if (
+                self.max_requests is not None
+                and self.requests + requests > self.max_requests
+            ):
+                return False
+            if (
+                self.max_tokens is not None
+                and self.tokens + tokens > self.max_tokens
+            ):
+                return False
+            self.requests += requests
+            self.tokens += tokens
+            return True
+
+    def snapshot(self) -> dict[str, int | None]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "tokens": self.tokens,
+                "max_requests": self.max_requests,
+                "max_tokens": self.max_tokens,
+            }
+
+
+def default_budget() -> LLMBudget | None:
+    """Return a fresh budget from the settings, or ``None`` if unlimited."""
+    if LLM_BUDGET_REQUESTS is None and LLM_BUDGET_TOKENS is None:
+        return None
+    return LLMBudget(LLM_BUDGET_REQUESTS, LLM_BUDGET_TOKENS)
@@ -0,0 +1,165 @@
+"""Persistent, content-addressed cache for analysis results."""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import hashlib
+from typing import Any
+
+from config.settings import (
+    RESULT_CACHE_MAX_ENTRIES,
+    RESULT_CACHE_MAX_AGE_SECONDS,
+)
+from modules.text import normalize_text
+
+
+class ResultCache:
+    """SQLite-backed cache of API results.
+
+    Entries are keyed by :meth:`make_key`, a hash of the normalized text and
+    every parameter that influences the result.  Values are stored as JSON.
+    Entries older than ``max_age_seconds`` are treated as misses, and the
+    least recently used entries are dropped once the cache grows beyond
+    ``max_entries``.  Hits only record their access time in memory; the
+    times are written together with the next write, eviction or every
+    ``_TOUCH_EVERY`` hits, so reads do not each commit a transaction.  The
+    object is safe to share between threads.
+    """
+
+    _EVICT_EVERY = 500
+    _TOUCH_EVERY = 500
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+        max_age_seconds: float = RESULT_CACHE_MAX_AGE_SECONDS,
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._touched: dict[str, float] = {}
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS results_accessed"
+            " ON results (accessed_at)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(kind: str, text: str, *params: object) -> str:
+        """Return the cache key for ``text`` analyzed with ``params``."""
+        payload = json.dumps(
+            [kind, normalize_text(text), *[str(p) for p in params]],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value for ``key`` or ``None`` on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM results WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age_seconds:
+                self.misses += 1
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= self._TOUCH_EVERY:
+                self._flush_touched_locked()
+                self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def _flush_touched_locked(self) -> None:
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE results SET accessed_at = ? WHERE key = ?",
+                [(when, key) for key, when in self._touched.items()],
+            )
+            self._touched = {}
+
+    def set(self, key: str, value: Any) -> None:
+        """Store ``value`` (JSON serializable) under ``key``."""
+        now = time.time()
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._flush_touched_locked()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results"
+                " (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, data, now, now),
+            )
+            self._conn.commit()
+            self._writes += 1
+            if self._writes % self._EVICT_EVERY == 0:
+                self._evict_locked(now)
+
+    def evict(self) -> int:
+        """Remove expired and surplus entries; return how many were removed.
+
+        Eviction also runs automatically every few hundred writes.
+        """
+        with self._lock:
+            return self._evict_locked(time.time())
+
+    def _evict_locked(self, now: float) -> int:
+        self._flush_touched_locked()
+        removed = self._conn.execute(
+            "DELETE FROM results WHERE created_at < ?",
+            (now - self.max_age_seconds,),
+        ).rowcount
+        (count,) = self._conn.execute(
+            "SELECT COUNT(*) FROM results"
+        ).fetchone()
+        surplus = count - self.max_entries
+        if surplus > 0:
+            removed += self._conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                " SELECT key FROM results ORDER BY accessed_at LIMIT ?)",
+                (surplus,),
+            ).rowcount
+        self._conn.commit()
+        return removed
+
+    def stats(self) -> dict[str, int]:
+        """Return hit/miss counters and the current number of entries."""
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM results"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": count}
+
+    def clear(self) -> None:
+        """Delete every entry and reset the counters."""
+        with self._lock:
+            self._touched = {}
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_touched_locked()
+            self._conn.commit()
+            self._conn.close()
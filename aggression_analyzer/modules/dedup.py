@@ -0,0 +1,161 @@
+"""Exact and near-duplicate detection for scraped posts."""
+
+from typing import Any, Hashable
+from zlib import crc32
+
+import numpy as np
+import pandas as pd
+
+from config.settings import (
+    DEDUP_BANDS,
+    DEDUP_MIN_LENGTH,
+    DEDUP_NEAR_ENABLED,
+    DEDUP_NUM_PERM,
+    DEDUP_THRESHOLD,
+)
+from modules.text import normalize_for_matching
+
+# Universal hashing modulo a prime just above 2**32 keeps every product of
+# a 32-bit shingle hash and a 32-bit coefficient inside uint64.
+_PRIME = np.uint64(4294967311)
+_SEED = 20240101
+
+
+def shingles(text: str, size: int = 3) -> set[str]:
+    """Return the set of character ``size``-grams of ``text``."""
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class MinHasher:
+    """Compute MinHash signatures with ``num_perm`` hash functions.
+
+    The fraction of equal positions in two signatures estimates the
+    Jaccard similarity of the shingle sets they were computed from.
+    """
+
+    def __init__(self, num_perm: int = DEDUP_NUM_PERM) -> None:
+        rng = np.random.default_rng(_SEED)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, 2**32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2**32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        grams = shingles(text)
+        if not grams:
+            return np.zeros(self.num_perm, dtype=np.uint64)
+        hashes = np.fromiter(
+            (crc32(gram.encode("utf-8")) for gram in grams),
+            dtype=np.uint64,
+            count=len(grams),
+        )
+        values = (hashes[:, None] * self._a + self._b) % _PRIME
+        return values.min(axis=0)
+
+
+class DuplicateIndex:
+    """Incrementally cluster posts into groups of (near-)duplicates.
+
+    Posts whose :func:`normalize_for_matching` form is identical join the
+    same cluster through a dictionary lookup.  Only with ``near`` are
+    other posts of at least ``min_length`` characters matched by MinHash:
+    signatures are split into ``bands`` bands and only representatives
+    sharing a whole band with the new post are compared (locality-sensitive
+    hashing), so a lookup touches a handful of candidates instead of the
+    whole index.  A candidate is a duplicate when the estimated Jaccard
+    similarity of the two posts' character 3-grams reaches ``threshold``.
+    Near matching is off by default: a negation or a swapped object
+    changes a short post's meaning but still leaves it around 0.7 similar
+    to the original.
+
+    Only cluster representatives are indexed and a new post is matched
+    against them, never against other members, so clusters cannot drift
+    through chains of small edits.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEDUP_THRESHOLD,
+        num_perm: int = DEDUP_NUM_PERM,
+        bands: int = DEDUP_BANDS,
+        min_length: int = DEDUP_MIN_LENGTH,
+        near: bool = DEDUP_NEAR_ENABLED,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm は bands で割り切れる必要があります")
+        self.threshold = threshold
+        self.min_length = min_length
+        self.near = near
+        self._hasher = MinHasher(num_perm)
+        self._rows = num_perm // bands
+        self._bands = bands
+        self._exact: dict[str, Hashable] = {}
+        self._buckets: dict[tuple[int, bytes], list[int]] = {}
+        self._signatures: list[np.ndarray] = []
+        self._keys: list[Hashable] = []
+        self._clusters = 0
+
+    def __len__(self) -> int:
+        return self._clusters
+
+    def _band_keys(self, signature: np.ndarray) -> list[tuple[int, bytes]]:
+        raw = signature.tobytes()
+        step = self._rows * signature.itemsize
+        return [
+            (band, raw[band * step:(band + 1) * step])
+            for band in range(self._bands)
+        ]
+
+    def add(self, key: Hashable, text: str) -> Hashable | None:
+        """Add a post and return the key of the post it duplicates.
+
+        ``None`` means the post is new and becomes the representative of its
+        own cluster.
+        """
+        normalized = normalize_for_matching(text)
+        if normalized in self._exact:
+            return self._exact[normalized]
+        if not self.near or len(normalized) < self.min_length:
+            self._exact[normalized] = key
+            self._clusters += 1
+            return None
+        signature = self._hasher.signature(normalized)
+        band_keys = self._band_keys(signature)
+        seen: set[int] = set()
+        for band_key in band_keys:
+            for slot in self._buckets.get(band_key, ()):
+                if slot in seen:
+                    continue
+                seen.add(slot)
+                similarity = np.mean(self._signatures[slot] == signature)
+                if similarity >= self.threshold:
+                    representative = self._keys[slot]
+                    self._exact[normalized] = representative
+                    return representative
+        slot = len(self._keys)
+        self._clusters += 1
+        self._keys.append(key)
+        self._signatures.append(signature)
+        self._exact[normalized] = key
+        for band_key in band_keys:
+            self._buckets.setdefault(band_key, []).append(slot)
+        return None
+
+
+def find_duplicates(
+    texts: pd.Series, index: DuplicateIndex | None = None
+) -> pd.Series:
+    """Return, for each entry of ``texts``, the label of its representative.
+
+    The result is aligned with ``texts`` and holds ``None`` for posts that
+    represent their own cluster (the first occurrence) and the index label
+    of that first occurrence for every later copy.
+    """
+    if index is None:
+        index = DuplicateIndex()
+    values: list[Any] = [
+        index.add(label, "" if pd.isna(text) else str(text))
+        for label, text in texts.items()
+    ]
+    return pd.Series(values, index=texts.index, dtype=object)
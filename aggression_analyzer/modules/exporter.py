@@ -0,0 +1,156 @@
+"""Incremental writers for analysis results."""
+
+import os
+from typing import Any
+
+import pandas as pd
+
+from modules.metrics import default_metrics
+from modules.sources import FORMATS, detect_format
+
+OUTPUT_FORMATS = {**FORMATS, ".xlsx": "xlsx"}
+
+# Rows converted at a time by :func:`export_dataframe`.
+EXPORT_CHUNK_SIZE = 10_000
+
+
+class ResultWriter:
+    """Append result chunks to a CSV, JSON Lines, Parquet or Excel file.
+
+    The format follows the extension of ``path``.  The columns of the first
+    chunk define the file; later chunks are aligned to them, so each chunk
+    can be written and dropped without keeping the whole result in memory.
+    Writing Parquet requires ``pyarrow``.  Excel files are written with
+    openpyxl's write-only mode, which streams rows to disk instead of
+    building the workbook in memory; the file is complete after
+    :meth:`close`.  Time spent writing counts as the ``export`` stage of
+    :func:`modules.metrics.default_metrics`.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.format = detect_format(path, OUTPUT_FORMATS)
+        self.rows = 0
+        self._columns: list[str] | None = None
+        self._parquet: Any = None
+        self._workbook: Any = None
+        self._sheet: Any = None
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def write(self, df: pd.DataFrame) -> None:
+        """Append ``df`` to the file."""
+        with default_metrics().stage("export"):
+            self._write(df)
+
+    def _write(self, df: pd.DataFrame) -> None:
+        first = self._columns is None
+        if first:
+            self._columns = list(df.columns)
+        else:
+            df = df.reindex(columns=self._columns)
+        if self.format == "csv":
+            df.to_csv(
+                self.path,
+                mode="w" if first else "a",
+                header=first,
+                index=False,
+            )
+        elif self.format == "jsonl":
+            with open(self.path, "w" if first else "a", encoding="utf-8") as f:
+                df.to_json(
+                    f,
+                    orient="records",
+                    lines=True,
+                    force_ascii=False,
+                    date_format="iso",
+                )
+        elif self.format == "xlsx":
+            self._write_excel(df, first)
+        else:
+            self._write_parquet(df)
+        self.rows += len(df)
+
+    def _write_excel(self, df: pd.DataFrame, first: bool) -> None:
+        from openpyxl import Workbook
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+        if first:
+            self._workbook = Workbook(write_only=True)
+            self._sheet = self._workbook.create_sheet()
+            self._sheet.append([str(name) for name in df.columns])
+        values = df.astype(object).where(df.notna(), None)
+        for name, dtype in df.dtypes.items():
+            if dtype == object or pd.api.types.is_string_dtype(dtype):
+                values[name] = [
+                    ILLEGAL_CHARACTERS_RE.sub("", v) if isinstance(v, str)
+                    else v
+                    for v in values[name]
+                ]
+        for row in values.itertuples(index=False, name=None):
+            self._sheet.append(
+                [v.item() if hasattr(v, "item") else v for v in row]
+            )
+
+    def _write_parquet(self, df: pd.DataFrame) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Object columns such as ``duplicate_of`` may hold None in one chunk
+        # and labels in the next; store them as strings so every chunk has
+        # the schema of the first.
+        df = df.astype(
+            {
+                name: "string"
+                for name, dtype in df.dtypes.items()
+                if dtype == object
+            }
+        )
+        if self._parquet is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self._parquet = pq.ParquetWriter(self.path, table.schema)
+        else:
+            schema = self._parquet.schema
+            df = df.astype(
+                {
+                    field.name: "string"
+                    for field in schema
+                    if pa.types.is_string(field.type)
+                    or pa.types.is_large_string(field.type)
+                }
+            )
+            table = pa.Table.from_pandas(
+                df, schema=schema, preserve_index=False
+            )
+        self._parquet.write_table(table)
+
+    def close(self) -> None:
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+        if self._workbook is not None:
+            with default_metrics().stage("export"):
+                self._workbook.save(self.path)
+            self._workbook = None
+
+
+def export_dataframe(
+    df: pd.DataFrame, path: str, chunk_size: int = EXPORT_CHUNK_SIZE
+) -> None:
+    """Write ``df`` to ``path`` in chunks of ``chunk_size`` rows.
+
+    The format follows the extension (see :class:`ResultWriter`).  Only one
+    chunk is converted at a time, which keeps Excel export of large results
+    fast and small compared to :meth:`pandas.DataFrame.to_excel`.
+    """
+    with ResultWriter(path) as writer:
+        if df.empty:
+            writer.write(df)
+        for start in range(0, len(df), max(1, chunk_size)):
+            writer.write(df.iloc[start:start + chunk_size])
@@ -0,0 +1,166 @@
+"""Pool of Nitter instances with health tracking and failover."""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, TypeVar
+
+from config.settings import (
+    INSTANCE_COOLDOWN_SECONDS,
+    INSTANCE_FAILURE_THRESHOLD,
+    SCRAPE_DELAY_SECONDS,
+)
+
+T = TypeVar("T")
+
+
+class InstanceState:
+    """Health information and client for one Nitter instance."""
+
+    def __init__(self, url: str, client: Any) -> None:
+        self.url = url
+        self.client = client
+        self.lock = threading.Lock()
+        self.latency: float | None = None
+        self.consecutive_errors = 0
+        self.successes = 0
+        self.failures = 0
+        self.open_until = 0.0
+
+    def is_available(self, now: float) -> bool:
+        """Return ``False`` while the circuit breaker is open."""
+        return now >= self.open_until
+
+    def score(self) -> float:
+        """Lower is better: smoothed latency inflated by recent errors.
+
+        Untried instances score zero so that they are tried early.
+        """
+        latency = self.latency if self.latency is not None else 0.0
+        errors = self.consecutive_errors
+        return latency * (1 + errors) + errors
+
+    def as_dict(self, now: float) -> dict[str, Any]:
+        return {
+            "url": self.url,
+            "latency": self.latency,
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_errors": self.consecutive_errors,
+            "circuit_open": not self.is_available(now),
+            "busy": self.lock.locked(),
+        }
+
+
+class InstancePool:
+    """Dispatch scraper calls across several Nitter instances.
+
+    Each instance serves one request at a time and then rests for
+    ``delay`` seconds, which acts as a per-instance rate limit.  Calls go
+    to the free instance with the best latency/error score; when a call
+    fails it is retried on the next instance.  After
+    ``failure_threshold`` consecutive errors an instance's circuit opens
+    and it is skipped for ``cooldown`` seconds, after which a single trial
+    call decides whether it rejoins the pool.
+
+    Only exceptions count as failures.  Clients must raise for unreachable
+    instances and error pages; an empty result is a valid answer (nothing
+    matched, end of the timeline) and is returned without failing over.
+    """
+
+    _LATENCY_SMOOTHING = 0.3
+
+    def __init__(
+        self,
+        urls: list[str],
+        client_factory: Callable[[str], Any],
+        delay: float = SCRAPE_DELAY_SECONDS,
+        failure_threshold: int = INSTANCE_FAILURE_THRESHOLD,
+        cooldown: float = INSTANCE_COOLDOWN_SECONDS,
+    ) -> None:
+        if not urls:
+            raise ValueError("Nitterインスタンスが指定されていません。")
+        self.instances = [InstanceState(u, client_factory(u)) for u in urls]
+        self.delay = delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+
+    def healthy(self) -> list[InstanceState]:
+        """Return instances whose circuit is closed, best first."""
+        now = time.monotonic()
+        with self._lock:
+            ready = [i for i in self.instances if i.is_available(now)]
+            return sorted(ready, key=InstanceState.score)
+
+    def _candidates(self) -> list[InstanceState]:
+        ready = self.healthy()
+        if ready:
+            return ready
+        # Every circuit is open: try the one that reopens first.
+        return [min(self.instances, key=lambda i: i.open_until)]
+
+    def _acquire(self, tried: set[str]) -> InstanceState | None:
+        candidates = [i for i in self._candidates() if i.url not in tried]
+        if not candidates:
+            return None
+        for instance in candidates:
+            if instance.lock.acquire(blocking=False):
+                return instance
+        candidates[0].lock.acquire()
+        return candidates[0]
+
+    def _record(
+        self, instance: InstanceState, latency: float, ok: bool
+    ) -> None:
+        with self._lock:
+            if ok:
+                alpha = self._LATENCY_SMOOTHING
+                instance.latency = (
+                    latency
+                    if instance.latency is None
+                    else alpha * latency + (1 - alpha) * instance.latency
+                )
+                instance.successes += 1
+                instance.consecutive_errors = 0
+                instance.open_until = 0.0
+            else:
+                instance.failures += 1
+                instance.consecutive_errors += 1
+                if instance.consecutive_errors >= self.failure_threshold:
+                    instance.open_until = time.monotonic() + self.cooldown
+
+    def call(self, func: Callable[[Any], T]) -> T:
+        """Run ``func(client)`` on the best instance, failing over on error.
+
+        When every instance failed, the last error is raised.
+        """
+        tried: set[str] = set()
+        error: Exception | None = None
+        while True:
+            instance = self._acquire(tried)
+            if instance is None:
+                break
+            tried.add(instance.url)
+            try:
+                start = time.monotonic()
+                try:
+                    result = func(instance.client)
+                except Exception as e:
+                    self._record(instance, time.monotonic() - start, False)
+                    logging.warning("%s error: %s", instance.url, e)
+                    error = e
+                    continue
+                self._record(instance, time.monotonic() - start, True)
+                # Keep the instance reserved while it rests.
+                time.sleep(self.delay)
+                return result
+            finally:
+                instance.lock.release()
+        raise error or RuntimeError("利用可能なNitterインスタンスがありません。")
+
+    def stats(self) -> list[dict[str, Any]]:
+        """Return health information for every instance."""
+        now = time.monotonic()
+        with self._lock:
+            return [i.as_dict(now) for i in self.instances]
@@ -0,0 +1,472 @@
+"""Durable job queue shared by worker processes on one or more hosts."""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterable, Iterator, NamedTuple
+
+import requests
+
+from config.settings import (
+    JOBQUEUE_MAX_ATTEMPTS,
+    JOBQUEUE_RETRY_DELAY,
+    JOBQUEUE_VISIBILITY_TIMEOUT,
+)
+
+# Job states.
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+STATES = (QUEUED, LEASED, DONE, FAILED)
+
+# A job to add: ``(kind, payload, key)``.  Jobs with a ``key`` that is
+# already in the queue are not added again.
+NewJob = tuple[str, dict[str, Any], str | None]
+
+
+class Job(NamedTuple):
+    """A leased job.  ``lease`` identifies this particular lease."""
+
+    id: int
+    kind: str
+    payload: dict[str, Any]
+    attempts: int
+    lease: str
+
+
+class JobQueue:
+    """Scrape and analysis jobs in SQLite, leased to workers.
+
+    :meth:`lease` hands the oldest available job to one worker for
+    ``visibility_timeout`` seconds.  The worker extends the lease with
+    :meth:`heartbeat` while it runs and ends it with :meth:`complete`,
+    which stores the job's result rows and any follow-up jobs in the same
+    transaction, or :meth:`fail`.  A job whose lease expires (its worker
+    crashed or hung) becomes available to other workers again; after
+    ``max_attempts`` leases it is marked :data:`FAILED`.  Calls made with
+    a lease that another worker has since taken over are ignored and
+    return ``False``, so a job's result is recorded once even when two
+    workers ran it.
+
+    Leasing takes SQLite's write lock, so any number of processes can share
+    the database file.  Use :func:`serve_queue` and
+    :class:`RemoteJobQueue` when workers on other hosts cannot open the
+    file directly.  The object is safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        visibility_timeout: float = JOBQUEUE_VISIBILITY_TIMEOUT,
+        max_attempts: int = JOBQUEUE_MAX_ATTEMPTS,
+        retry_delay: float = JOBQUEUE_RETRY_DELAY,
+    ) -> None:
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode; transactions are opened explicitly with
+        # BEGIN IMMEDIATE so that concurrent lessees are serialized.
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " kind TEXT NOT NULL,"
+            " key TEXT UNIQUE,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " available_at REAL NOT NULL,"
+            " lease TEXT,"
+            " worker TEXT,"
+            " error TEXT,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_available"
+            " ON jobs (status, available_at)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " job_id INTEGER PRIMARY KEY,"
+            " rows TEXT NOT NULL)"
+        )
+
+    def _transaction(self) -> "_Transaction":
+        return _Transaction(self._conn)
+
+    def _insert(self, jobs: Iterable[NewJob], now: float) -> int:
+        added = 0
+        for kind, payload, key in jobs:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO jobs"
+                " (kind, key, payload, status, available_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    kind,
+                    key,
+                    json.dumps(payload, ensure_ascii=False),
+                    QUEUED,
+                    now,
+                    now,
+                ),
+            )
+            added += cursor.rowcount
+        return added
+
+    def put(
+        self, kind: str, payload: dict[str, Any], key: str | None = None
+    ) -> bool:
+        """Add a job; return ``False`` if ``key`` is already queued."""
+        return self.put_many([(kind, payload, key)]) == 1
+
+    def put_many(self, jobs: Iterable[NewJob]) -> int:
+        """Add ``(kind, payload, key)`` jobs at once; return how many."""
+        with self._lock, self._transaction():
+            return self._insert(jobs, time.time())
+
+    def lease(
+        self, worker: str, kinds: Iterable[str] | None = None
+    ) -> Job | None:
+        """Lease the oldest available job, or return ``None``."""
+        kinds = list(kinds or [])
+        kind_filter = ""
+        if kinds:
+            kind_filter = f" AND kind IN ({','.join('?' * len(kinds))})"
+        now = time.time()
+        with self._lock, self._transaction():
+            # Expired leases that used up their attempts are given up.
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, lease = NULL,"
+                " error = 'lease expired', updated_at = ?"
+                " WHERE status = ? AND available_at <= ? AND attempts >= ?",
+                (FAILED, now, LEASED, now, self.max_attempts),
+            )
+            row = self._conn.execute(
+                "SELECT id, kind, payload, attempts FROM jobs"
+                " WHERE status IN (?, ?) AND available_at <= ?"
+                f"{kind_filter} ORDER BY id LIMIT 1",
+                [QUEUED, LEASED, now, *kinds],
+            ).fetchone()
+            if row is None:
+                return None
+            job_id, kind, payload, attempts = row
+            job = Job(
+                job_id, kind, json.loads(payload), attempts + 1,
+                uuid.uuid4().hex,
+            )
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, lease = ?,"
+                " worker = ?, available_at = ?, updated_at = ?"
+                " WHERE id = ?",
+                (
+                    LEASED,
+                    job.attempts,
+                    job.lease,
+                    worker,
+                    now + self.visibility_timeout,
+                    now,
+                    job.id,
+                ),
+            )
+        return job
+
+    def _update_leased(self, job: Job, sql: str, *params: Any) -> bool:
+        cursor = self._conn.execute(
+            f"UPDATE jobs SET {sql}, updated_at = ?"
+            " WHERE id = ? AND lease = ? AND status = ?",
+            (*params, time.time(), job.id, job.lease, LEASED),
+        )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, job: Job) -> bool:
+        """Extend the lease of ``job``; ``False`` if it was lost."""
+        with self._lock:
+            return self._update_leased(
+                job,
+                "available_at = ?",
+                time.time() + self.visibility_timeout,
+            )
+
+    def complete(
+        self,
+        job: Job,
+        rows: list[dict[str, Any]] | None = None,
+        follow_ups: Iterable[NewJob] = (),
+    ) -> bool:
+        """Mark ``job`` done, storing its result ``rows`` and new jobs.
+
+        Returns ``False``, recording nothing, if the lease was lost.
+        """
+        with self._lock, self._transaction() as transaction:
+            if not self._update_leased(
+                job, "status = ?, lease = NULL, error = NULL", DONE
+            ):
+                transaction.rollback()
+                return False
+            if rows is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (job_id, rows)"
+                    " VALUES (?, ?)",
+                    (job.id, json.dumps(rows, ensure_ascii=False)),
+                )
+            self._insert(follow_ups, time.time())
+        return True
+
+    def fail(self, job: Job, error: str) -> bool:
+        """Record a failed attempt; the job is retried after a delay.
+
+        The delay doubles with every attempt.  After ``max_attempts`` the
+        job is marked :data:`FAILED`.
+        """
+        if job.attempts >= self.max_attempts:
+            status, available_at = FAILED, time.time()
+        else:
+            status = QUEUED
+            delay = self.retry_delay * 2 ** (job.attempts - 1)
+            available_at = time.time() + delay
+        with self._lock:
+            return self._update_leased(
+                job,
+                "status = ?, lease = NULL, error = ?, available_at = ?",
+                status,
+                error,
+                available_at,
+            )
+
+    def release(self, job: Job) -> bool:
+        """Return ``job`` to the queue at once without using an attempt."""
+        with self._lock:
+            return self._update_leased(
+                job,
+                "status = ?, lease = NULL, attempts = ?, available_at = ?",
+                QUEUED,
+                job.attempts - 1,
+                time.time(),
+            )
+
+    def retry_failed(self) -> int:
+        """Queue all failed jobs again with fresh attempts."""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, available_at = ?,"
+                " updated_at = ? WHERE status = ?",
+                (QUEUED, time.time(), time.time(), FAILED),
+            ).rowcount
+
+    def counts(self) -> dict[str, int]:
+        """Return the number of jobs in each state."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        counts = dict.fromkeys(STATES, 0)
+        counts.update(rows)
+        return counts
+
+    def read_results(
+        self, after: int = 0, limit: int = 100
+    ) -> list[tuple[int, list[dict[str, Any]]]]:
+        """Return up to ``limit`` ``(job id, rows)`` after job ``after``."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, rows FROM results WHERE job_id > ?"
+                " ORDER BY job_id LIMIT ?",
+                (after, limit),
+            ).fetchall()
+        return [(job_id, json.loads(value)) for job_id, value in rows]
+
+    def iter_results(self) -> Iterator[list[dict[str, Any]]]:
+        """Yield the result rows of every finished job in job order."""
+        yield from _iter_results(self)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class _Transaction:
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self._conn = conn
+        self._done = False
+
+    def __enter__(self) -> "_Transaction":
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self
+
+    def rollback(self) -> None:
+        self._conn.execute("ROLLBACK")
+        self._done = True
+
+    def __exit__(self, exc_type: Any, *exc_info: Any) -> None:
+        if self._done:
+            return
+        self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def _iter_results(queue: Any) -> Iterator[list[dict[str, Any]]]:
+    after = 0
+    while True:
+        page = queue.read_results(after)
+        if not page:
+            return
+        for _, rows in page:
+            yield rows
+        after = page[-1][0]
+
+
+# Methods of :class:`JobQueue` served by :func:`serve_queue`.
+_REMOTE_METHODS = {
+    "put_many",
+    "lease",
+    "heartbeat",
+    "complete",
+    "fail",
+    "release",
+    "retry_failed",
+    "counts",
+    "read_results",
+}
+
+
+def serve_queue(
+    queue: JobQueue, host: str = "127.0.0.1", port: int = 0
+) -> ThreadingHTTPServer:
+    """Serve ``queue`` over HTTP in a daemon thread and return the server.
+
+    Each method of :class:`JobQueue` used by workers is a ``POST /<name>``
+    taking its keyword arguments as JSON; :class:`RemoteJobQueue` is the
+    client.  There is no authentication, so only listen on trusted
+    networks.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def _send(self, status: int, payload: Any) -> None:
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            name = self.path.strip("/")
+            if name not in _REMOTE_METHODS:
+                self._send(404, {"error": f"unknown method {name}"})
+                return
+            try:
+                kwargs = json.loads(self.rfile.read(length) or b"{}")
+                if "job" in kwargs:
+                    kwargs["job"] = Job(**kwargs["job"])
+                result = getattr(queue, name)(**kwargs)
+            except Exception as e:
+                logging.exception("job queue call %s failed", name)
+                self._send(500, {"error": str(e)})
+                return
+            self._send(200, {"result": result})
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class RemoteJobQueue:
+    """Client for a queue served by :func:`serve_queue`.
+
+    Has the same methods as :class:`JobQueue`, so workers can use either.
+    """
+
+    def __init__(self, url: str, timeout: float = 60) -> None:
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _call(self, name: str, **kwargs: Any) -> Any:
+        if isinstance(kwargs.get("job"), Job):
+            kwargs["job"] = kwargs["job"]._asdict()
+        response = self.session.post(
+            f"{self.url}/{name}", json=kwargs, timeout=self.timeout
+        )
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"job queue call {name} failed:"
+                f" HTTP {response.status_code} {response.text}"
+            )
+        return response.json()["result"]
+
+    def put(
+        self, kind: str, payload: dict[str, Any], key: str | None = None
+    ) -> bool:
+        return self.put_many([(kind, payload, key)]) == 1
+
+    def put_many(self, jobs: Iterable[NewJob]) -> int:
+        return self._call("put_many", jobs=list(jobs))
+
+    def lease(
+        self, worker: str, kinds: Iterable[str] | None = None
+    ) -> Job | None:
+        data = self._call("lease", worker=worker, kinds=list(kinds or []))
+        return Job(*data) if data is not None else None
+
+    def heartbeat(self, job: Job) -> bool:
+        return self._call("heartbeat", job=job)
+
+    def complete(
+        self,
+        job: Job,
+        rows: list[dict[str, Any]] | None = None,
+        follow_ups: Iterable[NewJob] = (),
+    ) -> bool:
+        return self._call(
+            "complete", job=job, rows=rows, follow_ups=list(follow_ups)
+        )
+
+    def fail(self, job: Job, error: str) -> bool:
+        return self._call("fail", job=job, error=error)
+
+    def release(self, job: Job) -> bool:
+        return self._call("release", job=job)
+
+    def retry_failed(self) -> int:
+        return self._call("retry_failed")
+
+    def counts(self) -> dict[str, int]:
+        return self._call("counts")
+
+    def read_results(
+        self, after: int = 0, limit: int = 100
+    ) -> list[tuple[int, list[dict[str, Any]]]]:
+        page = self._call("read_results", after=after, limit=limit)
+        return [(job_id, rows) for job_id, rows in page]
+
+    def iter_results(self) -> Iterator[list[dict[str, Any]]]:
+        yield from _iter_results(self)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def open_queue(location: str) -> "JobQueue | RemoteJobQueue":
+    """Open a queue file, or a served queue when given an ``http`` URL."""
+    if location.startswith(("http://", "https://")):
+        return RemoteJobQueue(location)
+    return JobQueue(location)
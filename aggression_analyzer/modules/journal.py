@@ -0,0 +1,132 @@
+"""Append-only journal of per-row results for resuming interrupted runs."""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Iterable
+
+import pandas as pd
+
+from config.settings import JOURNAL_FLUSH_ROWS, JOURNAL_FLUSH_SECONDS
+
+
+def row_keys(df: pd.DataFrame) -> pd.Series:
+    """Return the journal key of every row of ``df``.
+
+    Rows are identified by their post ``url`` when there is one and by
+    their index label otherwise.
+    """
+    keys = pd.Series([f"row:{label}" for label in df.index], index=df.index)
+    if "url" in df.columns:
+        urls = df["url"]
+        keys = urls.where(urls.notna() & (urls != ""), keys).astype(str)
+    return keys
+
+
+def _to_json(value: Any) -> Any:
+    # NumPy scalars and similar objects expose ``item()``.
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class ResultJournal:
+    """Record each finished row so a crashed run can skip it on restart.
+
+    Results are buffered and written to SQLite in one transaction every
+    ``flush_rows`` rows or ``flush_seconds`` seconds, whichever comes
+    first, with ``synchronous=FULL`` so each batch is fsynced.  A crash
+    loses at most the last unflushed batch.  With ``resume=False`` any
+    previous journal at ``path`` is cleared.  The object is safe to share
+    between threads.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        resume: bool = True,
+        flush_rows: int = JOURNAL_FLUSH_ROWS,
+        flush_seconds: float = JOURNAL_FLUSH_SECONDS,
+    ) -> None:
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._pending: list[tuple[str, str, float]] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS journal ("
+            " key TEXT PRIMARY KEY,"
+            " result TEXT NOT NULL,"
+            " written_at REAL NOT NULL)"
+        )
+        if not resume:
+            self._conn.execute("DELETE FROM journal")
+        self._conn.commit()
+
+    def __enter__(self) -> "ResultJournal":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._flush_locked()
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM journal"
+            ).fetchone()[0]
+
+    def append(self, key: str, result: dict[str, Any]) -> None:
+        """Queue ``result`` for ``key``; flushes when a batch is full."""
+        value = json.dumps(result, ensure_ascii=False, default=_to_json)
+        with self._lock:
+            self._pending.append((key, value, time.time()))
+            if (
+                len(self._pending) >= self.flush_rows
+                or time.monotonic() - self._last_flush >= self.flush_seconds
+            ):
+                self._flush_locked()
+
+    def lookup(self, keys: Iterable[str]) -> dict[str, dict[str, Any]]:
+        """Return the journaled results for those of ``keys`` that exist."""
+        keys = list(dict.fromkeys(keys))
+        found: dict[str, dict[str, Any]] = {}
+        with self._lock:
+            self._flush_locked()
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._conn.execute(
+                    "SELECT key, result FROM journal WHERE key IN"
+                    f" ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                found.update((key, json.loads(value)) for key, value in rows)
+        return found
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO journal (key, result, written_at)"
+            " VALUES (?, ?, ?)",
+            self._pending,
+        )
+        self._conn.commit()
+        self._pending = []
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
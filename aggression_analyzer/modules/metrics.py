@@ -0,0 +1,302 @@
+"""Request, token, cost and stage-timing metrics."""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Mapping
+
+from config.settings import MODEL_PRICING
+
+# Upper bounds (seconds) of the API latency histogram buckets.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_PREFIX = "aggression_analyzer"
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket bounds, like Prometheus'."""
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q: float) -> float | None:
+        """Return the upper bound of the bucket holding quantile ``q``."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, count in zip(self.bounds, self.counts):
+            if count >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip(map(str, self.bounds), self.counts)),
+        }
+
+
+class _ModelMetrics:
+    def __init__(self) -> None:
+        self.latency = Histogram()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.retries: dict[str, int] = {}
+        self.failures: dict[str, int] = {}
+
+
+def _usage_value(usage: Any, *path: str) -> int:
+    value = usage
+    for name in path:
+        value = getattr(value, name, None)
+    return int(value or 0)
+
+
+def _label(value: str) -> str:
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+class Metrics:
+    """Thread-safe counters for one process or run.
+
+    :class:`modules.analyzer.Analyzer` records every API call (latency,
+    token usage from ``response.usage``, retries and failures by error
+    type) and the scraper, analyzer and exporter time their stages.  Cost
+    is estimated from :data:`config.settings.MODEL_PRICING`.  Call
+    :meth:`reset` at the start of a run to get per-run numbers.
+    """
+
+    def __init__(
+        self, pricing: Mapping[str, Mapping[str, float]] | None = None
+    ) -> None:
+        self.pricing = dict(pricing if pricing is not None else MODEL_PRICING)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._models: dict[str, _ModelMetrics] = {}
+            self._stages: dict[str, list[float]] = {}
+
+    def _model(self, model: str) -> _ModelMetrics:
+        state = self._models.get(model)
+        if state is None:
+            state = self._models[model] = _ModelMetrics()
+        return state
+
+    def observe_call(
+        self, model: str, seconds: float, usage: Any = None
+    ) -> None:
+        """Record a successful API call and its ``usage``, if any."""
+        with self._lock:
+            state = self._model(model)
+            state.requests += 1
+            state.latency.observe(seconds)
+            if usage is not None:
+                state.prompt_tokens += _usage_value(usage, "prompt_tokens")
+                state.completion_tokens += _usage_value(
+                    usage, "completion_tokens"
+                )
+                state.cached_tokens += _usage_value(
+                    usage, "prompt_tokens_details", "cached_tokens"
+                )
+
+    def record_retry(self, model: str, error: BaseException) -> None:
+        with self._lock:
+            retries = self._model(model).retries
+            name = type(error).__name__
+            retries[name] = retries.get(name, 0) + 1
+
+    def record_failure(self, model: str, error: BaseException) -> None:
+        """Record an API call that failed for good."""
+        with self._lock:
+            failures = self._model(model).failures
+            name = type(error).__name__
+            failures[name] = failures.get(name, 0) + 1
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stage = self._stages.setdefault(name, [0, 0.0])
+            stage[0] += 1
+            stage[1] += seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the ``with`` block as one run of stage ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def _cost(self, model: str, state: _ModelMetrics) -> float:
+        price = self.pricing.get(model, {})
+        uncached = state.prompt_tokens - state.cached_tokens
+        return (
+            uncached * price.get("input", 0.0)
+            + state.cached_tokens
+            * price.get("cached_input", price.get("input", 0.0))
+            + state.completion_tokens * price.get("output", 0.0)
+        ) / 1_000_000
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return all metrics as plain data."""
+        with self._lock:
+            models = {
+                model: {
+                    "requests": state.requests,
+                    "latency_seconds": state.latency.snapshot(),
+                    "latency_p50": state.latency.quantile(0.5),
+                    "latency_p99": state.latency.quantile(0.99),
+                    "prompt_tokens": state.prompt_tokens,
+                    "completion_tokens": state.completion_tokens,
+                    "cached_tokens": state.cached_tokens,
+                    "retries": dict(state.retries),
+                    "failures": dict(state.failures),
+                    "cost_usd": self._cost(model, state),
+                }
+                for model, state in self._models.items()
+            }
+            stages = {
+                name: {"runs": runs, "seconds": seconds}
+                for name, (runs, seconds) in self._stages.items()
+            }
+        return {
+            "models": models,
+            "stages": stages,
+            "cost_usd": sum(m["cost_usd"] for m in models.values()),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        data = self.snapshot()
+        lines: list[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> str:
+            full = f"{_PREFIX}_{name}"
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} {kind}")
+            return full
+
+        name = family(
+            "api_request_duration_seconds",
+            "histogram",
+            "Latency of successful API calls.",
+        )
+        for model, m in data["models"].items():
+            labels = f'model="{_label(model)}"'
+            latency = m["latency_seconds"]
+            for bound, count in latency["buckets"].items():
+                lines.append(
+                    f'{name}_bucket{{{labels},le="{bound}"}} {count}'
+                )
+            lines.append(
+                f'{name}_bucket{{{labels},le="+Inf"}} {latency["count"]}'
+            )
+            lines.append(f"{name}_sum{{{labels}}} {latency['sum']}")
+            lines.append(f"{name}_count{{{labels}}} {latency['count']}")
+
+        name = family("api_tokens_total", "counter", "Tokens used.")
+        for model, m in data["models"].items():
+            for kind in ("prompt", "completion", "cached"):
+                lines.append(
+                    f'{name}{{model="{_label(model)}",kind="{kind}"}}'
+                    f" {m[f'{kind}_tokens']}"
+                )
+        for metric, help_text in (
+            ("retries", "API calls retried, by error type."),
+            ("failures", "API calls that failed for good, by error type."),
+        ):
+            name = family(f"api_{metric}_total", "counter", help_text)
+            for model, m in data["models"].items():
+                for error, count in m[metric].items():
+                    lines.append(
+                        f'{name}{{model="{_label(model)}",'
+                        f'error="{_label(error)}"}} {count}'
+                    )
+        name = family(
+            "api_cost_usd_total", "counter", "Estimated API cost in USD."
+        )
+        for model, m in data["models"].items():
+            lines.append(f'{name}{{model="{_label(model)}"}} {m["cost_usd"]}')
+        name = family(
+            "stage_duration_seconds_total",
+            "counter",
+            "Time spent in each pipeline stage.",
+        )
+        for stage, s in data["stages"].items():
+            lines.append(f'{name}{{stage="{_label(stage)}"}} {s["seconds"]}')
+        name = family(
+            "stage_runs_total", "counter", "Runs of each pipeline stage."
+        )
+        for stage, s in data["stages"].items():
+            lines.append(f'{name}{{stage="{_label(stage)}"}} {s["runs"]}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Write Prometheus text to ``*.prom``/``*.txt``, else JSON."""
+        text = (
+            self.to_prometheus()
+            if path.endswith((".prom", ".txt"))
+            else self.to_json() + "\n"
+        )
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def summary(self) -> str:
+        """Return a one-line summary for status bars."""
+        data = self.snapshot()
+        models = data["models"].values()
+        requests = sum(m["requests"] for m in models)
+        tokens = sum(
+            m["prompt_tokens"] + m["completion_tokens"] for m in models
+        )
+        retries = sum(sum(m["retries"].values()) for m in models)
+        failures = sum(sum(m["failures"].values()) for m in models)
+        parts = [
+            f"API {requests}回",
+            f"{tokens:,}トークン",
+            f"推定 ${data['cost_usd']:.4f}",
+        ]
+        if retries or failures:
+            parts.append(f"再試行 {retries} / 失敗 {failures}")
+        stages = data["stages"]
+        for stage in ("scrape", "analyze", "merge", "export"):
+            if stage in stages:
+                parts.append(f"{stage} {stages[stage]['seconds']:.1f}秒")
+        return " / ".join(parts)
+
+
+_default_metrics: Metrics | None = None
+_default_lock = threading.Lock()
+
+
+def default_metrics() -> Metrics:
+    """Return the process-wide metrics shared by all components."""
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+        return _default_metrics
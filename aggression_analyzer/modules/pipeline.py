@@ -0,0 +1,104 @@
+"""Overlapping scrape and analysis stages connected by a bounded queue."""
+
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+import pandas as pd
+
+from config.settings import PIPELINE_QUEUE_SIZE
+
+_DONE = object()
+
+
+def prefetch(
+    items: Iterable[Any], maxsize: int = PIPELINE_QUEUE_SIZE
+) -> Iterator[Any]:
+    """Iterate ``items`` in a background thread, ``maxsize`` items ahead.
+
+    The producer blocks once ``maxsize`` items are waiting, so memory stays
+    bounded no matter how many items ``items`` yields.  Exceptions raised by
+    the producer are re-raised in the consumer.  Closing the returned
+    generator early stops the producer.
+    """
+
+    buffer: queue.Queue = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except BaseException as e:  # forwarded to the consumer
+            put(e)
+            return
+        put(_DONE)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def iter_analyzed_pages(
+    pages: Iterable[pd.DataFrame],
+    analyzer: Any,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    expected_total: int = 0,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+    row_callback: Optional[Callable[[dict[str, Any]], None]] = None,
+    **analyze_options: Any,
+) -> Iterator[pd.DataFrame]:
+    """Analyze scraped pages while later pages are still being scraped.
+
+    ``pages`` (typically :meth:`Scraper.iter_tweet_pages`) is consumed in a
+    background thread through a queue of at most ``queue_size`` pages.
+    Each page is analyzed with :meth:`Analyzer.analyze_dataframe_in_parallel`
+    and yielded as soon as it is done.  ``progress_callback`` receives the
+    number of rows analyzed so far and ``expected_total`` (or the rows seen
+    so far, if larger).  ``row_callback``, if given, receives each finished
+    row as a dict of its input columns updated with its results, as soon
+    as the analyzer reports it.
+    """
+
+    done = 0
+    for page in prefetch(pages, queue_size):
+        offset = done
+
+        def page_progress(count: int, page_total: int) -> None:
+            if progress_callback:
+                progress_callback(
+                    offset + count,
+                    max(expected_total, offset + page_total),
+                )
+
+        if row_callback is not None:
+            records = page.to_dict("index")
+
+            def page_result(index: Any, data: dict[str, Any]) -> None:
+                row_callback({**records[index], **data})
+
+            analyze_options["result_callback"] = page_result
+        result = analyzer.analyze_dataframe_in_parallel(
+            page, page_progress, **analyze_options
+        )
+        done += len(page)
+        yield result
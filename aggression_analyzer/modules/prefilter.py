@@ -0,0 +1,194 @@
+"""Local lexicon prefilter that fast-paths plainly benign posts."""
+
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Iterable
+
+import pandas as pd
+
+from config.settings import (
+    PREFILTER_MAX_EXCLAMATIONS,
+    PREFILTER_MAX_UPPERCASE_RATIO,
+    PREFILTER_TERMS_EN,
+    PREFILTER_TERMS_JA,
+)
+from modules.text import normalize_text
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional speedup
+    ahocorasick = None
+
+# Reason stored for posts that were not sent to the API.
+PREFILTER_REASON = "prefiltered: no lexicon hits"
+
+_ASCII_LETTER_RE = re.compile(r"[A-Za-z]")
+_ASCII_UPPER_RE = re.compile(r"[A-Z]")
+_KATAKANA = {code: code - 0x60 for code in range(0x30A1, 0x30F7)}
+_KATAKANA_RE = re.compile("[\u30a1-\u30f6]")
+
+
+def _fold(normalized: str) -> str:
+    # ``str.translate`` is slow per character, so skip it when there is no
+    # katakana to fold.
+    folded = normalized.casefold()
+    if _KATAKANA_RE.search(folded):
+        folded = folded.translate(_KATAKANA)
+    return folded
+
+
+def normalize_for_lexicon(text: str) -> str:
+    """Fold ``text`` so that lexicon terms match regardless of spelling.
+
+    Applies :func:`modules.text.normalize_text`, lowercases and maps
+    katakana to hiragana, so ``ＫＩＬＬ``/``kill`` and ``シネ``/``しね``
+    are treated alike.
+    """
+    return _fold(normalize_text(text))
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isascii() and char.isalnum()
+
+
+class TermMatcher:
+    """Aho-Corasick automaton matching many terms in one pass.
+
+    Terms are normalized with :func:`normalize_for_lexicon`.  Terms made of
+    ASCII letters and digits only match whole words (``die`` does not match
+    ``diet``); other terms, such as Japanese ones, match anywhere.
+
+    When the optional ``pyahocorasick`` package is installed its C automaton
+    is used (several times faster); otherwise, or with ``native=False``, the
+    automaton is built in pure Python.
+    """
+
+    def __init__(
+        self, terms: Iterable[str], native: bool | None = None
+    ) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[tuple[str, bool]]] = [[]]
+        self._automaton = None
+        normalized = [normalize_for_lexicon(term) for term in terms]
+        if native is None:
+            native = ahocorasick is not None
+        if native:
+            self._automaton = ahocorasick.Automaton()
+            for term in filter(None, normalized):
+                whole_word = all(_is_word_char(c) or c == " " for c in term)
+                self._automaton.add_word(term, (term, whole_word))
+            self._automaton.make_automaton()
+            return
+        for term in normalized:
+            self._add(term)
+        self._build()
+
+    def _add(self, term: str) -> None:
+        if not term:
+            return
+        state = 0
+        for char in term:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        whole_word = all(_is_word_char(c) or c == " " for c in term)
+        if (term, whole_word) not in self._out[state]:
+            self._out[state].append((term, whole_word))
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> list[str]:
+        """Return the terms found in already normalized ``text``."""
+        return [
+            term
+            for end, term, whole_word in self._matches(text)
+            if not whole_word or self._is_whole_word(text, term, end)
+        ]
+
+    def _matches(self, text: str) -> Iterable[tuple[int, str, bool]]:
+        if self._automaton is not None:
+            if len(self._automaton):
+                for end, (term, whole_word) in self._automaton.iter(text):
+                    yield end, term, whole_word
+            return
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for end, char in enumerate(text):
+            nxt = goto[state].get(char)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(char)
+            state = nxt or 0
+            for term, whole_word in out[state]:
+                yield end, term, whole_word
+
+    @staticmethod
+    def _is_whole_word(text: str, term: str, end: int) -> bool:
+        start = end - len(term) + 1
+        if start > 0 and _is_word_char(text[start - 1]):
+            return False
+        return end + 1 >= len(text) or not _is_word_char(text[end + 1])
+
+
+@lru_cache(maxsize=8)
+def get_matcher(terms: tuple[str, ...] | None = None) -> TermMatcher:
+    """Return the cached automaton for ``terms``.
+
+    Without arguments the configured Japanese and English term lists are
+    used.  The automaton is built once per distinct term list.
+    """
+    if terms is None:
+        terms = tuple(PREFILTER_TERMS_JA) + tuple(PREFILTER_TERMS_EN)
+    return TermMatcher(terms)
+
+
+def is_low_risk(text: str, matcher: TermMatcher | None = None) -> bool:
+    """Return whether ``text`` can skip the API.
+
+    A post is low risk when it contains no lexicon term, has at most
+    :data:`config.settings.PREFILTER_MAX_EXCLAMATIONS` exclamation marks
+    and is not written mostly in capitals (see
+    :data:`config.settings.PREFILTER_MAX_UPPERCASE_RATIO`).
+    """
+    normalized = normalize_text(text)
+    if normalized.count("!") > PREFILTER_MAX_EXCLAMATIONS:
+        return False
+    letters = len(_ASCII_LETTER_RE.findall(normalized))
+    if letters >= 10:
+        upper = len(_ASCII_UPPER_RE.findall(normalized))
+        if upper / letters > PREFILTER_MAX_UPPERCASE_RATIO:
+            return False
+    return not (matcher or get_matcher()).find(_fold(normalized))
+
+
+def prefilter(
+    texts: pd.Series, terms: Iterable[str] | None = None
+) -> pd.Series:
+    """Return a boolean Series marking the posts that can skip the API."""
+    matcher = get_matcher(None if terms is None else tuple(terms))
+    return pd.Series(
+        [
+            is_low_risk("" if pd.isna(text) else str(text), matcher)
+            for text in texts
+        ],
+        index=texts.index,
+        dtype=bool,
+    )
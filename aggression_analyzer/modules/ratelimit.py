@@ -0,0 +1,243 @@
+"""Adaptive client-side rate limiting for OpenAI API calls."""
+
+import asyncio
+import random
+import re
+import threading
+import time
+from typing import Any, Mapping
+
+from config.settings import (
+    RATE_LIMITS,
+    RATE_LIMIT_BACKOFF_BASE,
+    RATE_LIMIT_BACKOFF_MAX,
+)
+
+_DURATION_RE = re.compile(r"([\d.]+)(ms|s|m|h)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: str | None) -> float | None:
+    """Parse reset durations such as ``"1s"``, ``"6m0s"`` or ``"120ms"``."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _UNIT_SECONDS[unit] for n, unit in parts)
+
+
+class TokenBucket:
+    """A token bucket refilled continuously at ``limit`` units per minute.
+
+    :meth:`reserve` always succeeds and may drive the level negative; the
+    returned value is how long the caller must wait before the reservation
+    is covered.  This keeps callers in FIFO order without a wait queue.
+    """
+
+    def __init__(self, limit: float) -> None:
+        self.limit = float(limit)
+        self.level = float(limit)
+        self.updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self.limit / 60.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self.updated)
+        self.level = min(self.limit, self.level + elapsed * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # A single request larger than the bucket must still be able to run.
+        self.level -= min(amount, self.limit)
+        if self.level >= 0 or self.rate <= 0:
+            return 0.0
+        return -self.level / self.rate
+
+    def sync(
+        self,
+        limit: float | None,
+        remaining: float | None,
+        reset: float | None,
+        now: float,
+    ) -> None:
+        """Adopt the server's view from ``x-ratelimit-*`` headers."""
+        self._refill(now)
+        if limit:
+            self.limit = float(limit)
+        if remaining is not None:
+            self.level = min(self.limit, float(remaining))
+            if remaining <= 0 and reset:
+                # Treat the reset time as the moment one more unit is free.
+                self.level = -reset * self.rate
+
+
+class _ModelLimits:
+    def __init__(self, requests: float, tokens: float) -> None:
+        self.requests = TokenBucket(requests)
+        self.tokens = TokenBucket(tokens)
+        self.paused_until = 0.0
+        self.waiting = 0
+
+
+class RateLimiter:
+    """Shared request and token budgets per model.
+
+    Limits start from :data:`config.settings.RATE_LIMITS` and are corrected
+    from the ``x-ratelimit-*`` and ``Retry-After`` headers of every
+    response passed to :meth:`update_from_headers`.  Call :meth:`acquire`
+    (or :meth:`acquire_async`) before each request.  The limiter is
+    thread-safe and may be shared between several :class:`Analyzer`
+    instances.
+    """
+
+    def __init__(
+        self,
+        limits: Mapping[str, Mapping[str, float]] | None = None,
+        backoff_base: float = RATE_LIMIT_BACKOFF_BASE,
+        backoff_max: float = RATE_LIMIT_BACKOFF_MAX,
+    ) -> None:
+        self._defaults = dict(limits if limits is not None else RATE_LIMITS)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._models: dict[str, _ModelLimits] = {}
+        self._lock = threading.Lock()
+
+    def _model(self, model: str) -> _ModelLimits:
+        state = self._models.get(model)
+        if state is None:
+            default = self._defaults.get(
+                model, {"requests": 500, "tokens": 200_000}
+            )
+            state = _ModelLimits(default["requests"], default["tokens"])
+            self._models[model] = state
+        return state
+
+    def _reserve(self, model: str, tokens: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            state = self._model(model)
+            wait = max(
+                state.requests.reserve(1, now),
+                state.tokens.reserve(tokens, now),
+                state.paused_until - now,
+            )
+            if wait > 0:
+                state.waiting += 1
+            return wait
+
+    def _done_waiting(self, model: str) -> None:
+        with self._lock:
+            self._model(model).waiting -= 1
+
+    def acquire(self, model: str, tokens: int = 0) -> float:
+        """Block until a request of ``tokens`` tokens may be sent.
+
+        Returns the number of seconds spent waiting.
+        """
+        wait = self._reserve(model, tokens)
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            finally:
+                self._done_waiting(model)
+        return wait
+
+    async def acquire_async(self, model: str, tokens: int = 0) -> float:
+        """Asynchronous counterpart of :meth:`acquire`."""
+        wait = self._reserve(model, tokens)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self._done_waiting(model)
+        return wait
+
+    def update_from_headers(
+        self, model: str, headers: Mapping[str, str] | None
+    ) -> float | None:
+        """Learn limits from response headers.
+
+        Returns the ``Retry-After`` delay in seconds when the server sent
+        one; the model is paused for that long.
+        """
+        if not headers:
+            return None
+        now = time.monotonic()
+
+        def number(name: str) -> float | None:
+            try:
+                return float(headers.get(name))
+            except (TypeError, ValueError):
+                return None
+
+        retry_after = None
+        if headers.get("retry-after-ms"):
+            retry_after = (number("retry-after-ms") or 0) / 1000.0
+        elif headers.get("retry-after"):
+            retry_after = number("retry-after")
+        with self._lock:
+            state = self._model(model)
+            for kind, bucket in (
+                ("requests", state.requests),
+                ("tokens", state.tokens),
+            ):
+                bucket.sync(
+                    number(f"x-ratelimit-limit-{kind}"),
+                    number(f"x-ratelimit-remaining-{kind}"),
+                    parse_duration(headers.get(f"x-ratelimit-reset-{kind}")),
+                    now,
+                )
+            if retry_after:
+                state.paused_until = max(
+                    state.paused_until, now + retry_after
+                )
+        return retry_after
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        """Return the delay before retry number ``attempt`` (from 0).
+
+        Uses exponential backoff with full jitter, but never less than a
+        server-provided ``retry_after``.
+        """
+        ceiling = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        delay = random.uniform(0, ceiling)
+        return max(delay, retry_after or 0.0)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Return current limits, available budget and queue depth."""
+        now = time.monotonic()
+        with self._lock:
+            out: dict[str, dict[str, Any]] = {}
+            for model, state in self._models.items():
+                state.requests._refill(now)
+                state.tokens._refill(now)
+                out[model] = {
+                    "requests_per_minute": state.requests.limit,
+                    "tokens_per_minute": state.tokens.limit,
+                    "requests_available": state.requests.level,
+                    "tokens_available": state.tokens.level,
+                    "paused_for": max(0.0, state.paused_until - now),
+                    "waiting": state.waiting,
+                }
+            return out
+
+
+_default_limiter: RateLimiter | None = None
+_default_lock = threading.Lock()
+
+
+def default_rate_limiter() -> RateLimiter:
+    """Return the process-wide limiter shared by all analyzers."""
+    global _default_limiter
+    with _default_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter()
+        return _default_limiter
@@ -1,11 +1,31 @@
-from typing import Optional, List, Dict
-import time
-from config.settings import SCRAPE_DELAY_SECONDS
+import logging
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, List, Dict, Tuple
+from config.settings import (
+    NITTER_INSTANCES,
+    NITTER_MAX_RETRIES,
+    SCRAPE_PAGE_SIZE,
+    WATERMARK_PATH,
+    WATERMARK_STOP_AFTER_OLD_POSTS,
+)
+from modules.archiver import default_archiver
+from modules.instances import InstancePool
+from modules.metrics import default_metrics
+from modules.watermarks import WatermarkStore
 import pandas as pd
-import requests
 
 try:
     from ntscraper import Nitter
+
+    # ntscraper copies every log record into a multiprocessing queue that
+    # nothing reads.  Once the pipe is full, records pile up in memory and
+    # the interpreter hangs at exit trying to flush them, so detach it.
+    logging.getLogger().removeHandler(
+        getattr(sys.modules.get("ntscraper.nitter"), "log_handler", None)
+    )
     SCRAPE_AVAILABLE = True
     SCRAPE_IMPORT_ERROR: Exception | None = None
 except Exception as e:  # pragma: no cover - environment dependent
@@ -14,43 +34,292 @@ except Exception as e:  # pragma: no cover - environment dependent
     Nitter = None  # type: ignore
 
 
-class Scraper:
-    def __init__(self, instance: str | None = "https://nitter.net") -> None:
+# Warnings ntscraper logs when a request failed rather than found nothing.
+# "Empty page" (no posts and no error panel) is a valid empty result.
+_FAILURE_WARNINGS = ("Fetching error", "Max retries reached")
+
+
+class _FailureLog(logging.Handler):
+    """Collect ntscraper's failure warnings logged by the current thread."""
+
+    def __init__(self) -> None:
+        super().__init__(logging.WARNING)
+        self.thread = threading.get_ident()
+        self.messages: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        message = record.getMessage()
+        if record.thread == self.thread and message.startswith(
+            _FAILURE_WARNINGS
+        ):
+            self.messages.append(message)
+
+
+class _NitterClient:
+    """ntscraper client bound to a single Nitter instance.
+
+    With ``skip_instance_check`` ntscraper needs the instance on every call
+    and never resets its retry counter, which would otherwise leave the
+    client failing for good after a few errors.
+
+    ntscraper does not raise when an instance is unreachable, answers with
+    an HTTP error or serves an error page; it logs a warning and returns an
+    empty result, just as for a search without matches.  Calls that come
+    back empty after such a warning raise ``RuntimeError`` instead, so only
+    real failures reach the instance pool's circuit breaker.
+    """
+
+    def __init__(self, instance: str) -> None:
         self.instance = instance
-        self._nitter = (
-            self._create_nitter(instance) if SCRAPE_AVAILABLE else None
+        self.nitter = Nitter(instances=[instance], skip_instance_check=True)
+
+    def _call(self, method: Callable[..., object], *args, **kwargs) -> object:
+        self.nitter.retry_count = 0
+        log = _FailureLog()
+        root = logging.getLogger()
+        root.addHandler(log)
+        try:
+            result = method(*args, **kwargs)
+        finally:
+            root.removeHandler(log)
+        if log.messages and _is_empty_reply(result):
+            raise RuntimeError(f"{self.instance}: {log.messages[-1]}")
+        return result
+
+    def get_tweets(self, term: str, **options: object) -> object:
+        return self._call(
+            self.nitter.get_tweets,
+            term,
+            instance=self.instance,
+            max_retries=NITTER_MAX_RETRIES,
+            **options,
+        )
+
+    def get_profile_info(self, username: str) -> object:
+        return self._call(
+            self.nitter.get_profile_info,
+            username,
+            max_retries=NITTER_MAX_RETRIES,
+            instance=self.instance,
         )
+
+
+def _is_empty_reply(result: object) -> bool:
+    """Return ``True`` when ``result`` holds no profile, posts or threads."""
+    if not result:
+        return True
+    return isinstance(result, dict) and "tweets" in result and not (
+        result.get("tweets") or result.get("threads")
+    )
+
+
+class Scraper:
+    def __init__(
+        self,
+        instance: str | None = None,
+        instances: List[str] | None = None,
+        watermarks: WatermarkStore | None = None,
+    ) -> None:
+        """Create a scraper backed by a pool of Nitter instances.
+
+        ``instances`` (or the single ``instance``) default to
+        :data:`config.settings.NITTER_INSTANCES`.  ``watermarks`` is used
+        for incremental scraping and defaults to a store at
+        :data:`config.settings.WATERMARK_PATH`, opened on first use.
+        """
+        urls = instances or ([instance] if instance else NITTER_INSTANCES)
+        self.instance = urls[0]
+        self.pool = (
+            InstancePool(list(urls), self._create_nitter)
+            if SCRAPE_AVAILABLE
+            else None
+        )
+        self._watermarks = watermarks
         self._columns = ["timestamp", "url", "content", "user_name"]
 
-    def _create_nitter(self, instance: str):
-        """Return a configured :class:`Nitter` client."""
-        return Nitter(instances=[instance], skip_instance_check=True)
+    @property
+    def watermarks(self) -> WatermarkStore:
+        if self._watermarks is None:
+            self._watermarks = WatermarkStore(WATERMARK_PATH)
+        return self._watermarks
+
+    def _create_nitter(self, instance: str) -> _NitterClient:
+        """Return a client for the Nitter ``instance``."""
+        return _NitterClient(instance)
+
+    def _fetch_tweets(
+        self, term: str, mode: str, limit: int, incremental: bool = False
+    ) -> pd.DataFrame:
+        if incremental:
+            pages = list(self.iter_new_tweet_pages(term, mode, limit))
+        else:
+            pages = list(
+                self.iter_tweet_pages(term, mode, limit, page_size=limit)
+            )
+        if not pages:
+            return pd.DataFrame(columns=self._columns)
+        return pd.concat(pages, ignore_index=True)
+
+    @staticmethod
+    def _tweet_row(item: Dict[str, object]) -> Dict[str, object]:
+        return {
+            "timestamp": item.get("date"),
+            "url": item.get("link"),
+            "content": item.get("text"),
+            "user_name": item.get("user", {}).get("username"),
+        }
+
+    def iter_tweet_pages(
+        self,
+        term: str,
+        mode: str,
+        limit: int,
+        page_size: int | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        """Yield up to ``limit`` posts as DataFrames of ``page_size`` rows.
+
+        Each page is yielded as soon as it has been fetched, newest posts
+        first, so callers can start working before the whole ``limit`` has
+        been scraped.  ntscraper does not expose Nitter's cursor, so later
+        pages are requested with the ``until`` date filter set to the day
+        after the oldest of the user's own posts seen; pinned posts and
+        retweets keep their old dates and are ignored.  ``until`` only has
+        day resolution: the posts of that day already seen come first in
+        the next reply, so they are requested again on top of the page and
+        skipped.  A day
+        with more than ``page_size`` posts is therefore read in growing
+        requests, but no post is lost.  Scraping stops early when Nitter
+        returns fewer posts than requested or an error occurs.
+        """
 
-    def _fetch_tweets(self, term: str, mode: str, limit: int) -> pd.DataFrame:
         if not SCRAPE_AVAILABLE:
             print(f"ntscraper not available: {SCRAPE_IMPORT_ERROR}")
-            return pd.DataFrame(columns=self._columns)
+            return
 
-        tweets: List[Dict[str, object]] = []
+        page_size = max(1, page_size or SCRAPE_PAGE_SIZE)
+        seen: set[object] = set()
+        remaining = limit
+        until: str | None = None
+        # Posts at the head of the ``until`` window that were yielded before.
+        skip = 0
+        while remaining > 0:
+            number = skip + min(page_size, remaining)
+            options = {"until": until} if until else {}
+            try:
+                with default_metrics().stage("scrape"):
+                    data = self.pool.call(
+                        lambda nitter: nitter.get_tweets(
+                            term, mode=mode, number=number, **options
+                        )
+                    )
+                items = data.get("tweets", [])
+                rows = [self._tweet_row(item) for item in items]
+            except Exception as e:
+                print(f"{mode} error: {e}")
+                return
+            new = [row for row in rows if row["url"] not in seen][:remaining]
+            if new:
+                seen.update(row["url"] for row in new)
+                remaining -= len(new)
+                yield pd.DataFrame(new, columns=self._columns)
+            if len(rows) < number or remaining <= 0 or not new:
+                return
+            # Pinned posts and retweets sit at the top of a timeline with
+            # old dates; only the user's own posts place the window.
+            dates = parse_timestamps(
+                [
+                    row["timestamp"]
+                    for row, item in zip(rows, items)
+                    if not item.get("is-pinned") and not item.get("is-retweet")
+                ]
+            ).dt.normalize()
+            if dates.isna().all():
+                # No usable dates: keep the window and read further into it.
+                skip = len(rows)
+                continue
+            oldest = dates.min()
+            until = (oldest + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+            skip = int((dates == oldest).sum())
+
+    def iter_new_tweet_pages(
+        self,
+        term: str,
+        mode: str,
+        limit: int,
+        page_size: int | None = None,
+        commit: bool = True,
+    ) -> Iterator[pd.DataFrame]:
+        """Yield only posts newer than the target's watermark.
+
+        Works like :meth:`iter_tweet_pages` but stops as soon as the newest
+        post recorded in :attr:`watermarks` for ``(mode, term)`` is reached,
+        or after :data:`config.settings.WATERMARK_STOP_AFTER_OLD_POSTS`
+        consecutive posts older than it (retweets keep their original date,
+        so one old post alone does not end the scan).  Posts with the same
+        timestamp as the watermark are kept, since Nitter dates only have
+        minute resolution.
+
+        With ``commit`` the watermark is moved to the newest post returned
+        when the iteration completes.  Callers that store the pages later,
+        or consume them in another thread (e.g. through
+        :func:`modules.pipeline.prefetch`), should pass ``commit=False`` and
+        call :meth:`commit_watermark` once the rows are safely written.
+        """
+
+        mark = self.watermarks.get(mode, term)
+        mark_url = mark["url"] if mark else None
+        mark_time = (
+            parse_timestamps([mark["timestamp"]]).iloc[0] if mark else pd.NaT
+        )
+        newest: List[pd.DataFrame] = []
+        old_run = 0
+        stop = False
+        pages = self.iter_tweet_pages(term, mode, limit, page_size)
         try:
-            data = self._nitter.get_tweets(term, mode=mode, number=limit)
-            time.sleep(SCRAPE_DELAY_SECONDS)
-            for item in data.get("tweets", []):
-                tweets.append(
-                    {
-                        "timestamp": item.get("date"),
-                        "url": item.get("link"),
-                        "content": item.get("text"),
-                        "user_name": item.get("user", {}).get("username"),
-                    }
-                )
-        except Exception as e:
-            print(f"{mode} error: {e}")
-            return pd.DataFrame(columns=self._columns)
-        return pd.DataFrame(tweets, columns=self._columns)
+            for page in pages:
+                times = parse_timestamps(page["timestamp"])
+                keep: List[int] = []
+                for pos, (url, when) in enumerate(zip(page["url"], times)):
+                    if mark_url is not None and url == mark_url:
+                        stop = True
+                        break
+                    if not pd.isna(mark_time) and when < mark_time:
+                        old_run += 1
+                        if old_run >= WATERMARK_STOP_AFTER_OLD_POSTS:
+                            stop = True
+                            break
+                        continue
+                    old_run = 0
+                    keep.append(pos)
+                if keep:
+                    kept = page.iloc[keep].reset_index(drop=True)
+                    newest = [newest_post(pd.concat([*newest, kept]))]
+                    yield kept
+                if stop:
+                    break
+        finally:
+            pages.close()
+        if commit and newest:
+            self.commit_watermark(mode, term, newest[0])
+
+    def commit_watermark(
+        self, mode: str, term: str, posts: pd.DataFrame
+    ) -> None:
+        """Move the watermark of ``(mode, term)`` to the newest of ``posts``.
+
+        Does nothing when ``posts`` is empty.
+        """
+        post = newest_post(posts)
+        if not post.empty:
+            self.watermarks.set(
+                mode,
+                term,
+                str(post["timestamp"].iloc[0]),
+                str(post["url"].iloc[0]),
+            )
 
     def scrape_user_posts(
-        self, username: str, limit: int = 20
+        self, username: str, limit: int = 20, incremental: bool = False
     ) -> pd.DataFrame:
         """Scrape recent posts from an X (Twitter) user.
 
@@ -60,6 +329,9 @@ class Scraper:
             The user ID to scrape posts from.
         limit:
             Maximum number of posts to retrieve.
+        incremental:
+            When true, only posts newer than the last scrape of this user
+            are returned (see :meth:`iter_new_tweet_pages`).
 
         Returns
         -------
@@ -69,14 +341,98 @@ class Scraper:
             an empty DataFrame is returned.
         """
 
-        return self._fetch_tweets(username, "user", limit)
+        return self._fetch_tweets(username, "user", limit, incremental)
 
     def search_posts_by_keyword(
-        self, keyword: str, limit: int = 20
+        self, keyword: str, limit: int = 20, incremental: bool = False
     ) -> pd.DataFrame:
-        """Search posts by keyword using Nitter."""
+        """Search posts by keyword using Nitter.
+
+        With ``incremental`` only posts newer than the previous search for
+        ``keyword`` are returned."""
+
+        return self._fetch_tweets(keyword, "term", limit, incremental)
+
+    def scrape_many(
+        self,
+        targets: Iterable[Tuple[str, str]],
+        limit: int = 20,
+        page_size: int | None = None,
+        incremental: bool = False,
+        commit: bool = True,
+    ) -> Iterator[Tuple[Tuple[str, str], pd.DataFrame]]:
+        """Scrape several ``(term, mode)`` targets concurrently.
+
+        ``mode`` is ``"user"`` or ``"term"`` as for :meth:`_fetch_tweets`.
+        Targets are spread over the healthy instances of :attr:`pool`, one
+        worker per instance, each paging through its target with
+        :meth:`iter_tweet_pages` (or :meth:`iter_new_tweet_pages` with
+        ``incremental``, passing ``commit`` on).  ``(target, page)`` pairs
+        are yielded as the pages arrive, so pages of different targets
+        interleave while each target's pages keep their order.  Workers
+        wait while one page each is unconsumed, and closing the generator
+        early stops them.
+        """
 
-        return self._fetch_tweets(keyword, "term", limit)
+        targets = list(dict.fromkeys(targets))
+
+        def pages(target: Tuple[str, str]) -> Iterator[pd.DataFrame]:
+            term, mode = target
+            if incremental:
+                return self.iter_new_tweet_pages(
+                    term, mode, limit, page_size, commit=commit
+                )
+            return self.iter_tweet_pages(term, mode, limit, page_size)
+
+        workers = min(
+            len(targets), len(self.pool.healthy()) if self.pool else 1
+        )
+        if workers <= 1:
+            for target in targets:
+                for page in pages(target):
+                    yield target, page
+            return
+
+        buffer: queue.Queue = queue.Queue(maxsize=workers)
+        stop = threading.Event()
+
+        def put(item: object) -> None:
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def scrape(target: Tuple[str, str]) -> None:
+            try:
+                if stop.is_set():
+                    return
+                for page in pages(target):
+                    put((target, page))
+                    if stop.is_set():
+                        return
+            except BaseException as e:  # forwarded to the consumer
+                put(e)
+            finally:
+                # Marks the target as finished.
+                put(None)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for target in targets:
+                executor.submit(scrape, target)
+            finished = 0
+            try:
+                while finished < len(targets):
+                    item = buffer.get()
+                    if item is None:
+                        finished += 1
+                    elif isinstance(item, BaseException):
+                        raise item
+                    else:
+                        yield item
+            finally:
+                stop.set()
 
     def get_user_profile(self, username: str) -> Optional[dict[str, object]]:
         """Fetch basic profile information for ``username``.
@@ -88,7 +444,9 @@ class Scraper:
             return None
 
         try:
-            info = self._nitter.get_profile_info(username)
+            info = self.pool.call(
+                lambda nitter: nitter.get_profile_info(username)
+            )
             if not info:
                 return None
             return {
@@ -104,21 +462,45 @@ class Scraper:
             return None
 
 
+def parse_timestamps(values: "pd.Series | List[object]") -> pd.Series:
+    """Parse scraped ``timestamp`` values into naive UTC datetimes.
+
+    Nitter formats dates like ``"Jan 1, 2024 · 12:00 PM UTC"``; values that
+    cannot be parsed become ``NaT``.
+    """
+    cleaned = pd.Series(values, dtype=object).map(
+        lambda v: str(v).replace("·", "") if v is not None else None
+    )
+    parsed = pd.to_datetime(cleaned, errors="coerce", format="mixed", utc=True)
+    return parsed.dt.tz_localize(None)
+
+
+def newest_post(posts: pd.DataFrame) -> pd.DataFrame:
+    """Return the row of the newest post in ``posts`` as a DataFrame.
+
+    Posts without a parseable timestamp only count when no post has one;
+    the first of them is returned then.  Empty input gives an empty frame.
+    """
+    if posts.empty:
+        return posts.iloc[:0]
+    times = parse_timestamps(posts["timestamp"]).reset_index(drop=True)
+    pos = int(times.idxmax()) if times.notna().any() else 0
+    return posts.iloc[[pos]]
+
+
 def archive_url(url: str) -> str:
-    """Create a web archive of ``url`` using the Wayback Machine."""
+    """Create a web archive of ``url`` using the Wayback Machine.
 
+    Uses :func:`modules.archiver.default_archiver`, so URLs archived before
+    are answered from the registry; prefer :meth:`Archiver.archive_many`
+    for more than a few URLs.
+    """
+
+    archiver = default_archiver()
     try:
-        response = requests.get(
-            "https://web.archive.org/save/" + url,
-            timeout=10,
-        )
-        if response.status_code in (200, 302):
-            archive = response.headers.get("Content-Location")
-            if archive:
-                return "https://web.archive.org" + archive
-    except Exception as e:
-        print(f"archive error: {e}")
-    return ""
+        return archiver.archive(url)
+    finally:
+        archiver.close()
 
 
 if __name__ == "__main__":
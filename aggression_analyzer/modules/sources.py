@@ -0,0 +1,77 @@
+"""Chunked readers for files of posts."""
+
+import os
+from typing import Iterator
+
+import pandas as pd
+
+from config.settings import CLI_CHUNK_SIZE
+
+FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+}
+
+
+def detect_format(path: str, formats: dict[str, str] = FORMATS) -> str:
+    """Return the format of ``path`` (``"csv"``, ``"jsonl"``, ...).
+
+    ``formats`` maps lowercase extensions to format names.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in formats:
+        supported = " / ".join(sorted(formats))
+        raise ValueError(
+            f"対応していないファイル形式です: {path}（{supported} に対応）"
+        )
+    return formats[extension]
+
+
+def _read_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    fmt = detect_format(path)
+    if fmt == "csv":
+        with pd.read_csv(path, chunksize=chunk_size, dtype=str) as reader:
+            yield from reader
+    elif fmt == "jsonl":
+        with pd.read_json(
+            path, lines=True, chunksize=chunk_size, dtype=False
+        ) as reader:
+            yield from reader
+    else:
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        for batch in parquet.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+
+def iter_post_chunks(
+    path: str,
+    chunk_size: int = CLI_CHUNK_SIZE,
+    content_column: str = "content",
+) -> Iterator[pd.DataFrame]:
+    """Yield the posts in ``path`` as DataFrames of at most ``chunk_size``.
+
+    CSV, JSON Lines and Parquet files are read a chunk at a time, so memory
+    use depends on ``chunk_size`` and not on the size of the file.  Reading
+    Parquet requires ``pyarrow``.  ``content_column`` holds the post text
+    and is renamed to ``content``.  Each chunk has a ``RangeIndex`` that
+    continues where the previous one ended, so row labels stay unique.
+    """
+
+    offset = 0
+    for chunk in _read_chunks(path, max(1, chunk_size)):
+        if content_column not in chunk.columns:
+            raise ValueError(
+                f"列 '{content_column}' が {path} に見つかりません"
+            )
+        if content_column != "content":
+            chunk = chunk.drop(columns="content", errors="ignore").rename(
+                columns={content_column: "content"}
+            )
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield chunk
@@ -0,0 +1,47 @@
+"""Text normalization helpers shared by the analysis modules."""
+
+import re
+import unicodedata
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Return ``text`` in a canonical form for hashing and comparison.
+
+    Applies Unicode NFKC normalization (which also folds full-width
+    alphanumerics to half-width) and collapses runs of whitespace.  The
+    meaning of the text is unchanged, so two posts with the same normalized
+    form can share analysis results.  Values that are not strings, such as
+    the NaN of an empty CSV cell, normalize to ``""``.
+    """
+    if not isinstance(text, str):
+        text = ""
+    text = unicodedata.normalize("NFKC", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+_URL_RE = re.compile(r"https?://\S+|www\.\S+")
+_MENTION_RE = re.compile(r"@\w+")
+_RETWEET_RE = re.compile(r"^(?:rt|qt)\b:?\s*")
+
+
+def normalize_for_matching(text: str) -> str:
+    """Return ``text`` reduced to its content for duplicate detection.
+
+    On top of :func:`normalize_text` this drops URLs, ``@mentions``, a
+    leading ``RT``/``QT`` marker, punctuation and symbols and lowercases
+    the result, so copies of a post that only differ in links, addressees,
+    punctuation or width of the characters (full-width versus half-width,
+    as is common in Japanese) compare equal.
+    Unlike :func:`normalize_text` the output is not meant to be analyzed.
+    """
+    text = normalize_text(text).casefold()
+    text = _URL_RE.sub(" ", text)
+    text = _MENTION_RE.sub(" ", text)
+    text = _RETWEET_RE.sub("", text.strip())
+    text = "".join(
+        " " if unicodedata.category(char)[0] in "PS" else char
+        for char in text
+    )
+    return _WHITESPACE_RE.sub(" ", text).strip()
@@ -0,0 +1,69 @@
+"""Persistent per-target watermarks for incremental scraping."""
+
+import os
+import sqlite3
+import threading
+import time
+
+
+class WatermarkStore:
+    """Remember the newest post seen for each scrape target.
+
+    A target is a ``(mode, term)`` pair such as ``("user", "jack")`` or
+    ``("term", "keyword")``.  Values are kept in a small SQLite database so
+    they survive restarts.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS watermarks ("
+            " mode TEXT NOT NULL,"
+            " term TEXT NOT NULL,"
+            " timestamp TEXT,"
+            " url TEXT,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (mode, term))"
+        )
+        self._conn.commit()
+
+    def get(self, mode: str, term: str) -> dict[str, str | None] | None:
+        """Return ``{"timestamp", "url"}`` for the target, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT timestamp, url FROM watermarks"
+                " WHERE mode = ? AND term = ?",
+                (mode, term),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"timestamp": row[0], "url": row[1]}
+
+    def set(
+        self, mode: str, term: str, timestamp: str | None, url: str | None
+    ) -> None:
+        """Record the newest post seen for the target."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO watermarks"
+                " (mode, term, timestamp, url, updated_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (mode, term, timestamp, url, time.time()),
+            )
+            self._conn.commit()
+
+    def reset(self, mode: str, term: str) -> None:
+        """Forget the target so the next scrape starts from scratch."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM watermarks WHERE mode = ? AND term = ?",
+                (mode, term),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,402 @@
+"""Worker processes that share scraping and analysis through a job queue.
+
+Examples::
+
+    python aggression_analyzer/worker.py enqueue --input posts.csv
+    python aggression_analyzer/worker.py enqueue --user someone --limit 5000
+    python aggression_analyzer/worker.py run --exit-when-empty
+    python aggression_analyzer/worker.py status
+    python aggression_analyzer/worker.py collect -o out.csv
+
+Start ``run`` in as many processes as wanted.  Workers on other hosts can
+share the queue through ``serve``::
+
+    python aggression_analyzer/worker.py serve --host 0.0.0.0 --port 8765
+    python aggression_analyzer/worker.py --queue http://queue-host:8765 run
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Any, Sequence
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from config.settings import (
+    JOBQUEUE_CHUNK_SIZE,
+    JOBQUEUE_HEARTBEAT_SECONDS,
+    JOBQUEUE_PATH,
+    JOBQUEUE_POLL_SECONDS,
+    RATE_LIMITS,
+)
+from modules.analyzer import Analyzer
+from modules.exporter import ResultWriter
+from modules.jobqueue import Job, JobQueue, NewJob, open_queue, serve_queue
+from modules.metrics import default_metrics
+from modules.ratelimit import RateLimiter
+from modules.scraper import SCRAPE_AVAILABLE, Scraper, newest_post
+from modules.sources import iter_post_chunks
+
+# Job kinds.
+SCRAPE = "scrape"
+ANALYZE = "analyze"
+
+# ``(mode, term, posts)`` for :meth:`Scraper.commit_watermark`.
+Watermark = tuple[str, str, pd.DataFrame]
+
+
+def records(df: pd.DataFrame) -> list[dict[str, Any]]:
+    """Convert ``df`` to JSON-compatible row dicts (missing values: None)."""
+    return json.loads(
+        df.to_json(orient="records", date_format="iso", force_ascii=False)
+    )
+
+
+def enqueue_file(
+    queue: Any,
+    path: str,
+    chunk_size: int = JOBQUEUE_CHUNK_SIZE,
+    content_column: str = "content",
+) -> int:
+    """Add one analysis job per ``chunk_size`` posts of ``path``.
+
+    Jobs are keyed by the file and row range, so enqueueing the same file
+    again adds nothing.  Returns the number of jobs added.
+    """
+    source = os.path.abspath(path)
+    added = 0
+    for chunk in iter_post_chunks(path, chunk_size, content_column):
+        key = f"input:{source}:{chunk.index[0]}-{chunk.index[-1]}"
+        added += queue.put(ANALYZE, {"rows": records(chunk)}, key)
+    return added
+
+
+def enqueue_targets(
+    queue: Any,
+    users: Sequence[str],
+    keywords: Sequence[str],
+    limit: int,
+    incremental: bool = False,
+) -> int:
+    """Add one scrape job per user and keyword; return how many."""
+    targets = [("user", u) for u in users] + [("term", k) for k in keywords]
+    return queue.put_many(
+        (
+            SCRAPE,
+            {
+                "mode": mode,
+                "term": term,
+                "limit": limit,
+                "incremental": incremental,
+            },
+            None,
+        )
+        for mode, term in targets
+    )
+
+
+def process_job(
+    job: Job,
+    analyzer: Analyzer | None,
+    scraper: Scraper | None,
+    options: dict[str, Any],
+    chunk_size: int = JOBQUEUE_CHUNK_SIZE,
+) -> tuple[list[dict[str, Any]] | None, list[NewJob], Watermark | None]:
+    """Run ``job``; return its result rows, follow-up jobs and watermark.
+
+    A scrape job yields one analysis job per ``chunk_size`` scraped posts,
+    tagged with their ``target`` like the command line runner does.  An
+    incremental scrape also returns ``(mode, term, posts)`` for
+    :meth:`Scraper.commit_watermark`, to be committed only once the
+    follow-up jobs are stored.  An analysis job returns the analyzed rows.
+    """
+    payload = job.payload
+    if job.kind == SCRAPE:
+        mode, term = payload["mode"], payload["term"]
+        incremental = bool(payload.get("incremental"))
+        if incremental:
+            pages = scraper.iter_new_tweet_pages(
+                term, mode, payload["limit"], chunk_size, commit=False
+            )
+        else:
+            pages = scraper.iter_tweet_pages(
+                term, mode, payload["limit"], chunk_size
+            )
+        follow_ups: list[NewJob] = []
+        newest: list[pd.DataFrame] = []
+        for page in pages:
+            follow_ups.append((
+                ANALYZE,
+                {"rows": records(page.assign(target=f"{mode}:{term}"))},
+                None,
+            ))
+            if incremental:
+                newest = [newest_post(pd.concat([*newest, page]))]
+        watermark = (mode, term, newest[0]) if newest else None
+        return None, follow_ups, watermark
+    if job.kind == ANALYZE:
+        df = pd.DataFrame(payload["rows"])
+        result = analyzer.analyze_dataframe_in_parallel(df, **options)
+        return records(result), [], None
+    raise ValueError(f"unknown job kind: {job.kind}")
+
+
+class _Heartbeat:
+    """Extend a job's lease in the background while it is processed."""
+
+    def __init__(self, queue: Any, job: Job, interval: float) -> None:
+        self.queue = queue
+        self.job = job
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.queue.heartbeat(self.job):
+                    logging.warning("lost the lease of job %s", self.job.id)
+                    return
+            except Exception:
+                logging.exception("heartbeat for job %s failed", self.job.id)
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(
+    queue: Any,
+    analyzer: Analyzer | None,
+    scraper: Scraper | None = None,
+    worker_id: str | None = None,
+    options: dict[str, Any] | None = None,
+    chunk_size: int = JOBQUEUE_CHUNK_SIZE,
+    exit_when_empty: bool = False,
+    poll_seconds: float = JOBQUEUE_POLL_SECONDS,
+    heartbeat_seconds: float = JOBQUEUE_HEARTBEAT_SECONDS,
+) -> int:
+    """Lease and run jobs until the queue is empty or forever.
+
+    Without a ``scraper`` only analysis jobs are leased, and without an
+    ``analyzer`` only scrape jobs.  A job that raises is recorded as
+    failed and retried later, possibly by another worker.  On
+    ``KeyboardInterrupt`` the current job is returned to the queue.
+    Returns the number of jobs completed.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    kinds = [
+        kind
+        for kind, runner in ((SCRAPE, scraper), (ANALYZE, analyzer))
+        if runner is not None
+    ]
+    completed = 0
+    while True:
+        job = queue.lease(worker_id, kinds)
+        if job is None:
+            if exit_when_empty:
+                counts = queue.counts()
+                # Leased jobs may still fail or add follow-up jobs.
+                if not counts["queued"] and not counts["leased"]:
+                    return completed
+            time.sleep(poll_seconds)
+            continue
+        try:
+            with _Heartbeat(queue, job, heartbeat_seconds):
+                rows, follow_ups, watermark = process_job(
+                    job, analyzer, scraper, options or {}, chunk_size
+                )
+        except KeyboardInterrupt:
+            queue.release(job)
+            raise
+        except Exception as e:
+            logging.exception("job %s failed", job.id)
+            queue.fail(job, f"{type(e).__name__}: {e}")
+            continue
+        if queue.complete(job, rows, follow_ups):
+            completed += 1
+            # Only now are the scraped posts safe in the queue.
+            if watermark is not None:
+                scraper.commit_watermark(*watermark)
+        else:
+            logging.warning(
+                "job %s was taken over by another worker", job.id
+            )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="ジョブキューを使って複数のプロセス・ホストで分析を分担します。"
+    )
+    parser.add_argument(
+        "--queue",
+        default=JOBQUEUE_PATH,
+        help="ジョブキューのファイル、または serve で公開したキューのURL",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="ジョブを追加する")
+    enqueue.add_argument(
+        "--user", action="append", default=[], help="分析するユーザー名"
+    )
+    enqueue.add_argument(
+        "--keyword", action="append", default=[], help="検索キーワード"
+    )
+    enqueue.add_argument(
+        "--input", help="投稿ファイル（.csv / .jsonl / .parquet）"
+    )
+    enqueue.add_argument(
+        "--content-column",
+        default="content",
+        help="--input で本文が入っている列名",
+    )
+    enqueue.add_argument(
+        "--limit", type=int, default=20,
+        help="ユーザー・キーワードごとの取得件数",
+    )
+    enqueue.add_argument(
+        "--incremental", action="store_true",
+        help="前回の取得以降の新しい投稿だけを取得する",
+    )
+    enqueue.add_argument(
+        "--chunk-size", type=int, default=JOBQUEUE_CHUNK_SIZE,
+        help="分析ジョブ1件あたりの投稿数",
+    )
+
+    run = commands.add_parser("run", help="ジョブを取得して処理する")
+    run.add_argument("--worker-id", help="ワーカー名（既定: ホスト名-PID）")
+    run.add_argument(
+        "--exit-when-empty", action="store_true",
+        help="処理待ちのジョブがなくなったら終了する",
+    )
+    run.add_argument(
+        "--chunk-size", type=int, default=JOBQUEUE_CHUNK_SIZE,
+        help="取得した投稿を分析ジョブにまとめる件数",
+    )
+    run.add_argument(
+        "--rate-share", type=int, default=1,
+        help="APIのレート制限を分け合うワーカー数（初期の上限をこの数で割る。"
+        "ワーカー間の調整はしない）",
+    )
+    run.add_argument(
+        "--pack-size", type=int, help="1リクエストで採点する投稿数"
+    )
+    run.add_argument(
+        "--no-dedup", action="store_true", help="重複投稿をまとめない"
+    )
+    run.add_argument(
+        "--prefilter", action="store_true",
+        help="低リスク投稿をAPIに送らない",
+    )
+    run.add_argument(
+        "--cascade", action="store_true",
+        help="モデレーションで高リスクの投稿だけを採点する",
+    )
+
+    commands.add_parser("status", help="状態ごとのジョブ数を表示する")
+    commands.add_parser("retry", help="失敗したジョブを再実行する")
+
+    collect = commands.add_parser("collect", help="分析結果を書き出す")
+    collect.add_argument(
+        "-o", "--output", required=True,
+        help="結果の出力先（.csv / .jsonl / .parquet / .xlsx）",
+    )
+
+    serve = commands.add_parser(
+        "serve", help="ほかのホストのワーカーにキューを公開する"
+    )
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        if args.queue.startswith(("http://", "https://")):
+            parser.error("serve にはキューのファイルを指定してください")
+        server = serve_queue(JobQueue(args.queue), args.host, args.port)
+        host, port = server.server_address[:2]
+        print(f"http://{host}:{port}", flush=True)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return 0
+
+    queue = open_queue(args.queue)
+    try:
+        if args.command == "enqueue":
+            if args.input and (args.user or args.keyword):
+                parser.error("--input と --user/--keyword は同時に指定できません")
+            if args.input:
+                added = enqueue_file(
+                    queue, args.input, args.chunk_size, args.content_column
+                )
+            elif args.user or args.keyword:
+                added = enqueue_targets(
+                    queue, args.user, args.keyword, args.limit,
+                    args.incremental,
+                )
+            else:
+                parser.error(
+                    "--input、--user、--keyword のいずれかを指定してください"
+                )
+            print(f"{added} 件のジョブを追加しました", file=sys.stderr)
+        elif args.command == "run":
+            load_dotenv()
+            share = max(1, args.rate_share)
+            limiter = RateLimiter({
+                model: {name: value / share for name, value in limit.items()}
+                for model, limit in RATE_LIMITS.items()
+            })
+            options = {
+                "pack_size": args.pack_size,
+                "dedup": False if args.no_dedup else None,
+                "prefilter": args.prefilter or None,
+                "cascade": args.cascade or None,
+            }
+            completed = run_worker(
+                queue,
+                Analyzer(rate_limiter=limiter),
+                Scraper() if SCRAPE_AVAILABLE else None,
+                args.worker_id,
+                options,
+                args.chunk_size,
+                args.exit_when_empty,
+            )
+            print(f"{completed} 件のジョブを処理しました", file=sys.stderr)
+            print(default_metrics().summary(), file=sys.stderr)
+        elif args.command == "status":
+            for status, count in queue.counts().items():
+                print(f"{status}: {count}")
+        elif args.command == "retry":
+            print(f"{queue.retry_failed()} 件のジョブを再実行します", file=sys.stderr)
+        elif args.command == "collect":
+            with ResultWriter(args.output) as writer:
+                for rows in queue.iter_results():
+                    if rows:
+                        writer.write(pd.DataFrame(rows))
+            print(
+                f"{writer.rows} 件の結果を {args.output} に保存しました",
+                file=sys.stderr,
+            )
+    finally:
+        queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Benchmark near-duplicate detection on synthetic copypasta.
+
+Run from the repository root::
+
+    python benchmarks/bench_dedup.py --sizes 10000 50000 100000
+
+Half of the generated posts are lightly edited copies (changed ending,
+added mention and URL) of the other half.  The time per post should stay
+roughly flat as the index grows, because each lookup only compares the
+candidates that share an LSH band instead of every indexed post.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+from modules.dedup import DuplicateIndex, find_duplicates
+
+# Hiragana plus common kanji, so posts look like short Japanese text.
+_ALPHABET = [chr(c) for c in range(0x3041, 0x3097)] + [
+    chr(c) for c in range(0x4E00, 0x4E00 + 300)
+]
+
+
+def make_posts(rows: int, seed: int = 0) -> pd.Series:
+    rng = random.Random(seed)
+    originals = [
+        "".join(rng.choices(_ALPHABET, k=rng.randint(30, 120)))
+        for _ in range(rows - rows // 2)
+    ]
+    copies = [
+        f"@user{i} {text[:-2]}！！ https://t.co/{i}"
+        for i, text in enumerate(originals[: rows // 2])
+    ]
+    return pd.Series(originals + copies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 50_000, 100_000]
+    )
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'time (s)':>10} {'us/post':>9} {'duplicates':>11}")
+    for rows in args.sizes:
+        posts = make_posts(rows)
+        start = time.perf_counter()
+        duplicate_of = find_duplicates(posts, DuplicateIndex(near=True))
+        elapsed = time.perf_counter() - start
+        found = int(duplicate_of.notna().sum())
+        print(
+            f"{rows:>10} {elapsed:>10.2f} {elapsed / rows * 1e6:>9.0f}"
+            f" {found:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Benchmark saving analysis results in each export format.
+
+Run from the repository root::
+
+    python benchmarks/bench_export.py --rows 100000
+
+``to_excel`` is the previous GUI save path (``DataFrame.to_excel``, which
+builds the whole workbook in memory); the other formats go through
+``modules.exporter.export_dataframe``.  Each format runs in its own
+process and the reported memory is how much the peak resident set size
+grew while saving (Unix only, as it relies on :mod:`resource`).
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+from modules.analyzer import RESULT_COLUMNS
+from modules.exporter import export_dataframe
+
+FORMATS = ["to_excel", "xlsx", "csv", "jsonl", "parquet"]
+
+
+def make_results(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data: dict[str, object] = {
+        "timestamp": ["Jan 1, 2024 · 10:00 AM UTC"] * rows,
+        "url": [f"https://x.com/user/status/{i}" for i in range(rows)],
+        "content": ["これはテスト投稿です。" * 5] * rows,
+        "user_name": ["user"] * rows,
+    }
+    for name in RESULT_COLUMNS:
+        if name.endswith("_flag"):
+            data[name] = rng.random(rows) > 0.9
+        elif name == "aggressiveness_score":
+            data[name] = pd.array(rng.integers(0, 11, rows), dtype="Int8")
+        elif name.endswith("_score"):
+            data[name] = rng.random(rows).astype(np.float32)
+        else:
+            data[name] = ["攻撃的な表現は含まれていません。"] * rows
+    data["total_aggression"] = rng.random(rows) * 10
+    return pd.DataFrame(data)
+
+
+def save(df: pd.DataFrame, fmt: str, directory: str) -> str:
+    if fmt == "to_excel":
+        path = os.path.join(directory, "legacy.xlsx")
+        df.to_excel(path, index=False)
+    else:
+        path = os.path.join(directory, f"results.{fmt}")
+        export_dataframe(df, path)
+    return path
+
+
+def peak_rss_bytes() -> int:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_one(fmt: str, rows: int) -> dict[str, float]:
+    df = make_results(rows)
+    with tempfile.TemporaryDirectory() as directory:
+        before = peak_rss_bytes()
+        start = time.perf_counter()
+        path = save(df, fmt, directory)
+        elapsed = time.perf_counter() - start
+        grown = peak_rss_bytes() - before
+        size = os.path.getsize(path)
+    return {"time": elapsed, "peak": grown, "size": size}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument(
+        "--formats", nargs="+", choices=FORMATS, default=FORMATS
+    )
+    parser.add_argument("--child", choices=FORMATS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_one(args.child, args.rows)))
+        return
+
+    print(
+        f"{'format':>10} {'time (s)':>10} {'peak (MB)':>10}"
+        f" {'size (MB)':>10}"
+    )
+    for fmt in args.formats:
+        output = subprocess.run(
+            [
+                sys.executable, __file__,
+                "--child", fmt, "--rows", str(args.rows),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output)
+        print(
+            f"{fmt:>10} {result['time']:>10.2f}"
+            f" {result['peak'] / 2**20:>10.1f}"
+            f" {result['size'] / 2**20:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark the cold start of the GUI entry point.
+
+Run from the repository root::
+
+    python benchmarks/bench_startup.py --runs 5
+
+Every run is a fresh interpreter, so nothing is shared between runs
+beyond the operating system's file cache.  ``import`` is the time taken
+by the imports of ``aggression_analyzer/main.py``; ``first frame`` is the
+time from interpreter start-up until the main window is mapped, which
+needs a display (it is reported as ``n/a`` without one).  The heavy
+modules that the entry point should not load before the window is shown
+are listed when they are loaded anyway.  With ``--max-import-ms`` the
+script exits with status 1 when the median import time is above the
+limit, so it can guard against regressions in CI.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'aggression_analyzer'
+)
+
+# Modules that must only be imported once the user starts a run.
+HEAVY_MODULES = ["pandas", "openai", "ntscraper", "requests"]
+
+
+def run_child() -> dict[str, object]:
+    started = time.perf_counter()
+    sys.path.insert(0, APP_DIR)
+    import main  # noqa: F401
+
+    imported = time.perf_counter()
+    result: dict[str, object] = {
+        "import": imported - started,
+        "first_frame": None,
+        "heavy": [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+    import tkinter as tk
+
+    from gui.app import ModerationApp
+
+    try:
+        app = ModerationApp()
+    except tk.TclError:
+        return result
+    try:
+        deadline = time.monotonic() + 30
+        while not app.winfo_ismapped() and time.monotonic() < deadline:
+            app.update()
+        # Time until the window is mapped, counted from the first import.
+        result["first_frame"] = time.perf_counter() - started
+    finally:
+        app.destroy()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child()))
+        return
+
+    results = []
+    process_times = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, __file__, "--child"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        process_times.append(time.perf_counter() - start)
+        results.append(json.loads(output.splitlines()[-1]))
+
+    def median_ms(values: list[float]) -> str:
+        return f"{statistics.median(values) * 1000:.0f}"
+
+    frames = [r["first_frame"] for r in results if r["first_frame"]]
+    print(f"{'measure':>14} {'median (ms)':>12}")
+    print(f"{'import':>14} {median_ms([r['import'] for r in results]):>12}")
+    print(
+        f"{'first frame':>14}"
+        f" {median_ms(frames) if frames else 'n/a':>12}"
+    )
+    print(f"{'process':>14} {median_ms(process_times):>12}")
+    heavy = sorted({name for r in results for name in r["heavy"]})
+    if heavy:
+        print(f"loaded at start-up: {', '.join(heavy)}")
+
+    import_ms = statistics.median(r["import"] for r in results) * 1000
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        print(
+            f"import took {import_ms:.0f} ms,"
+            f" over the {args.max_import_ms:.0f} ms limit",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""Benchmark analysis throughput against a local fake OpenAI server.
+
+Run from the repository root::
+
+    python benchmarks/bench_throughput.py --sizes 200 1000 --workers 4 16 \\
+        --latency-ms 300 --error-rate 0.02 --output throughput.json
+
+``benchmarks/fake_openai_server.py`` is started in its own process with
+the given latency distribution, rate limit and error injection, and every
+combination of ``--modes``, ``--sizes`` and ``--workers`` is run in a
+fresh process against it:
+
+* ``threaded``: ``analyze_dataframe_in_parallel`` with one post per chat
+  request and ``MAX_CONCURRENT_WORKERS`` set to the worker count;
+* ``packed``: the same with ``pack_size=--pack-size``;
+* ``asyncio``: ``analyze_dataframe_with_asyncio`` with
+  ``max_concurrency`` set to the worker count.
+
+Each run uses an empty result cache and no dedup or prefilter, so every
+post goes to the server.  Reported per run: posts per second, p50/p99
+per-post scoring latency (the scoring call that produced a post,
+including rate-limit waits and retries; posts of one pack share its
+latency), the client's retry count, failed rows, the peak resident set
+size of the run's process and the server's request counters.  The JSON
+written to ``--output`` (stdout by default) also records the commit and
+the settings, so results of different commits can be compared; the table
+goes to stderr.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from typing import Any
+
+APP_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'aggression_analyzer'
+)
+SERVER = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'fake_openai_server.py'
+)
+
+MODES = ["threaded", "packed", "asyncio"]
+
+
+def make_posts(size: int) -> list[str]:
+    return [
+        f"投稿 {i}: お前なんか死ね" if i % 5 == 0
+        else f"投稿 {i}: 今日はいい天気で散歩が楽しかった"
+        for i in range(size)
+    ]
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(
+    mode: str, size: int, workers: int, url: str, pack_size: int, rpm: float
+) -> dict[str, Any]:
+    sys.path.insert(0, APP_DIR)
+    import pandas as pd
+
+    import modules.analyzer as analyzer_module
+    from config.settings import AGGRESSION_ANALYSIS_MODEL, MODERATION_MODEL
+    from modules.cache import ResultCache
+    from modules.ratelimit import RateLimiter
+
+    analyzer_module.MAX_CONCURRENT_WORKERS = workers
+    limit = {"requests": rpm or 1_000_000, "tokens": 1_000_000_000}
+    directory = tempfile.mkdtemp()
+    analyzer = analyzer_module.Analyzer(
+        api_key="bench",
+        base_url=url,
+        cache=ResultCache(os.path.join(directory, "cache.sqlite3")),
+        rate_limiter=RateLimiter(
+            {AGGRESSION_ANALYSIS_MODEL: limit, MODERATION_MODEL: limit}
+        ),
+    )
+
+    latencies: list[float] = []
+    retries = [0]
+    lock = threading.Lock()
+    nested = threading.local()
+
+    def timed(method: Any, posts: Any) -> Any:
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if getattr(nested, "active", False):
+                return method(*args, **kwargs)
+            nested.active = True
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                nested.active = False
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.extend([elapsed] * posts(*args))
+
+        return wrapper
+
+    def timed_async(method: Any) -> Any:
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+        return wrapper
+
+    retry_delay = analyzer._retry_delay
+
+    def count_retry(*args: Any, **kwargs: Any) -> float:
+        with lock:
+            retries[0] += 1
+        return retry_delay(*args, **kwargs)
+
+    analyzer._retry_delay = count_retry
+    analyzer.get_aggressiveness_score = timed(
+        analyzer.get_aggressiveness_score, lambda *args: 1
+    )
+    analyzer.get_aggressiveness_scores_packed = timed(
+        analyzer.get_aggressiveness_scores_packed, lambda texts: len(texts)
+    )
+    analyzer.get_aggressiveness_score_async = timed_async(
+        analyzer.get_aggressiveness_score_async
+    )
+
+    df = pd.DataFrame({"content": make_posts(size)})
+    options: dict[str, Any] = {"dedup": False, "prefilter": False}
+    start = time.perf_counter()
+    if mode == "asyncio":
+        result = analyzer.analyze_dataframe_with_asyncio(
+            df, max_concurrency=workers, **options
+        )
+    else:
+        result = analyzer.analyze_dataframe_in_parallel(
+            df, pack_size=pack_size if mode == "packed" else 1, **options
+        )
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": elapsed,
+        "posts_per_second": size / elapsed,
+        "latency_p50_ms": percentile(latencies, 0.50) * 1000,
+        "latency_p99_ms": percentile(latencies, 0.99) * 1000,
+        "retries": retries[0],
+        "failed_rows": int(result["aggressiveness_score"].isna().sum()),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def start_server(args: argparse.Namespace) -> tuple[subprocess.Popen, str]:
+    server = subprocess.Popen(
+        [
+            sys.executable, SERVER,
+            "--latency-ms", str(args.latency_ms),
+            "--latency-dist", args.latency_dist,
+            "--rpm", str(args.rpm),
+            "--error-rate", str(args.error_rate),
+            "--server-error-rate", str(args.server_error_rate),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    return server, server.stdout.readline().strip()
+
+
+def server_call(url: str, path: str, method: str = "GET") -> dict[str, Any]:
+    root = url.rsplit("/v1", 1)[0]
+    request = urllib.request.Request(
+        root + path, data=b"{}" if method == "POST" else None, method=method
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 1000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--pack-size", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument(
+        "--latency-dist",
+        choices=["fixed", "uniform", "exponential", "lognormal"],
+        default="lognormal",
+    )
+    parser.add_argument(
+        "--rpm", type=float, default=0.0,
+        help="server and client request limit per minute (0: unlimited)",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--server-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", default="-")
+    parser.add_argument("--child", nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, size, workers, url = args.child
+        print(json.dumps(run_child(
+            mode, int(size), int(workers), url, args.pack_size, args.rpm
+        )))
+        return
+
+    server, url = start_server(args)
+    runs = []
+    print(
+        f"{'mode':>9} {'posts':>6} {'workers':>7} {'posts/s':>8}"
+        f" {'p50 ms':>7} {'p99 ms':>7} {'retries':>7} {'RSS MB':>7}",
+        file=sys.stderr,
+    )
+    try:
+        for mode in args.modes:
+            for size in args.sizes:
+                for workers in args.workers:
+                    server_call(url, "/reset", "POST")
+                    output = subprocess.run(
+                        [
+                            sys.executable, __file__,
+                            "--pack-size", str(args.pack_size),
+                            "--rpm", str(args.rpm),
+                            "--child", mode, str(size), str(workers), url,
+                        ],
+                        check=True,
+                        capture_output=True,
+                        text=True,
+                    ).stdout
+                    result = json.loads(output.splitlines()[-1])
+                    result.update(mode=mode, posts=size, workers=workers)
+                    result["server"] = server_call(url, "/stats")
+                    runs.append(result)
+                    print(
+                        f"{mode:>9} {size:>6} {workers:>7}"
+                        f" {result['posts_per_second']:>8.1f}"
+                        f" {result['latency_p50_ms']:>7.0f}"
+                        f" {result['latency_p99_ms']:>7.0f}"
+                        f" {result['retries']:>7}"
+                        f" {result['peak_rss_mb']:>7.0f}",
+                        file=sys.stderr,
+                    )
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "settings": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("child", "output")
+        },
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Benchmark the vectorized ``total_aggression`` against the row-wise one.
+
+Run from the repository root::
+
+    python benchmarks/bench_total_aggression.py --sizes 10000 100000 1000000
+
+The row-wise baseline is the ``df.apply(..., axis=1)`` formula that
+``Analyzer`` used before the score was computed column-wise.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+from config.settings import WEIGHTS
+from modules.analyzer import Analyzer
+
+
+def legacy_total_aggression(row: pd.Series) -> float:
+    return (
+        WEIGHTS.get("hate_score", 0.5) * row.get("hate_score", 0)
+        + WEIGHTS.get("hate/threatening_score", 0.3)
+        * row.get("hate/threatening_score", 0)
+        + WEIGHTS.get("violence_score", 0.3) * row.get("violence_score", 0)
+        + WEIGHTS.get("sexual_score", 0.1) * row.get("sexual_score", 0)
+        + WEIGHTS.get("sexual/minors_score", 0.1)
+        * row.get("sexual/minors_score", 0)
+        + WEIGHTS.get("aggressiveness_score", 0.5)
+        * (row.get("aggressiveness_score") or 0)
+        + WEIGHTS.get("hate_flag", 2.0) * (1 if row.get("hate_flag") else 0)
+        + WEIGHTS.get("hate/threatening_flag", 1.0)
+        * (1 if row.get("hate/threatening_flag") else 0)
+        + WEIGHTS.get("violence_flag", 1.5)
+        * (1 if row.get("violence_flag") else 0)
+        + WEIGHTS.get("sexual_flag", 1.0)
+        * (1 if row.get("sexual_flag") else 0)
+    )
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data: dict[str, object] = {}
+    for name in [
+        "hate", "hate/threatening", "sexual", "sexual/minors", "violence"
+    ]:
+        data[f"{name}_score"] = rng.random(rows)
+        data[f"{name}_flag"] = rng.random(rows) > 0.9
+    data["aggressiveness_score"] = rng.integers(0, 11, rows)
+    return pd.DataFrame(data)
+
+
+def timed(func, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'apply (s)':>12} {'vector (s)':>12} {'speedup':>9}")
+    for rows in args.sizes:
+        df = make_frame(rows)
+        slow, expected = timed(
+            lambda d: d.apply(legacy_total_aggression, axis=1), df
+        )
+        fast, actual = timed(Analyzer.compute_total_aggression, df)
+        assert np.allclose(expected, actual)
+        print(f"{rows:>10} {slow:>12.3f} {fast:>12.4f} {slow / fast:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
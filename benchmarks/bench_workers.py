@@ -0,0 +1,210 @@
+"""Benchmark how analysis throughput scales with job queue workers.
+
+Run from the repository root::
+
+    python benchmarks/bench_workers.py --posts 2000 --workers 1 2 4 8 \\
+        --latency-ms 300 --rpm 6000 --output workers.json
+
+``benchmarks/fake_openai_server.py`` is started with the given latency
+and rate limit.  For every worker count a fresh job queue is filled with
+``--posts`` posts in analysis jobs of ``--chunk-size`` and that many
+``run_worker`` processes drain it, each scoring with ``--threads``
+threads and a rate limiter holding its share of ``--rpm``.  Reported per
+worker count: posts per second, the speedup over one worker, requests the
+server throttled and the client retries.  Throughput should grow about
+linearly until the rate limit is reached.  The JSON written to
+``--output`` (stdout by default) also records the commit and the
+settings; the table goes to stderr.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any
+
+from bench_throughput import (
+    git_commit,
+    make_posts,
+    server_call,
+    start_server,
+)
+
+APP_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'aggression_analyzer'
+)
+
+
+def fill_queue(path: str, posts: int, chunk_size: int) -> None:
+    sys.path.insert(0, APP_DIR)
+    from modules.jobqueue import JobQueue
+    from worker import ANALYZE
+
+    queue = JobQueue(path)
+    texts = make_posts(posts)
+    # A per-queue prefix keeps runs from hitting each other's cache.
+    prefix = os.path.basename(os.path.dirname(path))
+    queue.put_many(
+        (
+            ANALYZE,
+            {
+                "rows": [
+                    {"content": f"{prefix} {text}"}
+                    for text in texts[start:start + chunk_size]
+                ]
+            },
+            None,
+        )
+        for start in range(0, posts, chunk_size)
+    )
+    queue.close()
+
+
+def run_child(
+    path: str, url: str, threads: int, rpm: float, workers: int
+) -> dict[str, Any]:
+    sys.path.insert(0, APP_DIR)
+    import modules.analyzer as analyzer_module
+    from config.settings import AGGRESSION_ANALYSIS_MODEL, MODERATION_MODEL
+    from modules.cache import ResultCache
+    from modules.jobqueue import JobQueue
+    from modules.ratelimit import RateLimiter
+    from worker import run_worker
+
+    analyzer_module.MAX_CONCURRENT_WORKERS = threads
+    limit = {
+        "requests": (rpm or 1_000_000) / workers,
+        "tokens": 1_000_000_000,
+    }
+    analyzer = analyzer_module.Analyzer(
+        api_key="bench",
+        base_url=url,
+        cache=ResultCache(os.path.join(tempfile.mkdtemp(), "cache.sqlite3")),
+        rate_limiter=RateLimiter(
+            {AGGRESSION_ANALYSIS_MODEL: limit, MODERATION_MODEL: limit}
+        ),
+    )
+    retries = [0]
+    retry_delay = analyzer._retry_delay
+
+    def count_retry(*args: Any, **kwargs: Any) -> float:
+        retries[0] += 1
+        return retry_delay(*args, **kwargs)
+
+    analyzer._retry_delay = count_retry
+    jobs = run_worker(
+        JobQueue(path),
+        analyzer,
+        options={"dedup": False, "prefilter": False},
+        exit_when_empty=True,
+        poll_seconds=0.05,
+    )
+    return {"jobs": jobs, "retries": retries[0]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4, 8]
+    )
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument(
+        "--latency-dist",
+        choices=["fixed", "uniform", "exponential", "lognormal"],
+        default="lognormal",
+    )
+    parser.add_argument(
+        "--rpm", type=float, default=0.0,
+        help="server request limit per minute, shared by the workers",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--server-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", default="-")
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        path, url, workers = args.child
+        print(json.dumps(run_child(
+            path, url, args.threads, args.rpm, int(workers)
+        )))
+        return
+
+    server, url = start_server(args)
+    runs = []
+    print(
+        f"{'workers':>7} {'posts/s':>8} {'speedup':>7}"
+        f" {'throttled':>9} {'retries':>7}",
+        file=sys.stderr,
+    )
+    try:
+        for workers in args.workers:
+            path = os.path.join(tempfile.mkdtemp(), "queue.sqlite3")
+            fill_queue(path, args.posts, args.chunk_size)
+            server_call(url, "/reset", "POST")
+            command = [
+                sys.executable, __file__,
+                "--threads", str(args.threads),
+                "--rpm", str(args.rpm),
+                "--child", path, url, str(workers),
+            ]
+            start = time.perf_counter()
+            children = [
+                subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+                for _ in range(workers)
+            ]
+            outputs = [child.communicate()[0] for child in children]
+            elapsed = time.perf_counter() - start
+            if any(child.returncode for child in children):
+                raise RuntimeError("a worker process failed")
+            results = [json.loads(o.splitlines()[-1]) for o in outputs]
+            result = {
+                "workers": workers,
+                "seconds": elapsed,
+                "posts_per_second": args.posts / elapsed,
+                "jobs": [r["jobs"] for r in results],
+                "retries": sum(r["retries"] for r in results),
+                "server": server_call(url, "/stats"),
+            }
+            result["speedup"] = (
+                result["posts_per_second"] / runs[0]["posts_per_second"]
+                if runs else 1.0
+            )
+            runs.append(result)
+            print(
+                f"{workers:>7} {result['posts_per_second']:>8.1f}"
+                f" {result['speedup']:>7.2f}"
+                f" {result['server']['throttled']:>9}"
+                f" {result['retries']:>7}",
+                file=sys.stderr,
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "settings": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("child", "output")
+        },
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
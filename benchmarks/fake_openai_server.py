@@ -0,0 +1,311 @@
+"""A local stand-in for the OpenAI API used by the throughput benchmark.
+
+Run from the repository root::
+
+    python benchmarks/fake_openai_server.py --latency-ms 300 --rpm 3000
+
+The server prints its base URL (``http://127.0.0.1:<port>/v1``) on the
+first line of its output and serves until it is stopped.  It answers the
+two endpoints the analyzer uses:
+
+* ``POST /v1/moderations`` with one result per input, flagged for posts
+  containing ``死ね`` or ``kill``;
+* ``POST /v1/chat/completions`` with a ``{score, reason}`` object, or a
+  ``{"results": [...]}`` list for packed prompts, scored from a hash of
+  each post so repeated runs give the same answers.
+
+Each response is delayed according to ``--latency-dist`` and carries
+``x-ratelimit-*`` headers from a server-side request bucket of ``--rpm``
+requests per minute; requests over the limit get a 429 with
+``retry-after-ms``.  ``--error-rate`` and ``--server-error-rate`` inject
+429s (without a retry hint) and 503s at random.  ``GET /stats`` returns
+request counters as JSON and ``POST /reset`` clears them.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+LATENCY_DISTRIBUTIONS = ["fixed", "uniform", "exponential", "lognormal"]
+
+MODERATION_CATEGORIES = [
+    "harassment",
+    "harassment/threatening",
+    "hate",
+    "hate/threatening",
+    "illicit",
+    "illicit/violent",
+    "self-harm",
+    "self-harm/instructions",
+    "self-harm/intent",
+    "sexual",
+    "sexual/minors",
+    "violence",
+    "violence/graphic",
+]
+
+_FLAGGED_RE = re.compile(r"死ね|kill", re.IGNORECASE)
+_PACKED_ID_RE = re.compile(r'^\{"id": "([^"]+)", "text": ', re.MULTILINE)
+
+
+def _score(text: str) -> int:
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=1).digest()
+    return digest[0] % 11
+
+
+class FakeOpenAI:
+    """Behaviour and counters shared by all request handler threads."""
+
+    def __init__(
+        self,
+        latency_ms: float = 200.0,
+        latency_dist: str = "lognormal",
+        rpm: float = 0.0,
+        error_rate: float = 0.0,
+        server_error_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.latency = latency_ms / 1000.0
+        self.latency_dist = latency_dist
+        self.rpm = rpm
+        self.error_rate = error_rate
+        self.server_error_rate = server_error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._level = rpm
+        self._updated = time.monotonic()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats = {
+                "requests": 0,
+                "moderations": 0,
+                "completions": 0,
+                "throttled": 0,
+                "injected_429": 0,
+                "injected_5xx": 0,
+            }
+
+    def delay(self) -> float:
+        with self._lock:
+            r = self._random
+            if self.latency_dist == "uniform":
+                return r.uniform(0.5 * self.latency, 1.5 * self.latency)
+            if self.latency_dist == "exponential":
+                return r.expovariate(1.0 / self.latency) if self.latency else 0
+            if self.latency_dist == "lognormal" and self.latency:
+                # ``latency`` is the median; sigma 0.5 gives a p99 of ~3.2x.
+                return r.lognormvariate(0.0, 0.5) * self.latency
+            return self.latency
+
+    def admit(self, kind: str) -> tuple[int, dict[str, str]]:
+        """Count a request and decide its status and rate-limit headers."""
+        now = time.monotonic()
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats[kind] += 1
+            headers: dict[str, str] = {}
+            if self.rpm:
+                rate = self.rpm / 60.0
+                elapsed = now - self._updated
+                self._level = min(self.rpm, self._level + elapsed * rate)
+                self._updated = now
+                if self._level < 1:
+                    self.stats["throttled"] += 1
+                    wait = (1 - self._level) / rate
+                    return 429, {"retry-after-ms": str(int(wait * 1000) + 1)}
+                self._level -= 1
+                headers = {
+                    "x-ratelimit-limit-requests": str(int(self.rpm)),
+                    "x-ratelimit-remaining-requests": str(int(self._level)),
+                    "x-ratelimit-reset-requests":
+                        f"{(self.rpm - self._level) / rate:.3f}s",
+                    "x-ratelimit-limit-tokens": "100000000",
+                    "x-ratelimit-remaining-tokens": "100000000",
+                    "x-ratelimit-reset-tokens": "0s",
+                }
+            roll = self._random.random()
+            if roll < self.error_rate:
+                self.stats["injected_429"] += 1
+                return 429, {}
+            if roll < self.error_rate + self.server_error_rate:
+                self.stats["injected_5xx"] += 1
+                return 503, {}
+            return 200, headers
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
+
+
+def moderation_response(body: dict[str, Any]) -> dict[str, Any]:
+    inputs = body.get("input", [])
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    results = []
+    for text in inputs:
+        flagged = bool(_FLAGGED_RE.search(text))
+        value = 0.9 if flagged else 0.01
+        results.append({
+            "flagged": flagged,
+            "categories": {
+                name: flagged and name in ("harassment", "violence")
+                for name in MODERATION_CATEGORIES
+            },
+            "category_scores": {
+                name: value if name in ("harassment", "violence") else 0.001
+                for name in MODERATION_CATEGORIES
+            },
+            "category_applied_input_types": {
+                name: ["text"] for name in MODERATION_CATEGORIES
+            },
+        })
+    return {
+        "id": "modr-fake",
+        "model": body.get("model", "text-moderation-latest"),
+        "results": results,
+    }
+
+
+def completion_response(body: dict[str, Any]) -> dict[str, Any]:
+    prompt = "\n".join(
+        str(m.get("content", "")) for m in body.get("messages", [])
+    )
+    ids = _PACKED_ID_RE.findall(prompt)
+    if ids:
+        content = {
+            "results": [
+                {"id": i, "score": _score(prompt + i), "reason": "fake"}
+                for i in ids
+            ]
+        }
+    else:
+        content = {"score": _score(prompt), "reason": "fake"}
+    text = json.dumps(content, ensure_ascii=False)
+    tokens = len(prompt)
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o-mini"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": tokens,
+            "completion_tokens": len(text),
+            "total_tokens": tokens + len(text),
+        },
+    }
+
+
+def make_handler(fake: FakeOpenAI) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, so the clients' connection pools are exercised;
+        # headers and body are separate writes, so turn off Nagle's
+        # algorithm to avoid delayed-ACK stalls on every response.
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def _send(
+            self,
+            status: int,
+            payload: dict[str, Any],
+            headers: dict[str, str] | None = None,
+        ) -> None:
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:
+            if self.path == "/stats":
+                self._send(200, fake.snapshot())
+            else:
+                self._send(404, {"error": {"message": "not found"}})
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if self.path == "/reset":
+                fake.reset()
+                self._send(200, {})
+                return
+            if self.path.endswith("/moderations"):
+                kind, build = "moderations", moderation_response
+            elif self.path.endswith("/chat/completions"):
+                kind, build = "completions", completion_response
+            else:
+                self._send(404, {"error": {"message": "not found"}})
+                return
+            status, headers = fake.admit(kind)
+            time.sleep(fake.delay())
+            if status != 200:
+                error = {"message": "fake error", "type": "fake", "code": None}
+                self._send(status, {"error": error}, headers)
+                return
+            self._send(200, build(body), headers)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def serve(fake: FakeOpenAI, port: int = 0) -> ThreadingHTTPServer:
+    """Start serving ``fake`` in a daemon thread and return the server."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument(
+        "--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="lognormal"
+    )
+    parser.add_argument(
+        "--rpm", type=float, default=0.0,
+        help="requests per minute before 429s (0: unlimited)",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--server-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    fake = FakeOpenAI(
+        args.latency_ms,
+        args.latency_dist,
+        args.rpm,
+        args.error_rate,
+        args.server_error_rate,
+        args.seed,
+    )
+    server = serve(fake, args.port)
+    print(f"http://127.0.0.1:{server.server_address[1]}/v1", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_result_cache(tmp_path, monkeypatch):
+    """Keep Analyzer's default result cache out of the source tree."""
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.analyzer.RESULT_CACHE_PATH',
+        str(tmp_path / 'result_cache.sqlite3'),
+        raising=False,
+    )
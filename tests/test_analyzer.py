@@ -1,6 +1,8 @@
 import os
 import sys
+import openai
 import pandas as pd
+import pytest
 from types import SimpleNamespace
 
 sys.path.insert(
@@ -8,7 +10,20 @@ sys.path.insert(
 )
 
 
-from aggression_analyzer.modules.analyzer import Analyzer
+from aggression_analyzer.modules.analyzer import PROMPT_VERSION, Analyzer
+from aggression_analyzer.modules.ratelimit import RateLimiter
+
+
+class RawResponse:
+    """Mimic ``resource.with_raw_response`` of the OpenAI client."""
+
+    def __init__(self, resource, headers=None):
+        self._resource = resource
+        self.headers = headers or {}
+
+    def create(self, **kwargs):
+        parsed = self._resource.create(**kwargs)
+        return SimpleNamespace(headers=self.headers, parse=lambda: parsed)
 
 
 class FakeChat:
@@ -25,13 +40,39 @@ class FakeChat:
                 ]
             )
 
+        @property
+        def with_raw_response(self):
+            return RawResponse(self)
+
     completions = Completions()
 
 
+class FakeModerations:
+    def __init__(self):
+        self.calls = []
+
+    def create(self, input, model):
+        self.calls.append(list(input))
+        return SimpleNamespace(
+            results=[
+                SimpleNamespace(
+                    categories=SimpleNamespace(hate=text == "hate"),
+                    category_scores=SimpleNamespace(hate=0.5),
+                )
+                for text in input
+            ]
+        )
+
+    @property
+    def with_raw_response(self):
+        return RawResponse(self)
+
+
 class FakeOpenAI:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, **kwargs):
         self.api_key = api_key
         self.chat = FakeChat()
+        self.moderations = FakeModerations()
 
 
 def test_get_aggressiveness_score(monkeypatch):
@@ -45,6 +86,22 @@ def test_get_aggressiveness_score(monkeypatch):
     assert reason == 'mocked'
 
 
+def test_moderate_texts_batches_requests(monkeypatch):
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.analyzer.OpenAI',
+        FakeOpenAI,
+    )
+    analyzer = Analyzer(api_key='test')
+    texts = ["ok"] * 4 + ["hate"]
+    results = analyzer.moderate_texts(texts, batch_size=2)
+    assert analyzer.client.moderations.calls == [
+        ["ok", "ok"], ["ok", "ok"], ["hate"]
+    ]
+    assert [categories.hate for categories, _ in results] == [
+        False, False, False, False, True
+    ]
+
+
 def test_analyze_dataframe_in_parallel(monkeypatch):
     analyzer = Analyzer(api_key='test')
 
@@ -69,11 +126,15 @@ def test_analyze_dataframe_in_parallel(monkeypatch):
         )
         return categories, scores
 
-    monkeypatch.setattr(analyzer, "moderate_text", fake_moderate_text)
+    monkeypatch.setattr(
+        analyzer,
+        "moderate_texts",
+        lambda texts: [fake_moderate_text(t) for t in texts],
+    )
     monkeypatch.setattr(
         analyzer,
         "get_aggressiveness_score",
-        lambda text: (5, "ok"),
+        lambda text, **kwargs: (5, "ok"),
     )
 
     df = pd.DataFrame({"content": ["a", "b", "c"]})
@@ -116,11 +177,17 @@ def test_analyze_dataframe_in_parallel_error_row(monkeypatch):
             raise RuntimeError("boom")
         return categories, scores
 
+    def batch_fail(texts: list[str]):
+        if "bad" in texts:
+            raise RuntimeError("batch boom")
+        return [maybe_fail(t) for t in texts]
+
+    monkeypatch.setattr(analyzer, "moderate_texts", batch_fail)
     monkeypatch.setattr(analyzer, "moderate_text", maybe_fail)
     monkeypatch.setattr(
         analyzer,
         "get_aggressiveness_score",
-        lambda text: (5, "ok"),
+        lambda text, **kwargs: (5, "ok"),
     )
 
     df = pd.DataFrame({"content": ["a", "bad", "c"]})
@@ -135,3 +202,626 @@ def test_analyze_dataframe_in_parallel_error_row(monkeypatch):
     assert result.loc[1, "hate_score"] == 0.0
     assert result.loc[0, "aggressiveness_score"] == 5
     assert result.loc[2, "aggressiveness_score"] == 5
+
+
+def test_scoring_errors_keep_the_moderation_result(monkeypatch):
+    from aggression_analyzer.modules.budget import LLMBudget
+
+    analyzer = Analyzer(api_key='test')
+    monkeypatch.setattr(
+        analyzer,
+        "moderate_texts",
+        lambda texts: [_fake_moderation() for _ in texts],
+    )
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(analyzer, "get_aggressiveness_score", fail)
+    monkeypatch.setattr(analyzer, "get_aggressiveness_scores_packed", fail)
+    df = pd.DataFrame({"content": ["a", "b", "c"]})
+
+    for pack_size in (1, 3):
+        result = analyzer.analyze_dataframe_in_parallel(
+            df, pack_size=pack_size, budget=LLMBudget(), dedup=False
+        )
+
+        assert result["scoring_status"].tolist() == ["failed"] * 3
+        assert result["aggressiveness_score"].isna().all()
+        assert result["hate_flag"].all()
+        assert (result["hate_score"] > 0.8).all()
+
+
+def _fake_moderation():
+    categories = SimpleNamespace(
+        hate=True,
+        hate_threatening=False,
+        self_harm=False,
+        sexual=False,
+        sexual_minors=False,
+        violence=False,
+        violence_graphic=False,
+    )
+    scores = SimpleNamespace(
+        hate=0.9,
+        hate_threatening=0.2,
+        self_harm=0.0,
+        sexual=0.0,
+        sexual_minors=0.0,
+        violence=0.0,
+        violence_graphic=0.0,
+    )
+    return categories, scores
+
+
+def test_analyze_dataframe_async_matches_threaded(monkeypatch):
+    analyzer = Analyzer(api_key='test')
+
+    async def fake_moderate_text_async(text: str):
+        return _fake_moderation()
+
+    async def fake_score_async(text: str, **kwargs):
+        if text == "bad":
+            raise RuntimeError("boom")
+        return 5, "ok"
+
+    monkeypatch.setattr(
+        analyzer,
+        "moderate_texts",
+        lambda texts: [_fake_moderation() for _ in texts],
+    )
+    monkeypatch.setattr(
+        analyzer, "get_aggressiveness_score", lambda text, **kwargs: (5, "ok")
+    )
+    monkeypatch.setattr(
+        analyzer, "moderate_text_async", fake_moderate_text_async
+    )
+    monkeypatch.setattr(
+        analyzer, "get_aggressiveness_score_async", fake_score_async
+    )
+
+    threaded = analyzer.analyze_dataframe_in_parallel(
+        pd.DataFrame({"content": ["a", "b", "c"]})
+    )
+    progress = []
+    result = analyzer.analyze_dataframe_with_asyncio(
+        pd.DataFrame({"content": ["a", "bad", "c"]}),
+        lambda d, t: progress.append((d, t)),
+        max_concurrency=2,
+    )
+
+    assert list(result.columns) == list(threaded.columns)
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+    assert result.loc[0, "aggressiveness_score"] == 5
+    assert pd.isna(result.loc[1, "aggressiveness_score"])
+    # The moderation result survives the failed scoring call.
+    assert bool(result.loc[1, "hate_flag"]) is True
+    assert result.loc[2, "total_aggression"] == (
+        threaded.loc[2, "total_aggression"]
+    )
+
+
+def test_results_are_served_from_cache(monkeypatch, tmp_path):
+    from aggression_analyzer.modules.cache import ResultCache
+
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.analyzer.OpenAI',
+        FakeOpenAI,
+    )
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"))
+    analyzer = Analyzer(api_key='test', cache=cache)
+    calls = []
+    create = FakeChat.Completions.create
+    monkeypatch.setattr(
+        analyzer.client.chat.completions,
+        "create",
+        lambda **kw: calls.append(kw) or create(**kw),
+    )
+
+    assert analyzer.get_aggressiveness_score('hello') == (7, 'mocked')
+    assert analyzer.get_aggressiveness_score('hello ') == (7, 'mocked')
+    analyzer.moderate_texts(['hate', 'ok'])
+    categories, _ = analyzer.moderate_texts(['hate', 'new'])[0]
+
+    assert len(calls) == 1
+    assert categories.hate is True
+    assert analyzer.client.moderations.calls == [['hate', 'ok'], ['new']]
+    analyzer.temperature = 0.9
+    analyzer.get_aggressiveness_score('hello')
+    assert len(calls) == 2
+
+
+def test_compute_total_aggression_handles_missing_values():
+    df = pd.DataFrame({
+        "hate_score": [0.5, None, 0.0],
+        "violence_score": [0.1, 0.2, float("nan")],
+        "aggressiveness_score": [8, None, 2],
+        "hate_flag": [True, False, None],
+        "violence_flag": [False, True, False],
+    })
+    result = Analyzer.compute_total_aggression(df)
+    assert list(result.index) == [0, 1, 2]
+    assert result.round(6).tolist() == [
+        round(0.5 * 0.5 + 0.3 * 0.1 + 0.5 * 8 + 2.0, 6),
+        round(0.3 * 0.2 + 1.5, 6),
+        1.0,
+    ]
+    row_score = Analyzer(api_key='test').total_aggression(df.loc[0])
+    assert round(row_score, 6) == round(result[0], 6)
+
+
+def test_merged_results_have_explicit_dtypes(monkeypatch):
+    analyzer = Analyzer(api_key='test')
+    monkeypatch.setattr(
+        analyzer,
+        "moderate_texts",
+        lambda texts: [_fake_moderation() for _ in texts],
+    )
+    monkeypatch.setattr(
+        analyzer,
+        "get_aggressiveness_score",
+        lambda text, **kwargs: (None, None) if text == "x" else (3, "ok"),
+    )
+    df = pd.DataFrame(
+        {"content": ["a", "x"], "aggressiveness_score": [1, 1]},
+        index=[10, 20],
+    )
+
+    result = analyzer.analyze_dataframe_in_parallel(df)
+
+    assert list(result.index) == [10, 20]
+    assert list(result.columns).count("aggressiveness_score") == 1
+    assert result["hate_flag"].dtype == bool
+    assert result["hate_score"].dtype == "float32"
+    assert result["aggressiveness_score"].dtype == "Int8"
+    assert result.loc[10, "aggressiveness_score"] == 3
+    assert pd.isna(result.loc[20, "aggressiveness_score"])
+    assert result.loc[20, "total_aggression"] > 0
+    assert result.loc[10, "prompt_version"] == PROMPT_VERSION
+    assert pd.isna(result.loc[20, "prompt_version"])
+
+
+def test_missing_content_is_analyzed_as_empty_text(monkeypatch):
+    analyzer = Analyzer(api_key='test')
+    batches = []
+
+    def moderate_texts(texts):
+        assert all(isinstance(t, str) for t in texts)
+        batches.append(list(texts))
+        return [_fake_moderation() for _ in texts]
+
+    monkeypatch.setattr(analyzer, "moderate_texts", moderate_texts)
+    monkeypatch.setattr(
+        analyzer, "get_aggressiveness_score", lambda text, **kwargs: (2, "ok")
+    )
+    df = pd.DataFrame({"content": ["a", float("nan")]})
+
+    result = analyzer.analyze_dataframe_in_parallel(
+        df, dedup=False, prefilter=False
+    )
+
+    assert batches == [["a", ""]]
+    assert list(result["aggressiveness_score"]) == [2, 2]
+
+
+def test_score_requests_share_a_static_prefix():
+    analyzer = Analyzer(api_key='test')
+    first = analyzer.score_request("一つ目の投稿")
+    second = analyzer.score_request("二つ目の投稿")
+
+    assert [m["role"] for m in first["messages"]] == ["system", "user"]
+    assert first["messages"][0] == second["messages"][0]
+    assert "一つ目の投稿" not in first["messages"][0]["content"]
+    assert "一つ目の投稿" in first["messages"][1]["content"]
+    assert first["max_tokens"] > 0
+
+    packed = analyzer.packed_score_request({"0": "a", "1": "b"})
+    assert packed["max_tokens"] == 2 * first["max_tokens"]
+    assert '{"id": "1", "text": "b"}' in packed["messages"][1]["content"]
+
+
+def test_packed_scoring_retries_missing_posts(monkeypatch):
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.analyzer.OpenAI',
+        FakeOpenAI,
+    )
+    analyzer = Analyzer(api_key='test')
+    prompts = []
+    single = FakeChat.Completions.create
+
+    def create(**kwargs):
+        prompt = kwargs["messages"][-1]["content"]
+        prompts.append(prompt)
+        if '"id": ' not in prompt:
+            return single(**kwargs)
+        content = (
+            '{"results": [{"id": "0", "score": 3, "reason": "a"},'
+            ' {"id": "1", "score": 42, "reason": "bad"}]}'
+        )
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))]
+        )
+
+    monkeypatch.setattr(analyzer.client.chat.completions, "create", create)
+
+    results = analyzer.get_aggressiveness_scores_packed(["x", "y", "z"])
+
+    assert results == [(3, "a"), (7, "mocked"), (7, "mocked")]
+    assert len(prompts) == 3
+    assert '"id": "2", "text": "z"' in prompts[0]
+
+
+def test_analyze_dataframe_in_parallel_packed(monkeypatch):
+    analyzer = Analyzer(api_key='test')
+    packs = []
+
+    def fake_packed(texts, **kwargs):
+        packs.append(list(texts))
+        return [(len(t), "packed") for t in texts]
+
+    monkeypatch.setattr(
+        analyzer,
+        "moderate_texts",
+        lambda texts: [_fake_moderation() for _ in texts],
+    )
+    monkeypatch.setattr(
+        analyzer, "get_aggressiveness_scores_packed", fake_packed
+    )
+    monkeypatch.setattr(
+        analyzer,
+        "get_aggressiveness_score",
+        lambda text, **kwargs: (0, "single"),
+    )
+    progress = []
+    df = pd.DataFrame({"content": ["a", "bb", "ccc", "dddd", "e"]})
+
+    result = analyzer.analyze_dataframe_in_parallel(
+        df, lambda d, t: progress.append(d), pack_size=2
+    )
+
+    assert sorted(packs) == [["a", "bb"], ["ccc", "dddd"]]
+    assert progress == [1, 2, 3, 4, 5]
+    assert list(result["aggressiveness_score"]) == [1, 2, 3, 4, 0]
+    assert result.loc[4, "aggressiveness_reason"] == "single"
+
+
+def test_analyze_dataframe_in_parallel_dedup(monkeypatch):
+    analyzer = Analyzer(api_key='test')
+    moderated = []
+    scored = []
+
+    def fake_moderate_texts(texts):
+        moderated.extend(texts)
+        return [_fake_moderation() for _ in texts]
+
+    def fake_score(text, **kwargs):
+        scored.append(text)
+        return 7, "copy"
+
+    monkeypatch.setattr(analyzer, "moderate_texts", fake_moderate_texts)
+    monkeypatch.setattr(analyzer, "get_aggressiveness_score", fake_score)
+    post = "You are the worst person on this site, leave now"
+    df = pd.DataFrame(
+        {
+            "content": [
+                post,
+                f"@victim {post}!!",
+                "Nice weather for a walk in the park today",
+                f"RT @x: {post} https://t.co/abc",
+            ],
+            "url": [f"https://x.com/u/status/{i}" for i in range(4)],
+        },
+        index=[3, 4, 5, 6],
+    )
+    progress = []
+
+    result = analyzer.analyze_dataframe_in_parallel(
+        df, lambda done, total: progress.append((done, total))
+    )
+
+    assert sorted(moderated) == sorted([post, df.loc[5, "content"]])
+    assert len(scored) == 2
+    assert result["duplicate_of"].tolist() == [
+        None, df.loc[3, "url"], None, df.loc[3, "url"]
+    ]
+    assert list(result["aggressiveness_score"]) == [7, 7, 7, 7]
+    assert progress[-1] == (4, 4)
+
+    plain = analyzer.analyze_dataframe_in_parallel(df, dedup=False)
+    assert "duplicate_of" not in plain.columns
+
+    unnamed = analyzer.analyze_dataframe_in_parallel(df.drop(columns="url"))
+    assert unnamed["duplicate_of"].tolist() == [None, "row:3", None, "row:3"]
+
+
+def test_analyze_dataframe_in_parallel_prefilter(monkeypatch):
+    analyzer = Analyzer(api_key='test')
+    sent = []
+
+    def fake_moderate_texts(texts):
+        sent.extend(texts)
+        return [_fake_moderation() for _ in texts]
+
+    monkeypatch.setattr(analyzer, "moderate_texts", fake_moderate_texts)
+    monkeypatch.setattr(
+        analyzer, "get_aggressiveness_score", lambda text, **kwargs: (8, "bad")
+    )
+    df = pd.DataFrame(
+        {"content": ["いい天気ですね", "お前なんか死ね", "Nice day"]}
+    )
+
+    result = analyzer.analyze_dataframe_in_parallel(df, prefilter=True)
+
+    assert sent == ["お前なんか死ね"]
+    assert result["prefiltered"].tolist() == [True, False, True]
+    assert result["aggressiveness_score"].tolist() == [0, 8, 0]
+    assert result.loc[0, "total_aggression"] == 0
+    assert result["duplicate_of"].tolist() == [None, None, None]
+
+
+def test_result_callback_streams_every_row(monkeypatch):
+    analyzer = Analyzer(api_key='test')
+    monkeypatch.setattr(
+        analyzer,
+        "moderate_texts",
+        lambda texts: [_fake_moderation() for _ in texts],
+    )
+    monkeypatch.setattr(
+        analyzer, "get_aggressiveness_score", lambda text, **kwargs: (8, "bad")
+    )
+    post = "お前なんか死ねばいいのに、本当に迷惑だ"
+    df = pd.DataFrame({"content": [post, "Nice day", f"@victim {post}"]})
+    streamed = {}
+    progress = []
+
+    def on_result(index, data):
+        # Each row is reported before progress counts it as done.
+        streamed[index] = (data["aggressiveness_score"], len(progress))
+
+    analyzer.analyze_dataframe_in_parallel(
+        df,
+        lambda done, total: progress.append(done),
+        prefilter=True,
+        result_callback=on_result,
+    )
+
+    assert streamed == {1: (0, 0), 0: (8, 1), 2: (8, 1)}
+
+
+def _risk_moderation(text):
+    risk = {"low": 0.01, "mid": 0.5, "high": 0.9}[text]
+    categories = SimpleNamespace(hate=False)
+    scores = SimpleNamespace(hate=risk)
+    return categories, scores
+
+
+def test_cascade_scores_riskiest_rows_within_budget(monkeypatch):
+    from aggression_analyzer.modules.budget import LLMBudget
+
+    analyzer = Analyzer(api_key='test')
+    scored = []
+
+    def fake_score(text, **kwargs):
+        scored.append(text)
+        return 9, "risky"
+
+    monkeypatch.setattr(
+        analyzer,
+        "moderate_texts",
+        lambda texts: [_risk_moderation(t) for t in texts],
+    )
+    monkeypatch.setattr(analyzer, "get_aggressiveness_score", fake_score)
+    df = pd.DataFrame({"content": ["low", "mid", "high"]})
+
+    result = analyzer.analyze_dataframe_in_parallel(
+        df, cascade=True, budget=LLMBudget(max_requests=1), dedup=False
+    )
+
+    assert scored == ["high"]
+    assert result["scoring_status"].tolist() == [
+        "below_threshold", "over_budget", "scored"
+    ]
+    assert result.loc[2, "aggressiveness_score"] == 9
+    assert pd.isna(result.loc[1, "aggressiveness_score"])
+    assert abs(result.loc[1, "hate_score"] - 0.5) < 1e-6
+    totals = result["total_aggression"]
+    assert totals[1] > totals[0]
+
+
+def test_budget_charges_packed_requests_and_fallbacks(monkeypatch):
+    from aggression_analyzer.modules.analyzer import _request_tokens
+    from aggression_analyzer.modules.budget import LLMBudget
+
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.analyzer.OpenAI', FakeOpenAI
+    )
+    analyzer = Analyzer(api_key='test')
+    analyzer.store_score("cached", 1, "from cache")
+    prompts = []
+
+    def create(**kwargs):
+        prompts.append(kwargs["messages"][-1]["content"])
+        # Only the first of the packed posts is answered.
+        content = '{"results": [{"id": "0", "score": 3, "reason": "a"}]}'
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))]
+        )
+
+    monkeypatch.setattr(analyzer.client.chat.completions, "create", create)
+    lookups = []
+    cached_score = analyzer.cached_score
+
+    def counting_cached_score(text):
+        lookups.append(text)
+        return cached_score(text)
+
+    monkeypatch.setattr(analyzer, "cached_score", counting_cached_score)
+    packed = _request_tokens(
+        analyzer.packed_score_request({"0": "a", "1": "b"})
+    )
+    singles = sum(
+        _request_tokens(analyzer.score_request(t)) for t in ("a", "b")
+    )
+    assert singles > packed
+    budget = LLMBudget(max_requests=1, max_tokens=packed)
+    df = pd.DataFrame({"content": ["cached", "a", "b"]})
+
+    result = analyzer.analyze_dataframe_in_parallel(
+        df, pack_size=2, budget=budget, dedup=False
+    )
+
+    # The packed request fit the budget; the fallback for "b" did not.
+    assert len(prompts) == 1
+    assert budget.snapshot()["requests"] == 1
+    assert result["aggressiveness_score"].tolist()[:2] == [1, 3]
+    assert result["scoring_status"].tolist() == [
+        "scored", "scored", "over_budget"
+    ]
+    assert sorted(lookups) == ["a", "b", "cached"]
+
+
+def test_cascade_async_skips_low_risk_rows(monkeypatch):
+    analyzer = Analyzer(api_key='test')
+    scored = []
+
+    async def fake_moderate_text_async(text):
+        return _risk_moderation(text)
+
+    async def fake_score_async(text, **kwargs):
+        scored.append(text)
+        return 4, "ok"
+
+    monkeypatch.setattr(
+        analyzer, "moderate_text_async", fake_moderate_text_async
+    )
+    monkeypatch.setattr(
+        analyzer, "get_aggressiveness_score_async", fake_score_async
+    )
+    progress = []
+
+    result = analyzer.analyze_dataframe_with_asyncio(
+        pd.DataFrame({"content": ["low", "high", "mid"]}),
+        lambda done, total: progress.append(done),
+        cascade=True,
+        dedup=False,
+    )
+
+    assert scored == ["high", "mid"]
+    assert result["scoring_status"].tolist() == [
+        "below_threshold", "scored", "scored"
+    ]
+    assert progress == [1, 2, 3]
+
+
+def test_journal_resumes_after_crash(monkeypatch, tmp_path):
+    import pytest
+    from aggression_analyzer.modules.journal import ResultJournal
+
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.analyzer.MAX_CONCURRENT_WORKERS', 1
+    )
+    analyzer = Analyzer(api_key='test')
+    scored = []
+    crash = {"on": True}
+
+    def fake_score(text, **kwargs):
+        if text == "crash" and crash["on"]:
+            raise KeyboardInterrupt
+        scored.append(text)
+        return 2, "ok"
+
+    monkeypatch.setattr(
+        analyzer,
+        "moderate_texts",
+        lambda texts: [_fake_moderation() for _ in texts],
+    )
+    monkeypatch.setattr(analyzer, "get_aggressiveness_score", fake_score)
+    df = pd.DataFrame(
+        {
+            "url": [f"https://x.com/{i}" for i in range(4)],
+            "content": ["first", "second", "crash", "fourth"],
+        }
+    )
+    path = str(tmp_path / "journal.sqlite3")
+
+    with pytest.raises(KeyboardInterrupt):
+        analyzer.analyze_dataframe_in_parallel(
+            df, journal=ResultJournal(path), dedup=False
+        )
+    assert scored[:2] == ["first", "second"]
+
+    crash["on"] = False
+    scored.clear()
+    progress = []
+    result = analyzer.analyze_dataframe_in_parallel(
+        df,
+        lambda done, total: progress.append(done),
+        journal=ResultJournal(path),
+        dedup=False,
+    )
+
+    assert "first" not in scored and "second" not in scored
+    assert "crash" in scored
+    assert progress[0] >= 2 and progress[-1] == 4
+    assert list(result["aggressiveness_score"]) == [2, 2, 2, 2]
+    assert result["hate_flag"].tolist() == [True] * 4
+
+
+def test_base_url_is_shared_by_both_clients():
+    analyzer = Analyzer(api_key='test', base_url='http://127.0.0.1:9/v1')
+    assert str(analyzer.client.base_url) == 'http://127.0.0.1:9/v1/'
+    assert analyzer.async_client.base_url == analyzer.client.base_url
+
+
+def _reply(content):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))]
+    )
+
+
+def test_throttled_scoring_is_retried_only_by_call_api(monkeypatch):
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.ratelimit.time.sleep', lambda s: None
+    )
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.analyzer.API_MAX_RETRIES', 2
+    )
+    analyzer = Analyzer(api_key='test', rate_limiter=RateLimiter({}))
+    attempts = []
+
+    class Completions:
+        class with_raw_response:
+            @staticmethod
+            def create(**kwargs):
+                attempts.append(kwargs)
+                raise openai.RateLimitError(
+                    "slow down",
+                    response=SimpleNamespace(
+                        status_code=429, request=None, headers={}
+                    ),
+                    body=None,
+                )
+
+    analyzer.client.chat = SimpleNamespace(completions=Completions)
+
+    with pytest.raises(openai.RateLimitError):
+        analyzer.get_aggressiveness_score("x")
+    assert len(attempts) == 3
+
+    attempts.clear()
+    with pytest.raises(openai.RateLimitError):
+        analyzer.get_aggressiveness_scores_packed(["x", "y"])
+    assert len(attempts) == 3
+
+
+def test_malformed_replies_are_requested_again(monkeypatch):
+    analyzer = Analyzer(api_key='test', rate_limiter=RateLimiter({}))
+    replies = ["not json", '{"score": 42}', '{"score": 4, "reason": "ok"}']
+    monkeypatch.setattr(
+        analyzer,
+        "_call_api",
+        lambda *args, **kwargs: _reply(replies.pop(0)),
+    )
+
+    assert analyzer.get_aggressiveness_score("x") == (4, "ok")
+    assert replies == []
@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+pytest.importorskip('customtkinter')
+
+from aggression_analyzer.gui import app
+
+
+class Widget:
+    def __init__(self):
+        self.options = {}
+
+    def configure(self, **options):
+        self.options.update(options)
+
+
+class StubApp:
+    """The parts of ModerationApp the analysis thread talks to."""
+
+    _run_analysis_thread = app.ModerationApp._run_analysis_thread
+    _on_run_finished = app.ModerationApp._on_run_finished
+    _on_run_failed = app.ModerationApp._on_run_failed
+
+    def __init__(self, error):
+        self.error = error
+        self.df = None
+        self.flushing = 1
+        self.status_label = Widget()
+        self.run_button = Widget()
+
+    def after(self, ms, callback):
+        callback()
+
+    def _analyze_posts(self):
+        raise self.error
+
+    def _stop_flushing(self):
+        self.flushing -= 1
+
+
+def test_analysis_errors_are_reported_and_controls_restored(monkeypatch):
+    errors = []
+    monkeypatch.setattr(
+        app.messagebox, 'showerror', lambda *args: errors.append(args)
+    )
+    stub = StubApp(RuntimeError('scraper crashed'))
+
+    stub._run_analysis_thread()
+
+    assert stub.flushing == 0
+    assert stub.run_button.options['state'] == 'normal'
+    assert stub.status_label.options['text_color'] == 'red'
+    assert 'scraper crashed' in errors[0][1]
@@ -0,0 +1,108 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+from aggression_analyzer.modules.archiver import (
+    ARCHIVED,
+    ARCHIVING,
+    FAILED,
+    REGISTERED,
+    ArchiveRegistry,
+    Archiver,
+)
+
+
+@pytest.fixture
+def wayback():
+    """A local stand-in for the Save Page Now endpoint."""
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            target = self.path[len('/save/'):]
+            hits.append(target)
+            if 'broken' in target:
+                self.send_response(404)
+            elif 'flaky' in target and hits.count(target) == 1:
+                self.send_response(429)
+                self.send_header('Retry-After', '0')
+            else:
+                self.send_response(302)
+                self.send_header('Location', f'/web/20240101000000/{target}')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}', hits
+    server.shutdown()
+    server.server_close()
+
+
+def make_archiver(endpoint, registry):
+    return Archiver(
+        registry,
+        endpoint=endpoint,
+        max_workers=4,
+        requests_per_minute=6000,
+        backoff_base=0.01,
+    )
+
+
+def test_archive_many_reports_status_and_retries(wayback, tmp_path):
+    endpoint, hits = wayback
+    archiver = make_archiver(
+        endpoint, ArchiveRegistry(str(tmp_path / 'archives.sqlite3'))
+    )
+    statuses = []
+    urls = ['https://x.com/a/1', 'https://x.com/flaky/2',
+            'https://x.com/broken/3', 'https://x.com/a/1']
+
+    results = archiver.archive_many(
+        urls, lambda url, status: statuses.append((url, status))
+    )
+    archiver.close()
+
+    assert results == {
+        'https://x.com/a/1':
+            f'{endpoint}/web/20240101000000/https://x.com/a/1',
+        'https://x.com/flaky/2':
+            f'{endpoint}/web/20240101000000/https://x.com/flaky/2',
+        'https://x.com/broken/3': '',
+    }
+    assert hits.count('https://x.com/a/1') == 1
+    assert hits.count('https://x.com/flaky/2') == 2
+    assert hits.count('https://x.com/broken/3') == 1
+    assert (urls[0], ARCHIVING) in statuses
+    assert (urls[0], ARCHIVED) in statuses
+    assert (urls[2], FAILED) in statuses
+
+
+def test_registry_prevents_resubmission(wayback, tmp_path):
+    endpoint, hits = wayback
+    path = str(tmp_path / 'archives.sqlite3')
+    first = make_archiver(endpoint, ArchiveRegistry(path))
+    archive = first.archive('https://x.com/a/1')
+    first.close()
+
+    second = make_archiver(endpoint, ArchiveRegistry(path))
+    statuses = []
+    results = second.archive_many(
+        ['https://x.com/a/1'], lambda url, status: statuses.append(status)
+    )
+    second.close()
+
+    assert results == {'https://x.com/a/1': archive}
+    assert statuses == [REGISTERED]
+    assert hits == ['https://x.com/a/1']
@@ -0,0 +1,199 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+import pandas as pd
+
+from aggression_analyzer import cli
+from aggression_analyzer.modules.analyzer import Analyzer
+from aggression_analyzer.modules.batch import BatchRunner
+
+
+class StreamedFile:
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_lines(self):
+        yield from self._data.decode("utf-8").splitlines()
+
+
+class FakeBatchAPI:
+    """In-memory stand-in for the files and batches endpoints."""
+
+    def __init__(self):
+        self.files_store: dict[str, bytes] = {}
+        self.jobs: dict[str, SimpleNamespace] = {}
+        self.files = SimpleNamespace(
+            create=self._create_file,
+            with_streaming_response=SimpleNamespace(
+                content=lambda fid: StreamedFile(self.files_store[fid])
+            ),
+        )
+        self.batches = SimpleNamespace(
+            create=self._create_batch, retrieve=self._retrieve
+        )
+
+    def _create_file(self, file, purpose):
+        assert purpose == "batch"
+        fid = f"file-{len(self.files_store)}"
+        self.files_store[fid] = file.read()
+        return SimpleNamespace(id=fid)
+
+    def _create_batch(self, input_file_id, endpoint, completion_window):
+        bid = f"batch-{len(self.jobs)}"
+        self.jobs[bid] = SimpleNamespace(
+            id=bid,
+            status="in_progress",
+            input_file_id=input_file_id,
+            output_file_id=None,
+            error_file_id=None,
+            polls=0,
+        )
+        return self.jobs[bid]
+
+    def _retrieve(self, bid):
+        job = self.jobs[bid]
+        job.polls += 1
+        if job.polls >= 2 and job.status == "in_progress":
+            lines = self.files_store[job.input_file_id].decode().splitlines()
+            out = [json.dumps(self._answer(json.loads(x))) for x in lines]
+            job.output_file_id = f"file-{len(self.files_store)}"
+            self.files_store[job.output_file_id] = "\n".join(out).encode()
+            job.status = "completed"
+        return job
+
+    @staticmethod
+    def _answer(request):
+        body = request["body"]
+        if request["url"] == "/v1/moderations":
+            inputs = body["input"]
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            results = [
+                {
+                    "categories": {
+                        "hate": "hate" in text, "hate/threatening": False
+                    },
+                    "category_scores": {
+                        "hate": 0.9 if "hate" in text else 0.1
+                    },
+                }
+                for text in inputs
+            ]
+            response = {"status_code": 200, "body": {"results": results}}
+        elif "fail" in body["messages"][-1]["content"]:
+            response = {"status_code": 500, "body": {}}
+        else:
+            content = json.dumps({"score": 6, "reason": "batch"})
+            response = {
+                "status_code": 200,
+                "body": {"choices": [{"message": {"content": content}}]},
+            }
+        return {"custom_id": request["custom_id"], "response": response}
+
+
+def test_batch_round_trip_survives_restart(tmp_path):
+    analyzer = Analyzer(api_key='test')
+    api = FakeBatchAPI()
+    analyzer.client = api
+    state_dir = str(tmp_path / "batches")
+    df = pd.DataFrame(
+        {"content": ["hate you", "fine", "fail"]}, index=[5, 6, 7]
+    )
+
+    name = BatchRunner(analyzer, state_dir).submit(df)
+    assert len(api.jobs) == 2
+
+    # A new runner (e.g. after the app restarted) picks the job up again.
+    runner = BatchRunner(analyzer, state_dir)
+    assert runner.pending_jobs() == [name]
+    runner.wait(name, poll_interval=0)
+    result = runner.collect(name)
+
+    assert runner.pending_jobs() == []
+    assert list(result.index) == [5, 6, 7]
+    assert bool(result.loc[5, "hate_flag"]) is True
+    assert result.loc[6, "aggressiveness_score"] == 6
+    assert pd.isna(result.loc[7, "aggressiveness_score"])
+    assert "total_aggression" in result.columns
+
+    # Cached rows are not submitted again.
+    BatchRunner(analyzer, state_dir).submit(df.loc[[5, 6]])
+    assert len(api.jobs) == 2
+
+
+def test_batch_splits_files_and_groups_moderation(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.batch.BATCH_MAX_REQUESTS', 2
+    )
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.batch.MODERATION_BATCH_SIZE', 2
+    )
+    analyzer = Analyzer(api_key='test')
+    api = FakeBatchAPI()
+    analyzer.client = api
+    texts = ["hate a", "b", "c", "hate d", "e"]
+    df = pd.DataFrame({"content": texts})
+
+    runner = BatchRunner(analyzer, str(tmp_path / "batches"))
+    name = runner.submit(df)
+    state = runner.status(name)
+    # 3 grouped moderation requests in 2 files, 5 chat requests in 3.
+    assert len(state["batches"]["moderation"]) == 2
+    assert len(state["batches"]["aggressiveness"]) == 3
+    moderation_inputs = [
+        json.loads(line)["body"]["input"]
+        for info in state["batches"]["moderation"]
+        for line in api.files_store[
+            api.jobs[info["id"]].input_file_id
+        ].decode().splitlines()
+    ]
+    assert moderation_inputs == [["hate a", "b"], ["c", "hate d"], ["e"]]
+
+    runner.wait(name, poll_interval=0)
+    result = runner.collect(name)
+    assert list(result["hate_flag"].astype(bool)) == [
+        True, False, False, True, False
+    ]
+    assert list(result["aggressiveness_score"]) == [6] * 5
+
+
+def test_batch_commands_submit_poll_and_collect(tmp_path, monkeypatch, capsys):
+    analyzer = Analyzer(api_key='test')
+    analyzer.client = FakeBatchAPI()
+    monkeypatch.setattr(cli, 'Analyzer', lambda: analyzer)
+    state_dir = str(tmp_path / 'batches')
+    posts = tmp_path / 'posts.csv'
+    pd.DataFrame({'text': ['hate you', 'fine']}).to_csv(posts, index=False)
+    output = tmp_path / 'out.csv'
+
+    def run(*args):
+        return cli.main(['batch', '--state-dir', state_dir, *args])
+
+    assert run('submit', '--input', str(posts), '--content-column', 'text',
+               '--name', 'job') == 0
+    assert capsys.readouterr().out == 'job\n'
+
+    # Nothing is written while the batches are still running.
+    assert run('collect', 'job', '-o', str(output)) == 1
+    assert not output.exists()
+    assert run('status') == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split('\t')[-1] for line in lines] == ['completed'] * 2
+
+    assert run('collect', 'job', '-o', str(output)) == 0
+    result = pd.read_csv(output)
+    assert list(result['content']) == ['hate you', 'fine']
+    assert list(result['aggressiveness_score']) == [6, 6]
+    assert BatchRunner(analyzer, state_dir).pending_jobs() == []
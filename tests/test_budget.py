@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+from aggression_analyzer.modules.budget import LLMBudget
+
+
+def test_budget_refuses_requests_over_limit():
+    budget = LLMBudget(max_requests=2)
+    assert budget.try_spend(100)
+    assert budget.try_spend(100)
+    assert not budget.try_spend(1)
+    assert budget.snapshot()['requests'] == 2
+
+
+def test_budget_refuses_tokens_over_limit_without_recording():
+    budget = LLMBudget(max_tokens=150)
+    assert budget.try_spend(100)
+    assert not budget.try_spend(100)
+    assert budget.try_spend(50)
+    assert budget.snapshot() == {
+        'requests': 2, 'tokens': 150, 'max_requests': None, 'max_tokens': 150
+    }
@@ -0,0 +1,74 @@
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+from aggression_analyzer.modules.cache import ResultCache
+
+
+def test_keys_depend_on_normalized_text_and_params():
+    key = ResultCache.make_key("aggressiveness", "ｈｅｌｌｏ  world", 0.5)
+    assert key == ResultCache.make_key("aggressiveness", "hello world", 0.5)
+    assert key != ResultCache.make_key("aggressiveness", "hello world", 0.7)
+    assert key != ResultCache.make_key("moderation", "hello world", 0.5)
+
+
+def test_get_set_and_counters(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"))
+    assert cache.get("k") is None
+    cache.set("k", [7, "reason"])
+    assert cache.get("k") == [7, "reason"]
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"), max_age_seconds=0)
+    cache.set("k", 1)
+    assert cache.get("k") is None
+    assert cache.evict() == 1
+
+
+def test_size_eviction_drops_least_recently_used(tmp_path, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.cache.time.time', lambda: next(clock)
+    )
+    cache = ResultCache(
+        str(tmp_path / "cache.sqlite3"),
+        max_entries=2,
+        max_age_seconds=1000,
+    )
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    cache.get("a")
+    cache.evict()
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_cache_survives_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    ResultCache(path).set("k", {"x": 1})
+    assert ResultCache(path).get("k") == {"x": 1}
+
+
+def test_non_string_text_hashes_as_empty():
+    key = ResultCache.make_key("moderation", float("nan"))
+    assert key == ResultCache.make_key("moderation", "")
+    assert ResultCache.make_key("moderation", None) == key
+
+
+def test_hits_do_not_commit_until_flushed(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResultCache(path)
+    cache.set("k", 1)
+    changes = cache._conn.total_changes
+    for _ in range(10):
+        assert cache.get("k") == 1
+    assert cache._conn.total_changes == changes
+    cache.close()
+    assert ResultCache(path).get("k") == 1
@@ -0,0 +1,181 @@
+import json
+import os
+import sys
+import threading
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+import pandas as pd
+import pytest
+
+from aggression_analyzer import cli
+from aggression_analyzer.modules.exporter import ResultWriter
+from aggression_analyzer.modules.sources import iter_post_chunks
+from aggression_analyzer.modules.watermarks import WatermarkStore
+
+
+class FakeAnalyzer:
+    chunks: list[int] = []
+
+    def analyze_dataframe_in_parallel(
+        self, df, progress_callback=None, **options
+    ):
+        FakeAnalyzer.chunks.append(len(df))
+        return df.assign(aggressiveness_score=[len(t) for t in df['content']])
+
+
+def test_iter_post_chunks_csv_and_jsonl(tmp_path):
+    posts = pd.DataFrame({'text': ['a', 'bb', 'ccc', 'dddd', 'eeeee']})
+    posts.to_csv(tmp_path / 'posts.csv', index=False)
+    posts.to_json(tmp_path / 'posts.jsonl', orient='records', lines=True)
+
+    for name in ('posts.csv', 'posts.jsonl'):
+        chunks = list(
+            iter_post_chunks(str(tmp_path / name), 2, content_column='text')
+        )
+        assert [len(c) for c in chunks] == [2, 2, 1]
+        assert list(chunks[1].index) == [2, 3]
+        assert list(chunks[2]['content']) == ['eeeee']
+
+
+def test_iter_post_chunks_rejects_unknown_input(tmp_path):
+    with pytest.raises(ValueError):
+        list(iter_post_chunks(str(tmp_path / 'posts.txt')))
+    path = tmp_path / 'posts.csv'
+    pd.DataFrame({'body': ['x']}).to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        list(iter_post_chunks(str(path)))
+
+
+def test_result_writer_parquet_keeps_first_schema(tmp_path):
+    path = str(tmp_path / 'out.parquet')
+    with ResultWriter(path) as writer:
+        writer.write(pd.DataFrame({'content': ['a'], 'duplicate_of': [None]}))
+        writer.write(pd.DataFrame({'content': ['b'], 'duplicate_of': [0]}))
+
+    result = pd.read_parquet(path)
+    assert list(result['content']) == ['a', 'b']
+    assert result['duplicate_of'].tolist()[1] == '0'
+
+
+def test_cli_processes_file_in_chunks(monkeypatch, tmp_path):
+    monkeypatch.setattr(cli, 'Analyzer', FakeAnalyzer)
+    FakeAnalyzer.chunks = []
+    source = tmp_path / 'posts.csv'
+    pd.DataFrame({'content': ['a', 'bb', 'ccc', 'dddd', 'eeeee']}).to_csv(
+        source, index=False
+    )
+    output = tmp_path / 'out.jsonl'
+
+    code = cli.main(
+        ['--input', str(source), '-o', str(output), '--chunk-size', '2']
+    )
+
+    assert code == 0
+    assert FakeAnalyzer.chunks == [2, 2, 1]
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [r['aggressiveness_score'] for r in rows] == [1, 2, 3, 4, 5]
+
+
+def test_cli_requires_a_source(tmp_path):
+    with pytest.raises(SystemExit):
+        cli.main(['-o', str(tmp_path / 'out.csv')])
+
+
+class TimelineNitter:
+    """Newest-first timeline of one post per day."""
+
+    def __init__(self, days):
+        self.tweets = [
+            {
+                'date': f'Jan {day}, 2024 · 10:00 AM UTC',
+                'link': f'https://x.com/{day}',
+                'text': 'x' * day,
+                'user': {'username': 'user'},
+            }
+            for day in range(days, 0, -1)
+        ]
+
+    def get_tweets(self, term, mode='user', number=20, until=None):
+        tweets = self.tweets
+        if until:
+            day = int(until.rsplit('-', 1)[1])
+            tweets = [t for t in tweets if int(t['link'][14:]) < day]
+        return {'tweets': tweets[:number]}
+
+
+def test_incremental_cli_commits_watermark_after_output(
+    monkeypatch, tmp_path
+):
+    store = WatermarkStore(str(tmp_path / 'marks.sqlite3'))
+    nitter = TimelineNitter(days=4)
+
+    def make_scraper():
+        scraper = cli_scraper(watermarks=store)
+        scraper.pool.delay = 0
+        scraper.pool.instances[0].client = nitter
+        return scraper
+
+    cli_scraper = cli.Scraper
+    monkeypatch.setattr(cli, 'Scraper', make_scraper)
+    monkeypatch.setattr(cli, 'SCRAPE_AVAILABLE', True)
+    args = ['--user', 'user', '--limit', '4', '--chunk-size', '2',
+            '--incremental']
+
+    class FailingAnalyzer(FakeAnalyzer):
+        def analyze_dataframe_in_parallel(self, df, *args, **options):
+            if len(FakeAnalyzer.chunks) == 1:
+                raise RuntimeError('analysis failed')
+            return super().analyze_dataframe_in_parallel(df)
+
+    FakeAnalyzer.chunks = []
+    monkeypatch.setattr(cli, 'Analyzer', FailingAnalyzer)
+    with pytest.raises(RuntimeError):
+        cli.main(args + ['-o', str(tmp_path / 'failed.csv')])
+    # The first page was written, but the run did not finish.
+    assert store.get('user', 'user') is None
+
+    monkeypatch.setattr(cli, 'Analyzer', FakeAnalyzer)
+    output = tmp_path / 'out.csv'
+    assert cli.main(args + ['-o', str(output)]) == 0
+    assert len(pd.read_csv(output)) == 4
+    assert store.get('user', 'user')['url'] == 'https://x.com/4'
+
+
+def test_cli_scrapes_targets_concurrently(monkeypatch, tmp_path):
+    class MeetingNitter(TimelineNitter):
+        """Only answers once both targets are being scraped at once."""
+
+        barrier = threading.Barrier(2, timeout=5)
+
+        def get_tweets(self, term, **options):
+            if not options.get('until'):
+                self.barrier.wait()
+            return super().get_tweets(term, **options)
+
+    nitter = MeetingNitter(days=4)
+
+    def make_scraper():
+        scraper = cli_scraper(instances=['https://a', 'https://b'])
+        scraper.pool.delay = 0
+        for instance in scraper.pool.instances:
+            instance.client = nitter
+        return scraper
+
+    cli_scraper = cli.Scraper
+    monkeypatch.setattr(cli, 'Scraper', make_scraper)
+    monkeypatch.setattr(cli, 'SCRAPE_AVAILABLE', True)
+    monkeypatch.setattr(cli, 'Analyzer', FakeAnalyzer)
+    output = tmp_path / 'out.csv'
+
+    assert cli.main(
+        ['--user', 'one', '--keyword', 'two', '--limit', '4',
+         '--chunk-size', '2', '-o', str(output)]
+    ) == 0
+
+    result = pd.read_csv(output)
+    assert result['target'].value_counts().to_dict() == {
+        'user:one': 4, 'term:two': 4
+    }
@@ -0,0 +1,73 @@
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+import pandas as pd
+
+from aggression_analyzer.modules.dedup import DuplicateIndex, find_duplicates
+from aggression_analyzer.modules.text import normalize_for_matching
+
+
+def test_normalize_for_matching_strips_noise():
+    assert normalize_for_matching(
+        'RT @someone: ＡＢＣ　消えろ！ https://t.co/xyz'
+    ) == 'abc 消えろ'
+
+
+def test_find_duplicates_matches_exact_copies_by_default():
+    texts = pd.Series(
+        [
+            'お前みたいな奴は本当に消えてほしい、二度と顔を見せるな',
+            '@a お前みたいな奴は本当に消えてほしい。二度と顔を見せるな！',
+            'お前みたいな奴は本当に消えてくれ、二度と顔を見せるな',
+            'The weather today is lovely and I went for a walk',
+            'the weather today is lovely and i went for a walk!! http://x.y',
+            'short',
+            'shorts',
+        ],
+        index=[10, 11, 12, 13, 14, 15, 16],
+    )
+
+    duplicate_of = find_duplicates(texts)
+
+    assert list(duplicate_of.index) == list(texts.index)
+    assert duplicate_of.tolist() == [None, 10, None, None, 13, None, None]
+
+
+def test_near_duplicates_are_opt_in():
+    post = (
+        'お前みたいな奴は本当に消えてほしい、二度と顔を見せるな。'
+        'みんな迷惑しているのがまだわからないのか、いい加減にしろ'
+    )
+    edited = post.replace('いい加減にしろ', 'いい加減にしろよ')
+    texts = pd.Series([post, edited])
+
+    assert find_duplicates(texts).tolist() == [None, None]
+    assert find_duplicates(texts, DuplicateIndex(near=True)).tolist() == [
+        None,
+        0,
+    ]
+
+
+def test_negation_and_swapped_objects_are_not_duplicates():
+    pairs = [
+        ('I will kill it at the show tonight',
+         'I will kill you at the show tonight'),
+        ('you are a good person', 'you are not a good person'),
+        ('正しいと思う', '正しくないと思う'),
+    ]
+    for index in (DuplicateIndex(), DuplicateIndex(near=True)):
+        for first, second in pairs:
+            texts = pd.Series([first, second])
+            assert find_duplicates(texts, index).tolist() == [None, None]
+
+
+def test_duplicate_index_ignores_unrelated_posts():
+    index = DuplicateIndex()
+    assert index.add('a', 'You are the worst person on this site') is None
+    assert index.add('b', 'Lunch at the new ramen place was great') is None
+    assert index.add('c', 'you are the worst person on this site!!') == 'a'
+    assert len(index) == 2
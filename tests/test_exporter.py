@@ -0,0 +1,49 @@
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+import pandas as pd
+import pytest
+
+from aggression_analyzer.modules.exporter import export_dataframe
+
+
+def _results():
+    return pd.DataFrame(
+        {
+            'content': ['ok', 'bad\x07text', 'fine'],
+            'aggressiveness_score': pd.array([1, None, 9], dtype='Int8'),
+            'hate_flag': [False, True, False],
+            'hate_score': pd.array([0.1, 0.5, 0.9], dtype='float32'),
+        }
+    )
+
+
+@pytest.mark.parametrize('extension', ['xlsx', 'csv', 'jsonl', 'parquet'])
+def test_export_dataframe_round_trips(tmp_path, extension):
+    path = str(tmp_path / f'results.{extension}')
+
+    export_dataframe(_results(), path, chunk_size=2)
+
+    if extension == 'xlsx':
+        back = pd.read_excel(path)
+    elif extension == 'csv':
+        back = pd.read_csv(path)
+    elif extension == 'jsonl':
+        back = pd.read_json(path, lines=True)
+    else:
+        back = pd.read_parquet(path)
+    assert len(back) == 3
+    assert back['hate_flag'].tolist() == [False, True, False]
+    assert back['aggressiveness_score'].iloc[2] == 9
+    assert pd.isna(back['aggressiveness_score'].iloc[1])
+    if extension == 'xlsx':
+        assert back['content'].iloc[1] == 'badtext'
+
+
+def test_export_dataframe_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        export_dataframe(_results(), str(tmp_path / 'results.txt'))
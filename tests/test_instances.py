@@ -0,0 +1,102 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+import pytest
+
+from aggression_analyzer.modules.instances import InstancePool
+
+
+class FakeInstance:
+    """Local stand-in for a Nitter instance."""
+
+    def __init__(self, url, down=False, latency=0.0, empty=False):
+        self.url = url
+        self.down = down
+        self.empty = empty
+        self.latency = latency
+        self.calls = 0
+
+    def get_tweets(self, term, mode="user", number=20):
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.down:
+            raise ConnectionError(f"{self.url} is down")
+        if self.empty:
+            return {"tweets": []}
+        return {"tweets": [{"link": f"{self.url}/{term}"}]}
+
+
+def make_pool(specs, **kwargs):
+    fakes = {url: FakeInstance(url, **opts) for url, opts in specs.items()}
+    pool = InstancePool(list(fakes), fakes.__getitem__, **kwargs)
+    return pool, fakes
+
+
+def test_fails_over_to_a_healthy_instance():
+    pool, fakes = make_pool(
+        {"a": {"down": True}, "b": {}}, delay=0, failure_threshold=1
+    )
+    for _ in range(3):
+        result = pool.call(lambda c: c.get_tweets("jack"))
+        assert result["tweets"][0]["link"] == "b/jack"
+    # The circuit for "a" opened after its first failure.
+    assert fakes["a"].calls == 1
+    stats = {s["url"]: s for s in pool.stats()}
+    assert stats["a"]["circuit_open"] is True
+    assert stats["b"]["successes"] == 3
+
+
+def test_empty_results_are_answers_not_failures():
+    pool, fakes = make_pool(
+        {"a": {"empty": True}, "b": {"empty": True}},
+        delay=0,
+        failure_threshold=1,
+    )
+    for _ in range(3):
+        assert pool.call(lambda c: c.get_tweets("jack")) == {"tweets": []}
+    # Each call was answered by one instance, without failing over.
+    assert fakes["a"].calls + fakes["b"].calls == 3
+    for stats in pool.stats():
+        assert stats["failures"] == 0
+        assert stats["circuit_open"] is False
+
+
+def test_raises_when_every_instance_fails():
+    pool, _ = make_pool({"a": {"down": True}, "b": {"down": True}}, delay=0)
+    with pytest.raises(ConnectionError):
+        pool.call(lambda c: c.get_tweets("jack"))
+
+
+def test_circuit_closes_after_cooldown():
+    pool, fakes = make_pool(
+        {"a": {"down": True}}, delay=0, failure_threshold=1, cooldown=0.05
+    )
+    with pytest.raises(ConnectionError):
+        pool.call(lambda c: c.get_tweets("x"))
+    assert pool.healthy() == []
+    fakes["a"].down = False
+    time.sleep(0.06)
+    assert pool.call(lambda c: c.get_tweets("x"))["tweets"]
+
+
+def test_concurrent_calls_use_different_instances():
+    pool, fakes = make_pool(
+        {"a": {"latency": 0.1}, "b": {"latency": 0.1}}, delay=0
+    )
+    threads = [
+        threading.Thread(target=pool.call, args=(lambda c: c.get_tweets("x"),))
+        for _ in range(2)
+    ]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert time.monotonic() - start < 0.18
+    assert fakes["a"].calls == 1 and fakes["b"].calls == 1
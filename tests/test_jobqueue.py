@@ -0,0 +1,189 @@
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+import pandas as pd
+
+from aggression_analyzer import worker
+from aggression_analyzer.modules.jobqueue import (
+    JobQueue,
+    RemoteJobQueue,
+    serve_queue,
+)
+from aggression_analyzer.modules.watermarks import WatermarkStore
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    queue = JobQueue(str(tmp_path / 'q.sqlite3'), visibility_timeout=0.2)
+    assert queue.put('analyze', {'n': 1}, key='a')
+    assert not queue.put('analyze', {'n': 1}, key='a')
+    queue.put('analyze', {'n': 2})
+
+    first = queue.lease('w1')
+    second = queue.lease('w2')
+    assert (first.payload, second.payload) == ({'n': 1}, {'n': 2})
+    assert queue.lease('w3') is None
+
+    time.sleep(0.3)
+    assert queue.heartbeat(second)
+    retaken = queue.lease('w3')
+    assert retaken.id == first.id and retaken.attempts == 2
+    assert not queue.complete(first, [{'row': 'stale'}])
+    assert queue.complete(retaken, [{'row': 1}], [('analyze', {'n': 3}, None)])
+    assert queue.complete(second, [{'row': 2}])
+
+    assert queue.lease('w1', kinds=['scrape']) is None
+    third = queue.lease('w1')
+    assert third.payload == {'n': 3}
+    assert list(queue.iter_results()) == [[{'row': 1}], [{'row': 2}]]
+    assert queue.counts() == {
+        'queued': 0, 'leased': 1, 'done': 2, 'failed': 0
+    }
+
+
+def test_failed_jobs_are_retried_then_given_up(tmp_path):
+    queue = JobQueue(
+        str(tmp_path / 'q.sqlite3'), max_attempts=2, retry_delay=0
+    )
+    queue.put('analyze', {})
+    job = queue.lease('w1')
+    assert queue.fail(job, 'boom')
+    job = queue.lease('w1')
+    assert job.attempts == 2
+    assert queue.fail(job, 'boom again')
+    assert queue.lease('w1') is None
+    assert queue.counts()['failed'] == 1
+
+    assert queue.retry_failed() == 1
+    job = queue.lease('w1')
+    assert queue.release(job)
+    assert queue.lease('w2').attempts == 1
+
+
+def _drain(path, worker_id, done):
+    queue = JobQueue(path)
+    while (job := queue.lease(worker_id)) is not None:
+        queue.complete(job, [{'n': job.payload['n'], 'worker': worker_id}])
+    queue.close()
+    done.put(worker_id)
+
+
+def test_processes_share_the_queue_file(tmp_path):
+    path = str(tmp_path / 'q.sqlite3')
+    queue = JobQueue(path)
+    queue.put_many(('analyze', {'n': n}, None) for n in range(60))
+
+    context = multiprocessing.get_context('spawn')
+    done = context.Queue()
+    processes = [
+        context.Process(target=_drain, args=(path, f'w{i}', done))
+        for i in range(3)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    rows = [row for rows in queue.iter_results() for row in rows]
+    assert sorted(row['n'] for row in rows) == list(range(60))
+    assert queue.counts()['done'] == 60
+
+
+def test_remote_queue_matches_local_queue(tmp_path):
+    server = serve_queue(JobQueue(str(tmp_path / 'q.sqlite3')))
+    remote = RemoteJobQueue(f'http://127.0.0.1:{server.server_address[1]}')
+    try:
+        assert remote.put('analyze', {'text': '投稿'}, key='k')
+        assert not remote.put('analyze', {'text': '投稿'}, key='k')
+        job = remote.lease('remote')
+        assert job.payload == {'text': '投稿'}
+        assert remote.heartbeat(job)
+        assert remote.complete(job, [{'score': 1}])
+        assert list(remote.iter_results()) == [[{'score': 1}]]
+        assert remote.counts()['done'] == 1
+    finally:
+        remote.close()
+        server.shutdown()
+
+
+class FakeAnalyzer:
+    def analyze_dataframe_in_parallel(self, df, **options):
+        return df.assign(aggressiveness_score=[len(t) for t in df['content']])
+
+
+def test_worker_enqueues_runs_and_collects(tmp_path):
+    path = str(tmp_path / 'q.sqlite3')
+    posts = tmp_path / 'posts.csv'
+    pd.DataFrame({'content': ['a', 'bb', 'ccc', 'dddd', 'eeeee']}).to_csv(
+        posts, index=False
+    )
+    args = ['--queue', path]
+    assert worker.main(
+        args + ['enqueue', '--input', str(posts), '--chunk-size', '2']
+    ) == 0
+    worker.main(args + ['enqueue', '--input', str(posts), '--chunk-size', '2'])
+
+    queue = JobQueue(path)
+    assert queue.counts()['queued'] == 3
+    completed = worker.run_worker(
+        queue, FakeAnalyzer(), exit_when_empty=True, poll_seconds=0
+    )
+    assert completed == 3
+
+    output = str(tmp_path / 'out.csv')
+    assert worker.main(args + ['collect', '-o', output]) == 0
+    result = pd.read_csv(output)
+    assert list(result['aggressiveness_score']) == [1, 2, 3, 4, 5]
+
+
+class TimelineNitter:
+    def get_tweets(self, term, mode='user', number=20, until=None):
+        tweets = [
+            {
+                'date': f'Jan {day}, 2024 · 10:00 AM UTC',
+                'link': f'https://x.com/{day}',
+                'text': f'post {day}',
+                'user': {'username': term},
+            }
+            for day in (3, 2, 1)
+        ]
+        return {'tweets': [] if until else tweets[:number]}
+
+
+class LosingQueue(JobQueue):
+    """Queue whose first completion finds the lease taken over."""
+
+    def __init__(self, path, store):
+        super().__init__(path, visibility_timeout=0.2)
+        self.store = store
+        self.marks = []
+
+    def complete(self, job, rows, follow_ups=()):
+        self.marks.append(self.store.get('user', 'user'))
+        if len(self.marks) == 1:
+            return False
+        return super().complete(job, rows, follow_ups)
+
+
+def test_incremental_scrape_moves_watermark_after_complete(tmp_path):
+    store = WatermarkStore(str(tmp_path / 'marks.sqlite3'))
+    scraper = worker.Scraper(watermarks=store)
+    scraper.pool.delay = 0
+    scraper.pool.instances[0].client = TimelineNitter()
+    queue = LosingQueue(str(tmp_path / 'q.sqlite3'), store)
+    worker.enqueue_targets(queue, ['user'], [], 5, incremental=True)
+
+    worker.run_worker(
+        queue, FakeAnalyzer(), scraper, exit_when_empty=True,
+        poll_seconds=0.05,
+    )
+    # Neither the lost completion nor the retry saw a moved watermark.
+    assert queue.marks[:2] == [None, None]
+    assert store.get('user', 'user')['url'] == 'https://x.com/3'
+    assert queue.counts()['done'] == 2
@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+import numpy as np
+import pandas as pd
+
+from aggression_analyzer.modules.journal import ResultJournal, row_keys
+
+
+def test_journal_batches_and_survives_reopen(tmp_path):
+    path = str(tmp_path / 'journal.sqlite3')
+    journal = ResultJournal(path, flush_rows=2, flush_seconds=60)
+    journal.append('a', {'score': np.int64(1)})
+    assert ResultJournal(path).lookup(['a']) == {}
+    journal.append('b', {'score': 2})
+    assert ResultJournal(path).lookup(['a', 'b', 'c']) == {
+        'a': {'score': 1}, 'b': {'score': 2}
+    }
+    journal.close()
+
+    assert len(ResultJournal(path)) == 2
+    assert len(ResultJournal(path, resume=False)) == 0
+
+
+def test_row_keys_prefer_url():
+    df = pd.DataFrame(
+        {'url': ['https://x.com/1', None, '']}, index=[5, 6, 7]
+    )
+    assert row_keys(df).tolist() == ['https://x.com/1', 'row:6', 'row:7']
+    assert row_keys(pd.DataFrame({'content': ['a']})).tolist() == ['row:0']
@@ -0,0 +1,114 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+import openai
+import pytest
+
+from aggression_analyzer.modules.analyzer import Analyzer
+from aggression_analyzer.modules.metrics import Metrics
+from aggression_analyzer.modules.ratelimit import RateLimiter
+
+PRICING = {"m": {"input": 1.0, "cached_input": 0.5, "output": 2.0}}
+
+
+def usage(prompt, completion, cached=0):
+    return SimpleNamespace(
+        prompt_tokens=prompt,
+        completion_tokens=completion,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=cached),
+    )
+
+
+def test_tokens_cost_and_latency_are_accumulated():
+    metrics = Metrics(PRICING)
+    metrics.observe_call("m", 0.2, usage(1_000_000, 500_000, 400_000))
+    metrics.observe_call("m", 3.0, usage(0, 0))
+    metrics.observe_call("free", 0.01)
+    with metrics.stage("export"):
+        pass
+
+    data = metrics.snapshot()
+    model = data["models"]["m"]
+    assert model["requests"] == 2
+    assert model["cached_tokens"] == 400_000
+    # 600k uncached * $1 + 400k cached * $0.5 + 500k output * $2 per 1M.
+    assert model["cost_usd"] == pytest.approx(1.8)
+    assert data["cost_usd"] == pytest.approx(1.8)
+    assert model["latency_p50"] == 0.25
+    assert model["latency_seconds"]["buckets"]["5.0"] == 2
+    assert data["stages"]["export"]["runs"] == 1
+    assert json.loads(metrics.to_json())["models"]["free"]["requests"] == 1
+
+    metrics.reset()
+    assert metrics.snapshot() == {"models": {}, "stages": {}, "cost_usd": 0}
+
+
+def test_prometheus_text_format():
+    metrics = Metrics(PRICING)
+    metrics.observe_call("m", 0.2, usage(10, 5))
+    metrics.record_retry("m", TimeoutError())
+    metrics.add_stage("analyze", 1.5)
+
+    text = metrics.to_prometheus()
+    assert "# TYPE aggression_analyzer_api_request_duration_seconds" \
+        " histogram" in text
+    assert (
+        'aggression_analyzer_api_request_duration_seconds_bucket'
+        '{model="m",le="0.25"} 1'
+    ) in text
+    assert 'api_tokens_total{model="m",kind="completion"} 5' in text
+    assert 'api_retries_total{model="m",error="TimeoutError"} 1' in text
+    assert 'stage_duration_seconds_total{stage="analyze"} 1.5' in text
+    assert "API 1回" in metrics.summary()
+
+
+def test_analyzer_records_calls_retries_and_failures(monkeypatch):
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.ratelimit.time.sleep', lambda s: None
+    )
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.analyzer.API_MAX_RETRIES', 1
+    )
+    metrics = Metrics(PRICING)
+    analyzer = Analyzer(
+        api_key='test', rate_limiter=RateLimiter({}), metrics=metrics
+    )
+    outcomes = []
+
+    def throttled():
+        return openai.RateLimitError(
+            "slow down",
+            response=SimpleNamespace(status_code=429, request=None,
+                                     headers={}),
+            body=None,
+        )
+
+    class Resource:
+        class with_raw_response:
+            @staticmethod
+            def create(**kwargs):
+                outcome = outcomes.pop(0)
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return SimpleNamespace(
+                    headers={},
+                    parse=lambda: SimpleNamespace(usage=usage(100, 20)),
+                )
+
+    outcomes[:] = [throttled(), "ok"]
+    analyzer._call_api(Resource, "m", 5)
+    outcomes[:] = [throttled(), throttled()]
+    with pytest.raises(openai.RateLimitError):
+        analyzer._call_api(Resource, "m", 5)
+
+    model = metrics.snapshot()["models"]["m"]
+    assert model["requests"] == 1
+    assert model["prompt_tokens"] == 100
+    assert model["retries"] == {"RateLimitError": 2}
+    assert model["failures"] == {"RateLimitError": 1}
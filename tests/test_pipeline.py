@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+import pandas as pd
+import pytest
+
+from aggression_analyzer.modules.pipeline import (
+    iter_analyzed_pages,
+    prefetch,
+)
+
+
+def test_prefetch_stays_bounded():
+    produced = []
+
+    def items():
+        for i in range(10):
+            produced.append(i)
+            yield i
+
+    gen = prefetch(items(), maxsize=2)
+    assert next(gen) == 0
+    time.sleep(0.2)
+    # One item handed out, two buffered and one blocked in put().
+    assert len(produced) <= 4
+    assert list(gen) == list(range(1, 10))
+
+
+def test_prefetch_reraises_producer_errors():
+    def items():
+        yield 1
+        raise RuntimeError("scrape failed")
+
+    gen = prefetch(items())
+    assert next(gen) == 1
+    with pytest.raises(RuntimeError, match="scrape failed"):
+        next(gen)
+
+
+class FakeAnalyzer:
+    def analyze_dataframe_in_parallel(
+        self, df, progress_callback=None, result_callback=None
+    ):
+        for i, index in enumerate(df.index):
+            if result_callback:
+                result_callback(index, {"aggressiveness_score": i})
+            progress_callback(i + 1, len(df))
+        return df.assign(aggressiveness_score=1)
+
+
+def test_iter_analyzed_pages_reports_cumulative_progress():
+    pages = (pd.DataFrame({"content": ["x"] * n}) for n in (2, 3))
+    progress = []
+
+    results = list(
+        iter_analyzed_pages(
+            pages,
+            FakeAnalyzer(),
+            lambda done, total: progress.append((done, total)),
+            expected_total=4,
+        )
+    )
+
+    assert [len(r) for r in results] == [2, 3]
+    assert progress == [(1, 4), (2, 4), (3, 5), (4, 5), (5, 5)]
+
+
+def test_iter_analyzed_pages_streams_rows():
+    pages = iter([
+        pd.DataFrame({"content": ["a", "b"], "url": ["u/a", "u/b"]}),
+        pd.DataFrame({"content": ["c"], "url": ["u/c"]}),
+    ])
+    rows = []
+
+    list(iter_analyzed_pages(pages, FakeAnalyzer(), row_callback=rows.append))
+
+    assert rows == [
+        {"content": "a", "url": "u/a", "aggressiveness_score": 0},
+        {"content": "b", "url": "u/b", "aggressiveness_score": 1},
+        {"content": "c", "url": "u/c", "aggressiveness_score": 0},
+    ]
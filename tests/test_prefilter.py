@@ -0,0 +1,60 @@
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+import pandas as pd
+import pytest
+
+from aggression_analyzer.modules.prefilter import (
+    TermMatcher,
+    get_matcher,
+    normalize_for_lexicon,
+    prefilter,
+)
+
+
+@pytest.mark.parametrize('native', [False, True])
+def test_term_matcher_finds_terms(native):
+    if native:
+        pytest.importorskip('ahocorasick')
+    matcher = TermMatcher(['死ね', 'キモい', 'die', 'kill yourself', 'he'],
+                          native=native)
+
+    def find(text):
+        return sorted(matcher.find(normalize_for_lexicon(text)))
+
+    assert find('お前シネよ') == []
+    assert find('まじ死ねばいいのに、きもい') == ['きもい', '死ね']
+    assert find('ｷﾓｲ') == ['きもい']
+    assert find('I am on a diet') == []
+    assert find('just DIE.') == ['die']
+    assert find('Kill Yourself') == ['kill yourself']
+    assert find('she said hello') == []
+    assert find('ushers') == []
+
+
+def test_get_matcher_is_cached():
+    assert get_matcher() is get_matcher()
+    assert get_matcher(('a',)) is get_matcher(('a',))
+
+
+def test_prefilter_marks_only_low_risk_posts():
+    texts = pd.Series(
+        [
+            '今日はいい天気ですね',
+            'お前本当にうざい',
+            'Lovely walk in the park',
+            'WHY WOULD ANYONE DO THIS TO ME',
+            'no way!!!',
+            None,
+        ],
+        index=[1, 2, 3, 4, 5, 6],
+    )
+
+    mask = prefilter(texts)
+
+    assert mask.dtype == bool
+    assert mask.tolist() == [True, False, True, False, False, True]
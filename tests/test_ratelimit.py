@@ -0,0 +1,93 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+import openai
+
+from aggression_analyzer.modules.analyzer import Analyzer
+from aggression_analyzer.modules.ratelimit import RateLimiter, parse_duration
+
+
+def test_parse_duration():
+    assert parse_duration("1s") == 1.0
+    assert parse_duration("6m0s") == 360.0
+    assert parse_duration("120ms") == 0.12
+    assert parse_duration("2") == 2.0
+    assert parse_duration(None) is None
+
+
+def test_acquire_waits_when_request_budget_is_spent(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.ratelimit.time.sleep', sleeps.append
+    )
+    limiter = RateLimiter({"m": {"requests": 60, "tokens": 10_000}})
+    for _ in range(60):
+        limiter.acquire("m", 10)
+    assert sleeps == []
+    limiter.acquire("m", 10)
+    assert len(sleeps) == 1 and 0.9 < sleeps[0] <= 1.0
+    assert limiter.snapshot()["m"]["waiting"] == 0
+
+
+def test_limits_are_learned_from_headers():
+    limiter = RateLimiter({})
+    retry_after = limiter.update_from_headers("m", {
+        "x-ratelimit-limit-requests": "30",
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-requests": "2s",
+        "x-ratelimit-limit-tokens": "1000",
+        "x-ratelimit-remaining-tokens": "900",
+        "retry-after": "3",
+    })
+    state = limiter.snapshot()["m"]
+    assert retry_after == 3.0
+    assert state["requests_per_minute"] == 30
+    assert state["tokens_per_minute"] == 1000
+    assert state["requests_available"] < 0
+    assert 2.9 < state["paused_for"] <= 3.0
+
+
+def test_backoff_is_jittered_and_honours_retry_after():
+    limiter = RateLimiter({}, backoff_base=1.0, backoff_max=8.0)
+    assert all(0 <= limiter.backoff(10) <= 8.0 for _ in range(50))
+    assert limiter.backoff(0, retry_after=5.0) >= 5.0
+
+
+def test_analyzer_retries_rate_limited_calls(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.ratelimit.time.sleep', sleeps.append
+    )
+    limiter = RateLimiter({})
+    analyzer = Analyzer(api_key='test', rate_limiter=limiter)
+    attempts = []
+
+    class Resource:
+        class with_raw_response:
+            @staticmethod
+            def create(**kwargs):
+                attempts.append(kwargs)
+                if len(attempts) == 1:
+                    raise openai.RateLimitError(
+                        "slow down",
+                        response=SimpleNamespace(
+                            status_code=429,
+                            request=None,
+                            headers={"retry-after": "2"},
+                        ),
+                        body=None,
+                    )
+                return SimpleNamespace(
+                    headers={"x-ratelimit-limit-requests": "42"},
+                    parse=lambda: "ok",
+                )
+
+    assert analyzer._call_api(Resource, "m", 5, input="x") == "ok"
+    assert len(attempts) == 2 and attempts[0]["model"] == "m"
+    assert 1.9 < sum(sleeps) <= 2.0
+    assert limiter.snapshot()["m"]["requests_per_minute"] == 42
@@ -0,0 +1,102 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+)
+
+from aggression_analyzer.gui.results_model import ResultsModel, score_color
+
+
+def make_frame():
+    return pd.DataFrame(
+        {
+            'content': ['calm', 'angry post', None, 'very angry'],
+            'aggressiveness_score': pd.array([1, 6, pd.NA, 9], dtype='Int64'),
+        },
+        index=[10, 11, 12, 13],
+    )
+
+
+def test_select_threshold_is_vectorized_over_scores():
+    model = ResultsModel(make_frame())
+    model.select_threshold(5)
+    assert model.selected_positions().tolist() == [1, 3]
+    model.select_threshold(0)
+    # Failed rows count as score 0.
+    assert model.selected_positions().tolist() == [0, 1, 2, 3]
+
+
+def test_manual_selection_and_labels():
+    model = ResultsModel(make_frame())
+    model.set_selected(2, True)
+    assert model.selected_positions().tolist() == [2]
+    assert model.label(2) == 12
+    model.set_selected(2, False)
+    assert len(model.selected_positions()) == 0
+
+
+def test_row_view_and_status():
+    model = ResultsModel(make_frame())
+    model.select_threshold(7)
+    model.set_status(3, '完了')
+    row = model.row(3)
+    assert row.score == 9
+    assert row.text == '9: very angry'
+    assert row.selected
+    assert row.status == '完了'
+    assert model.row(2).text == '0: '
+    assert score_color(row.score) == '#8b0000'
+
+
+def test_set_frame_resets_state():
+    model = ResultsModel(make_frame())
+    model.select_threshold(0)
+    model.set_status(0, '完了')
+    model.select_threshold(5)
+    model.set_frame(make_frame().iloc[:2])
+    assert len(model) == 2
+    # The current threshold is applied to the new rows.
+    assert model.selected_positions().tolist() == [1]
+    assert model.row(0).status == ''
+    assert len(ResultsModel()) == 0
+
+
+def test_extend_keeps_rows_sorted_by_score():
+    model = ResultsModel()
+    model.select_threshold(5)
+    model.set_sort_by_score(True)
+    model.extend([
+        {'content': 'a', 'url': 'u/a', 'aggressiveness_score': 3},
+        {'content': 'b', 'url': 'u/b', 'aggressiveness_score': 8},
+    ])
+    model.extend([
+        {'content': 'c', 'url': 'u/c', 'aggressiveness_score': None},
+        {'content': 'd', 'url': 'u/d', 'aggressiveness_score': 8},
+    ])
+    assert [model.position_at(i) for i in range(4)] == [1, 3, 0, 2]
+    assert model.selected_positions().tolist() == [1, 3]
+    model.set_sort_by_score(False)
+    assert model.position_at(0) == 0
+
+
+def test_set_frame_can_keep_selection_by_url():
+    model = ResultsModel()
+    model.select_threshold(5)
+    model.extend([
+        {'content': 'a', 'url': 'u/a', 'aggressiveness_score': 3},
+        {'content': 'b', 'url': 'u/b', 'aggressiveness_score': 8},
+    ])
+    model.set_selected(0, True)
+    model.set_selected(1, False)
+    model.set_status(0, '完了')
+    final = pd.DataFrame({
+        'content': ['b', 'new', 'a'],
+        'url': ['u/b', 'u/new', 'u/a'],
+        'aggressiveness_score': [8, 9, 3],
+    })
+    model.set_frame(final, keep_selection=True)
+    assert model.selected_positions().tolist() == [1, 2]
+    assert model.row(2).status == '完了'
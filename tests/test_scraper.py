@@ -1,5 +1,10 @@
+import importlib
+import logging
 import os
+import socket
 import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 sys.path.insert(
     0, os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
@@ -7,6 +12,9 @@ sys.path.insert(
 
 import types
 
+import pandas as pd
+import pytest
+
 fake_ntscraper = types.ModuleType('ntscraper')
 
 
@@ -14,7 +22,7 @@ class FakeNitter:
     def __init__(self, instances=None, skip_instance_check=False):
         pass
 
-    def get_tweets(self, term, mode="user", number=20):
+    def get_tweets(self, term, mode="user", number=20, **options):
         if mode == "user" and term == "nouser":
             raise ValueError("user not found")
         if mode == "term" and term == "rarekeyword":
@@ -42,7 +50,7 @@ class FakeNitter:
         ]
         return {"tweets": tweets[:number]}
 
-    def get_profile_info(self, username):
+    def get_profile_info(self, username, **options):
         return {
             "id": 123,
             "username": username,
@@ -57,6 +65,7 @@ sys.modules['ntscraper'] = fake_ntscraper
 
 
 from aggression_analyzer.modules.scraper import Scraper
+from aggression_analyzer.modules.watermarks import WatermarkStore
 
 
 def test_scrape_user_posts(monkeypatch):
@@ -66,7 +75,7 @@ def test_scrape_user_posts(monkeypatch):
         calls.append(sec)
 
     monkeypatch.setattr(
-        'aggression_analyzer.modules.scraper.time.sleep',
+        'aggression_analyzer.modules.instances.time.sleep',
         fake_sleep,
     )
     scraper = Scraper()
@@ -91,7 +100,7 @@ def test_search_posts_by_keyword(monkeypatch):
         calls.append(sec)
 
     monkeypatch.setattr(
-        'aggression_analyzer.modules.scraper.time.sleep',
+        'aggression_analyzer.modules.instances.time.sleep',
         fake_sleep,
     )
     scraper = Scraper()
@@ -108,7 +117,7 @@ def test_nonexistent_user_returns_empty_dataframe(monkeypatch):
         calls.append(sec)
 
     monkeypatch.setattr(
-        'aggression_analyzer.modules.scraper.time.sleep',
+        'aggression_analyzer.modules.instances.time.sleep',
         fake_sleep,
     )
     scraper = Scraper()
@@ -125,7 +134,7 @@ def test_rare_keyword_returns_zero_results(monkeypatch):
         calls.append(sec)
 
     monkeypatch.setattr(
-        'aggression_analyzer.modules.scraper.time.sleep',
+        'aggression_analyzer.modules.instances.time.sleep',
         fake_sleep,
     )
     scraper = Scraper()
@@ -142,7 +151,7 @@ def test_search_dataframe_columns(monkeypatch):
         calls.append(sec)
 
     monkeypatch.setattr(
-        'aggression_analyzer.modules.scraper.time.sleep',
+        'aggression_analyzer.modules.instances.time.sleep',
         fake_sleep,
     )
     scraper = Scraper()
@@ -154,3 +163,354 @@ def test_search_dataframe_columns(monkeypatch):
         'user_name',
     ]).issubset(df.columns)
     assert len(calls) == 1
+
+
+class PagedNitter:
+    """Newest-first timeline of one post per day with ``until`` support."""
+
+    def __init__(self, days: int):
+        self.calls: list[dict] = []
+        self.tweets = [
+            {
+                "date": f"Jan {day}, 2024 · 10:00 AM UTC",
+                "link": f"https://x.com/{day}",
+                "text": f"post {day}",
+                "user": {"username": "user"},
+            }
+            for day in range(days, 0, -1)
+        ]
+
+    def get_tweets(self, term, mode="user", number=20, until=None):
+        self.calls.append({"number": number, "until": until})
+        tweets = self.tweets
+        if until:
+            day = int(until.rsplit("-", 1)[1])
+            tweets = [
+                t for t in tweets if int(t["link"].rsplit("/")[-1]) < day
+            ]
+        return {"tweets": tweets[:number]}
+
+
+def test_iter_tweet_pages_pages_backwards_with_until(monkeypatch):
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.instances.time.sleep', lambda s: None
+    )
+    scraper = Scraper()
+    scraper.pool.instances[0].client = PagedNitter(days=5)
+
+    pages = list(scraper.iter_tweet_pages('user', 'user', 4, page_size=2))
+
+    urls = [url for page in pages for url in page['url']]
+    assert urls == [f'https://x.com/{d}' for d in (5, 4, 3, 2)]
+    assert scraper.pool.instances[0].client.calls[0]['until'] is None
+    assert scraper.pool.instances[0].client.calls[1]['until'] == '2024-01-05'
+    assert all(len(page) <= 2 for page in pages)
+
+
+class BusyDayNitter(PagedNitter):
+    """Timeline with ``counts[day]`` posts on each day of January 2024."""
+
+    def __init__(self, counts: dict[int, int]):
+        self.calls = []
+        self.tweets = [
+            {
+                "date": f"Jan {day}, 2024 · {23 - n // 60}:{59 - n % 60} UTC",
+                "link": f"https://x.com/{day}-{n}",
+                "text": f"post {day}-{n}",
+                "user": {"username": "user"},
+            }
+            for day in sorted(counts, reverse=True)
+            for n in range(counts[day])
+        ]
+
+    def get_tweets(self, term, mode="user", number=20, until=None):
+        self.calls.append({"number": number, "until": until})
+        tweets = self.tweets
+        if until:
+            day = int(until.rsplit("-", 1)[1])
+            tweets = [
+                t for t in tweets
+                if int(t["link"].rsplit("/")[-1].split("-")[0]) < day
+            ]
+        return {"tweets": tweets[:number]}
+
+
+def test_iter_tweet_pages_keeps_days_larger_than_a_page(monkeypatch):
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.instances.time.sleep', lambda s: None
+    )
+    scraper = Scraper()
+    nitter = BusyDayNitter({2: 150, 1: 100})
+    scraper.pool.instances[0].client = nitter
+
+    pages = list(scraper.iter_tweet_pages('user', 'user', 250, page_size=100))
+
+    urls = [url for page in pages for url in page['url']]
+    assert urls == [t['link'] for t in nitter.tweets]
+    assert all(len(page) <= 100 for page in pages)
+    assert [c['until'] for c in nitter.calls] == [
+        None, '2024-01-03', '2024-01-02'
+    ]
+
+
+class PinnedNitter:
+    """Five own posts a day in January 2024 below a pinned 2020 post.
+
+    Like Nitter's search, requests with ``until`` leave the pinned post
+    out.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.pinned = {
+            "date": "Jan 1, 2020 · 10:00 AM UTC",
+            "link": "https://x.com/pinned",
+            "text": "pinned",
+            "user": {"username": "user"},
+            "is-pinned": True,
+            "day": 0,
+        }
+        self.tweets = [
+            {
+                "date": f"Jan {day}, 2024 · {n + 1}:00 AM UTC",
+                "link": f"https://x.com/{day}-{n}",
+                "text": f"post {day}-{n}",
+                "user": {"username": "user"},
+                "is-pinned": False,
+                "day": day,
+            }
+            for day in range(30, 0, -1)
+            for n in range(4, -1, -1)
+        ]
+
+    def get_tweets(self, term, mode="user", number=20, until=None):
+        self.calls.append({"number": number, "until": until})
+        if until:
+            day = int(until.rsplit("-", 1)[1]) if until[:4] == "2024" else 0
+            tweets = [t for t in self.tweets if t["day"] < day]
+        else:
+            tweets = [self.pinned, *self.tweets]
+        return {"tweets": tweets[:number]}
+
+
+def test_iter_tweet_pages_ignores_old_pinned_posts(monkeypatch):
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.instances.time.sleep', lambda s: None
+    )
+    scraper = Scraper()
+    nitter = PinnedNitter()
+    scraper.pool.instances[0].client = nitter
+
+    pages = list(scraper.iter_tweet_pages('user', 'user', 150, page_size=50))
+
+    urls = [url for page in pages for url in page['url']]
+    assert urls == ['https://x.com/pinned'] + [
+        t['link'] for t in nitter.tweets[:149]
+    ]
+    assert all(
+        c['until'] is None or c['until'].startswith('2024')
+        for c in nitter.calls
+    )
+
+
+def test_scrape_many_spreads_targets_over_instances(monkeypatch):
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.instances.time.sleep', lambda s: None
+    )
+    scraper = Scraper(instances=['https://a', 'https://b'])
+    pages = list(
+        scraper.scrape_many(
+            [('user', 'user'), ('hello', 'term'), ('user', 'user')], limit=2
+        )
+    )
+    assert sorted(target for target, _ in pages) == [
+        ('hello', 'term'), ('user', 'user')
+    ]
+    assert all(len(df) == 2 for _, df in pages)
+    assert [s['url'] for s in scraper.pool.stats()] == [
+        'https://a', 'https://b'
+    ]
+
+
+def test_incremental_scrape_returns_only_new_posts(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.instances.time.sleep', lambda s: None
+    )
+    store = WatermarkStore(str(tmp_path / 'marks.sqlite3'))
+    scraper = Scraper(watermarks=store)
+    nitter = PagedNitter(days=5)
+    scraper.pool.instances[0].client = nitter
+
+    first = scraper.scrape_user_posts('user', limit=3, incremental=True)
+    assert list(first['url']) == [f'https://x.com/{d}' for d in (5, 4, 3)]
+    assert store.get('user', 'user')['url'] == 'https://x.com/5'
+
+    nitter.tweets.insert(0, {
+        'date': 'Jan 6, 2024 · 10:00 AM UTC',
+        'link': 'https://x.com/6',
+        'text': 'post 6',
+        'user': {'username': 'user'},
+    })
+    second = scraper.scrape_user_posts('user', limit=3, incremental=True)
+    assert list(second['url']) == ['https://x.com/6']
+    assert store.get('user', 'user')['url'] == 'https://x.com/6'
+
+    third = scraper.scrape_user_posts('user', limit=3, incremental=True)
+    assert third.empty
+    assert store.get('user', 'user')['url'] == 'https://x.com/6'
+
+
+def test_incremental_scrape_keeps_posts_sharing_the_mark_time(
+    monkeypatch, tmp_path
+):
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.instances.time.sleep', lambda s: None
+    )
+    store = WatermarkStore(str(tmp_path / 'marks.sqlite3'))
+    scraper = Scraper(watermarks=store)
+    nitter = PagedNitter(days=3)
+    scraper.pool.instances[0].client = nitter
+    store.set('user', 'user', nitter.tweets[0]['date'], 'https://x.com/3')
+    # Posted in the same minute as the mark, but a different post.
+    nitter.tweets.insert(0, {
+        'date': nitter.tweets[0]['date'],
+        'link': 'https://x.com/3b',
+        'text': 'post 3b',
+        'user': {'username': 'user'},
+    })
+
+    pages = scraper.iter_new_tweet_pages('user', 'user', 5, commit=False)
+    posts = pd.concat(list(pages))
+    assert list(posts['url']) == ['https://x.com/3b']
+    # Not committed until the caller says so.
+    assert store.get('user', 'user')['url'] == 'https://x.com/3'
+    scraper.commit_watermark('user', 'user', posts)
+    assert store.get('user', 'user')['url'] == 'https://x.com/3b'
+
+
+def _real_ntscraper():
+    """Import the installed ntscraper behind this module's fake."""
+    fake = sys.modules.pop('ntscraper')
+    try:
+        module = importlib.import_module('ntscraper.nitter')
+    except ImportError:
+        pytest.skip('ntscraper is not installed')
+    finally:
+        sys.modules['ntscraper'] = fake
+    logging.getLogger().removeHandler(module.log_handler)
+    return module
+
+
+TIMELINE_ITEM = """
+<div class="timeline-item">
+  <img class="avatar" src="/pic/profile_images/1/avatar.jpg">
+  <a class="fullname" href="/user">User</a>
+  <a class="username" href="/user">@user</a>
+  <span class="tweet-date">
+    <a href="/user/status/{n}#m" title="Jan {n}, 2024 · 10:00 AM UTC">x</a>
+  </span>
+  <div class="tweet-body">
+    <div class="tweet-content media-body">post {n}</div>
+  </div>
+  <span class="tweet-stat"><div>0</div></span>
+  <span class="tweet-stat"><div>0</div></span>
+  <span class="tweet-stat"><div>0</div></span>
+  <span class="tweet-stat"><div>0</div></span>
+</div>
+"""
+
+TIMELINE_PAGE = (
+    '<html><body><a class="profile-card-avatar" href="/user">'
+    '<img src="/pic/avatar.jpg"></a><div class="timeline">'
+    + TIMELINE_ITEM.format(n=2)
+    + TIMELINE_ITEM.format(n=1)
+    + '</div></body></html>'
+)
+
+ERROR_PAGE = (
+    '<html><body><div class="error-panel"><span>Instance has been rate '
+    'limited.</span></div></body></html>'
+)
+
+
+EMPTY_PAGE = (
+    '<html><body><div class="timeline"><div class="timeline-item '
+    'timeline-none"><h2 class="timeline-end">No items found</h2></div>'
+    '</div></body></html>'
+)
+
+
+def _serve(page, search_page=None):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            reply = page
+            if search_page is not None and '/search' in self.path:
+                reply = search_page
+            body = reply.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def test_scraper_fails_over_from_dead_and_error_instances(monkeypatch):
+    nitter_module = _real_ntscraper()
+    monkeypatch.setattr(nitter_module, 'sleep', lambda s: None)
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.instances.time.sleep', lambda s: None
+    )
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.scraper.Nitter', nitter_module.Nitter
+    )
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        dead = f'http://127.0.0.1:{sock.getsockname()[1]}'
+    error_server, error_url = _serve(ERROR_PAGE)
+    good_server, good_url = _serve(TIMELINE_PAGE)
+    try:
+        scraper = Scraper(instances=[dead, error_url, good_url])
+        df = scraper.scrape_user_posts('user', limit=2)
+    finally:
+        error_server.shutdown()
+        good_server.shutdown()
+
+    assert list(df['content']) == ['post 2', 'post 1']
+    stats = {s['url']: s for s in scraper.pool.stats()}
+    assert stats[dead]['failures'] == 1
+    assert stats[error_url]['failures'] == 1
+    assert stats[good_url]['successes'] == 1
+
+
+def test_end_of_timeline_does_not_count_as_a_failure(monkeypatch):
+    nitter_module = _real_ntscraper()
+    monkeypatch.setattr(nitter_module, 'sleep', lambda s: None)
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.instances.time.sleep', lambda s: None
+    )
+    monkeypatch.setattr(
+        'aggression_analyzer.modules.scraper.Nitter', nitter_module.Nitter
+    )
+    first, first_url = _serve(TIMELINE_PAGE, search_page=EMPTY_PAGE)
+    second, second_url = _serve(TIMELINE_PAGE, search_page=EMPTY_PAGE)
+    try:
+        scraper = Scraper(instances=[first_url, second_url])
+        pages = list(
+            scraper.iter_tweet_pages('user', 'user', 10, page_size=2)
+        )
+    finally:
+        first.shutdown()
+        second.shutdown()
+
+    assert [list(page['content']) for page in pages] == [['post 2', 'post 1']]
+    stats = scraper.pool.stats()
+    assert sum(s['successes'] for s in stats) == 2
+    assert all(s['failures'] == 0 for s in stats)
+    assert all(s['consecutive_errors'] == 0 for s in stats)
@@ -0,0 +1,28 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+APP_DIR = os.path.join(os.path.dirname(__file__), '..', 'aggression_analyzer')
+sys.path.insert(0, APP_DIR)
+
+
+def test_entry_point_defers_heavy_imports():
+    pytest.importorskip('customtkinter')
+    code = (
+        "import json, sys; import main; "
+        "print(json.dumps([m for m in "
+        "('pandas', 'openai', 'ntscraper', 'requests') "
+        "if m in sys.modules]))"
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=APP_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+    assert json.loads(output) == []